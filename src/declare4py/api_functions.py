@@ -1,119 +1,598 @@
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice, repeat
 from math import ceil
 
-from .constraint_checkers import *
-from .models import DeclModel
+import numpy as np
 
-def check_trace_conformance(trace, model, consider_vacuity):
+from .conformance_profiler import ConstraintProfile, instrument_checker
+from .constraint_checkers import *
+from .log_utils import MAX_TIMESTAMP
+from .models import ConformanceResults, ConformanceStatistics, DeclModel
+from .parsers import compile_conditions, compile_data_cond, compile_time_window
+
+
+def constraint_to_str(constraint):
+    constraint_str = constraint['template'].templ_str
+    if constraint['template'].supports_cardinality:
+        constraint_str += str(constraint['n'])
+    return constraint_str + '[' + constraint["attributes"] + '] |' + ' |'.join(constraint["condition"])
+
+
+def is_vectorizable(constraint, compact=False):
+    # Constraints without activation, correlation and time conditions can be checked on the whole log at once. With
+    # 'compact', the constraints with activation and time conditions (but no correlation condition) are accepted
+    # too, they can be checked at once on a compact log if the conditions can be evaluated on its columns
+    template = constraint['template']
+    if template.templ_str not in VECTORIZED_CHECKERS:
+        return False
+    if not compact:
+        return not any(cond.strip() for cond in constraint['condition'])
+    correlation = constraint['condition'][1] if template.is_binary else ""
+    time = constraint['condition'][-1]
+    return not correlation.strip() and (not time.strip() or template.templ_str in TIME_WINDOW_TEMPLATES)
+
+
+def constraint_activities(constraint):
+    if constraint['template'].is_binary:
+        return constraint['attributes'].split(', ')
+    return [constraint['attributes']]
+
+
+def activation_mask(compact_log, constraint):
+    # Mask of the events of the compact log satisfying the activation condition of the constraint. None if the
+    # condition cannot be evaluated on the columns of the log, or if it raises an error on some event of the
+    # constraint activities, which is left to the trace by trace check
+    try:
+        condition = compile_data_cond(constraint['condition'][0])
+    except SyntaxError:
+        return None
+    mask = compact_log.condition_mask(condition)
+    if mask is None:
+        return None
+    truth, defined = mask
+    if not all(defined[compact_log.activity_positions(activity)].all()
+               for activity in constraint_activities(constraint)):
+        return None
+    return truth
+
+
+def activation_masks(compact_log, constraints):
+    # Results of the activation conditions of the constraints over the events of the compact log, for the trace
+    # contexts: None where a condition raises an error, so that it is evaluated on the event as usual
+    masks = {}
+    for constraint in constraints:
+        if not constraint['condition'][0].strip():
+            continue
+        try:
+            condition = compile_data_cond(constraint['condition'][0])
+        except SyntaxError:
+            continue
+        if condition in masks or compact_log.condition_mask(condition) is None:
+            continue
+        truth, defined = compact_log.condition_mask(condition)
+        masks[condition] = np.where(defined, truth, None).tolist()
+    return masks
+
+
+def time_window_ns(compact_log, constraint):
+    # Bounds of the time condition of the constraint in nanoseconds, None if they cannot be checked on the timestamps
+    # of the compact log, e.g. if these are not sorted along the traces
+    try:
+        window = compile_time_window(constraint['condition'][-1])
+    except SyntaxError:
+        return None
+    if not compact_log.sorted_timestamps or any(abs(bound) > MAX_TIMESTAMP // 1000 for bound in window):
+        return None
+    return window[0] * 1000, window[1] * 1000
+
+
+def check_constraint_vectorized(compact_log, constraint, consider_vacuity):
+    # Return None if the activation or time condition of the constraint cannot be evaluated on the columns of the log
     rules = {"vacuous_satisfaction": consider_vacuity}
+    if constraint['template'].supports_cardinality:
+        rules["n"] = constraint['n']
+    if constraint['condition'][0].strip():
+        rules["activation_mask"] = activation_mask(compact_log, constraint)
+        if rules["activation_mask"] is None:
+            return None
+    if constraint['condition'][-1].strip():
+        rules["time_window"] = time_window_ns(compact_log, constraint)
+        if rules["time_window"] is None:
+            return None
 
-    # Set containing all constraints that raised SyntaxError in checker functions
-    error_constraint_set = set()
+    checker = VECTORIZED_CHECKERS[constraint['template'].templ_str]
+    if constraint['template'].is_binary:
+        attributes = constraint['attributes'].split(', ')
+        return checker(compact_log, attributes[0], attributes[1], rules)
+    return checker(compact_log, constraint['attributes'], rules)
 
-    trace_results = {}
-    
-    for constraint in model.checkers:
-        constraint_str = constraint['template'].templ_str
-        if constraint['template'].supports_cardinality:
-            constraint_str += str(constraint['n'])
-        constraint_str += '[' + constraint["attributes"] + '] |' + ' |'.join(constraint["condition"])
 
-        rules["activation"] = constraint['condition'][0]
+def vectorized_profile(compact_log, constraint, vec_result, wall_time):
+    # Profile of a constraint checked at once over the compact log: the examined events are the ones of its activities
+    num_activations = vec_result[3]
+    return ConstraintProfile(constraint['template'].templ_str, num_traces=len(compact_log), wall_time=wall_time,
+                             num_events=sum(len(compact_log.activity_positions(activity))
+                                            for activity in set(constraint_activities(constraint))),
+                             num_activations=0 if num_activations is None else int(num_activations.sum()))
 
-        if constraint['template'].supports_cardinality:
-            rules["n"] = constraint['n']
-        if constraint['template'].is_binary:
-            rules["correlation"] = constraint['condition'][1]
 
-        rules["time"] = constraint['condition'][-1]  # time condition is always at last position
+# Maximum number of traces sent at once to a worker process
+MAX_CHUNK_SIZE = 1000
+# Number of traces sent at once to a worker process when the results are yielded as soon as possible
+STREAM_CHUNK_SIZE = 100
+# Number of traces whose results on the variants of the log are added at once to the results of the log
+VARIANT_ROWS_CHUNK_SIZE = 1000
 
-        try:
-            if constraint['template'] is Template.EXISTENCE:
-                trace_results[constraint_str] = mp_existence(trace, True, constraint['attributes'], rules)
-
-            elif constraint['template'] is Template.ABSENCE:
-                trace_results[constraint_str] = mp_absence(trace, True, constraint['attributes'], rules)
-
-            elif constraint['template'] is Template.INIT:
-                trace_results[constraint_str] = mp_init(trace, True, constraint['attributes'], rules)
-
-            elif constraint['template'] is Template.EXACTLY:
-                trace_results[constraint_str] = mp_exactly(trace, True, constraint['attributes'], rules)
-
-            elif constraint['template'] is Template.CHOICE:
-                trace_results[constraint_str] = mp_choice(trace, True, constraint['attributes'].split(', ')[0],
-                                                          constraint['attributes'].split(', ')[1], rules)
-
-            elif constraint['template'] is Template.EXCLUSIVE_CHOICE:
-                trace_results[constraint_str] = mp_exclusive_choice(trace, True,
-                                                                    constraint['attributes'].split(', ')[0],
-                                                                    constraint['attributes'].split(', ')[1], rules)
-
-            elif constraint['template'] is Template.RESPONDED_EXISTENCE:
-                trace_results[constraint_str] = mp_responded_existence(trace, True,
-                                                                       constraint['attributes'].split(', ')[0],
-                                                                       constraint['attributes'].split(', ')[1], rules)
-            
-            elif constraint['template'] is Template.RESPONSE:
-                trace_results[constraint_str] = mp_response(trace, True, constraint['attributes'].split(', ')[0],
-                                                            constraint['attributes'].split(', ')[1], rules)
-
-            elif constraint['template'] is Template.ALTERNATE_RESPONSE:
-                trace_results[constraint_str] = mp_alternate_response(trace, True,
-                                                                      constraint['attributes'].split(', ')[0],
-                                                                      constraint['attributes'].split(', ')[1], rules)
-
-            elif constraint['template'] is Template.CHAIN_RESPONSE:
-                trace_results[constraint_str] = mp_chain_response(trace, True,
-                                                                  constraint['attributes'].split(', ')[0],
-                                                                  constraint['attributes'].split(', ')[1], rules)
-
-            elif constraint['template'] is Template.PRECEDENCE:
-                trace_results[constraint_str] = mp_precedence(trace, True, constraint['attributes'].split(', ')[0],
-                                                              constraint['attributes'].split(', ')[1], rules)
-
-            elif constraint['template'] is Template.ALTERNATE_PRECEDENCE:
-                trace_results[constraint_str] = mp_alternate_precedence(trace, True,
-                                                                        constraint['attributes'].split(', ')[0],
-                                                                        constraint['attributes'].split(', ')[1], rules)
-
-            elif constraint['template'] is Template.CHAIN_PRECEDENCE:
-                trace_results[constraint_str] = mp_chain_precedence(trace, True,
-                                                                    constraint['attributes'].split(', ')[0],
-                                                                    constraint['attributes'].split(', ')[1], rules)
-
-            elif constraint['template'] is Template.NOT_RESPONDED_EXISTENCE:
-                trace_results[constraint_str] = mp_not_responded_existence(trace, True,
-                                                                           constraint['attributes'].split(', ')[0],
-                                                                           constraint['attributes'].split(', ')[1],
-                                                                           rules)
-
-            elif constraint['template'] is Template.NOT_RESPONSE:
-                trace_results[constraint_str] = mp_not_response(trace, True, constraint['attributes'].split(', ')[0],
-                                                                constraint['attributes'].split(', ')[1], rules)
-
-            elif constraint['template'] is Template.NOT_CHAIN_RESPONSE:
-                trace_results[constraint_str] = mp_not_chain_response(trace, True,
-                                                                      constraint['attributes'].split(', ')[0],
-                                                                      constraint['attributes'].split(', ')[1], rules)
-
-            elif constraint['template'] is Template.NOT_PRECEDENCE:
-                trace_results[constraint_str] = mp_not_precedence(trace, True,
-                                                                  constraint['attributes'].split(', ')[0],
-                                                                  constraint['attributes'].split(', ')[1], rules)
-
-            elif constraint['template'] is Template.NOT_CHAIN_PRECEDENCE:
-                trace_results[constraint_str] = mp_not_chain_precedence(trace, True,
-                                                                        constraint['attributes'].split(', ')[0],
-                                                                        constraint['attributes'].split(', ')[1], rules)
+# Model checked by the worker processes of check_traces_parallel, received once when each worker starts
+_worker_model = None
+_worker_consider_vacuity = None
 
+
+def _init_conformance_worker(model, consider_vacuity):
+    global _worker_model, _worker_consider_vacuity
+    _worker_model = model
+    _worker_consider_vacuity = consider_vacuity
+    for constraint in model.checkers:
+        compile_conditions(constraint)
+
+
+def _check_traces(traces):
+    return [check_trace_conformance(trace, _worker_model, _worker_consider_vacuity) for trace in traces]
+
+
+def parallel_chunk_size(num_traces, n_jobs):
+    # A few chunks per process, so that the processes stay busy, without sending too many traces at once
+    return min(max(1, ceil(num_traces / (4 * n_jobs))), MAX_CHUNK_SIZE)
+
+
+def check_traces_parallel(log, model, consider_vacuity, n_jobs, chunk_size=None):
+    # Split the log in chunks of traces checked by a pool of processes, the results are returned in trace order.
+    # Chunks are read lazily and only a few per process are queued, so that a streamed log is never fully loaded. The
+    # chunk size is derived from the log length if not given
+    if chunk_size is None:
+        chunk_size = parallel_chunk_size(len(log), n_jobs)
+    traces = iter(log)
+    chunks = iter(lambda: list(islice(traces, chunk_size)), [])
+
+    executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_conformance_worker,
+                                   initargs=(model, consider_vacuity))
+    try:
+        futures = deque(executor.submit(_check_traces, chunk) for chunk in islice(chunks, 2 * n_jobs))
+        while futures:
+            chunk_res = futures.popleft().result()
+            futures.extend(executor.submit(_check_traces, chunk) for chunk in islice(chunks, 1))
+            yield from chunk_res
+    finally:
+        # The queued chunks are dropped if the results are not read until the end
+        executor.shutdown(cancel_futures=True)
+
+
+def check_log(log, model, consider_vacuity, log_results, compact_log=None, n_jobs=1, variants=None, profiler=None,
+              progress=None):
+    # Check the model on the log and add the results to 'log_results', a ConformanceResults or ConformanceStatistics.
+    # Constraints without conditions are checked at once over the compact log (if available) or once per variant (if
+    # the log variants are given), the remaining ones trace by trace, possibly in 'n_jobs' parallel processes (all the
+    # available cores if -1). The checks are recorded by the ConformanceProfiler 'profiler', if given, in this process.
+    # The ProgressTracker 'progress', if given, is advanced after each trace: if it stops, only the results of the
+    # traces checked so far are added
+    if progress is not None:
+        progress.start("conformance checking", variants.num_traces if variants is not None else len(log))
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+
+    vec_results = {}
+    variant_results = None
+    trace_model = model
+    if compact_log is not None or variants is not None:
+        trace_model = DeclModel()
+        variant_model = DeclModel()
+        for k, constraint in enumerate(model.checkers):
+            vec_result = None
+            if compact_log is not None and is_vectorizable(constraint, compact=True):
+                start = time.perf_counter()
+                vec_result = check_constraint_vectorized(compact_log, constraint, consider_vacuity)
+                if profiler is not None and vec_result is not None:
+                    profiler.add(constraint_to_str(constraint),
+                                 vectorized_profile(compact_log, constraint, vec_result, time.perf_counter() - start))
+            if vec_result is not None:
+                vec_results[k] = vec_result
+            elif compact_log is None and is_vectorizable(constraint):
+                variant_model.checkers.append(constraint)
+            else:
+                trace_model.checkers.append(constraint)
+        if variant_model.checkers:
+            variant_results = ConformanceResults(constraint_to_str(constraint)
+                                                 for constraint in variant_model.checkers)
+            for v, trace in enumerate(variants.traces):
+                variant_results.add_trace((v, None), check_trace_conformance(trace, variant_model, consider_vacuity,
+                                                                             profiler=profiler))
+
+    # The key and the variant of each trace are recorded while the trace is read, so that the log is read only once
+    # and nothing is kept for the traces whose results have been added
+    trace_info = deque()
+
+    def traces():
+        for i, trace in enumerate(log):
+            trace_info.append(((i, trace.attributes["concept:name"]),
+                               variants.variant_of(trace) if variant_results is not None else None))
+            yield trace
+
+    if not trace_model.checkers and compact_log is not None:
+        trace_info.extend(((i, trace_name), None) for i, trace_name in enumerate(compact_log.trace_names))
+        traces_res = repeat({}, len(compact_log))
+    elif not trace_model.checkers:
+        traces_res = ({} for _ in traces())
+    elif n_jobs > 1 and profiler is None:
+        traces_res = check_traces_parallel(traces(), trace_model, consider_vacuity, n_jobs,
+                                           parallel_chunk_size(len(log), n_jobs))
+    elif compact_log is not None:
+        # The activation conditions are evaluated on the columns of the log, once for all the traces
+        masks = activation_masks(compact_log, trace_model.checkers)
+        traces_res = (check_trace_conformance(trace, trace_model, consider_vacuity,
+                                              TraceContext(masks=masks, offset=int(compact_log.offsets[i])), profiler)
+                      for i, trace in enumerate(traces()))
+    else:
+        traces_res = (check_trace_conformance(trace, trace_model, consider_vacuity, profiler=profiler)
+                      for trace in traces())
+
+    # The results of the variants are added a chunk of traces at a time, those of the vectorized constraints at once
+    num_traces = 0
+    rows = []
+    for trc_res in traces_res:
+        trace_key, variant = trace_info.popleft()
+        log_results.add_trace(trace_key, trc_res)
+        num_traces += 1
+        if variant_results is not None:
+            rows.append(variant)
+            if len(rows) == VARIANT_ROWS_CHUNK_SIZE:
+                log_results.set_rows(variant_results, rows, num_traces - len(rows))
+                rows = []
+        if progress is not None and not progress.advance():
+            break
+    if rows:
+        log_results.set_rows(variant_results, rows, num_traces - len(rows))
+    for k, vec_result in vec_results.items():
+        log_results.set_vectorized(constraint_to_str(model.checkers[k]), vec_result)
+    if progress is not None:
+        progress.finish()
+
+
+def check_log_conformance(log, model, consider_vacuity, compact_log=None, n_jobs=1, variants=None, profiler=None,
+                          progress=None):
+    # The results are stored in columns, one for each constraint
+    log_results = ConformanceResults(constraint_to_str(constraint) for constraint in model.checkers)
+    check_log(log, model, consider_vacuity, log_results, compact_log, n_jobs, variants, profiler, progress)
+    return log_results
+
+
+def check_log_statistics(log, model, consider_vacuity, compact_log=None, n_jobs=1, variants=None,
+                         violating_traces=False, profiler=None, progress=None):
+    # Only the aggregates of each constraint are kept while the traces are checked
+    statistics = ConformanceStatistics((constraint_to_str(constraint) for constraint in model.checkers),
+                                       violating_traces)
+    check_log(log, model, consider_vacuity, statistics, compact_log, n_jobs, variants, profiler, progress)
+    statistics.flush()
+    return statistics
+
+
+def iter_conformance(log, model, consider_vacuity, compact_log=None, n_jobs=1):
+    """
+    Check a DECLARE model on a log and yield the results of each trace as soon as it is checked. Unlike
+    check_log_conformance, no constraint is checked over the whole log beforehand: all of them are checked trace by
+    trace, so the first results come right away and only a few traces are held at once.
+
+    Parameters
+    ----------
+    log : iterable
+        the traces to check, e.g. an EventLog, a CompactLog or a XesTraceStream.
+    model : DeclModel
+        the model to check.
+    consider_vacuity : bool
+        True means that vacuously satisfied traces are considered as satisfied, violated otherwise.
+    compact_log : CompactLog, optional
+        the compact encoding of the log, if available. The activation conditions are then evaluated on its columns.
+    n_jobs : int, optional
+        the number of processes checking the traces in parallel, -1 means all the available cores (default 1).
+
+    Yields
+    ------
+    trace_key, trace_results
+        the position of the trace inside the log and its name, and the dictionary with keys the constraint strings
+        and values the CheckerResult objects of the trace.
+    """
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+
+    if n_jobs > 1:
+        # The keys are read while the traces are sent to the workers, whose results come back in the same order
+        trace_keys = deque()
+
+        def traces():
+            for i, trace in enumerate(log):
+                trace_keys.append((i, trace.attributes["concept:name"]))
+                yield trace
+
+        for trace_res in check_traces_parallel(traces(), model, consider_vacuity, n_jobs, STREAM_CHUNK_SIZE):
+            yield trace_keys.popleft(), trace_res
+        return
+
+    masks = activation_masks(compact_log, model.checkers) if compact_log is not None else None
+    for i, trace in enumerate(log):
+        context = TraceContext(masks=masks, offset=int(compact_log.offsets[i])) if compact_log is not None else None
+        yield (i, trace.attributes["concept:name"]), check_trace_conformance(trace, model, consider_vacuity, context)
+
+
+# Incremental checker of each template, indexed by template name
+TEMPLATE_CHECKERS = {
+    Template.EXISTENCE.templ_str: ExistenceChecker,
+    Template.ABSENCE.templ_str: AbsenceChecker,
+    Template.EXACTLY.templ_str: ExactlyChecker,
+    Template.INIT.templ_str: InitChecker,
+    Template.CHOICE.templ_str: ChoiceChecker,
+    Template.EXCLUSIVE_CHOICE.templ_str: ExclusiveChoiceChecker,
+    Template.RESPONDED_EXISTENCE.templ_str: RespondedExistenceChecker,
+    Template.RESPONSE.templ_str: ResponseChecker,
+    Template.ALTERNATE_RESPONSE.templ_str: AlternateResponseChecker,
+    Template.CHAIN_RESPONSE.templ_str: ChainResponseChecker,
+    Template.PRECEDENCE.templ_str: PrecedenceChecker,
+    Template.ALTERNATE_PRECEDENCE.templ_str: AlternatePrecedenceChecker,
+    Template.CHAIN_PRECEDENCE.templ_str: ChainPrecedenceChecker,
+    Template.NOT_RESPONDED_EXISTENCE.templ_str: NotRespondedExistenceChecker,
+    Template.NOT_RESPONSE.templ_str: NotResponseChecker,
+    Template.NOT_CHAIN_RESPONSE.templ_str: NotChainResponseChecker,
+    Template.NOT_PRECEDENCE.templ_str: NotPrecedenceChecker,
+    Template.NOT_CHAIN_PRECEDENCE.templ_str: NotChainPrecedenceChecker,
+}
+
+
+def create_checker(constraint, consider_vacuity, context=None):
+    # Raise SyntaxError if the constraint conditions are not properly formatted. The checkers of the constraints of
+    # the same trace can share its TraceContext
+    rules = {"vacuous_satisfaction": consider_vacuity, "activation": constraint['condition'][0]}
+
+    if constraint['template'].supports_cardinality:
+        rules["n"] = constraint['n']
+    if constraint['template'].is_binary:
+        rules["correlation"] = constraint['condition'][1]
+
+    rules["time"] = constraint['condition'][-1]  # time condition is always at last position
+
+    checker_class = TEMPLATE_CHECKERS[constraint['template'].templ_str]
+    if constraint['template'].is_binary:
+        attributes = constraint['attributes'].split(', ')
+        checker = checker_class(attributes[0], attributes[1], rules)
+    else:
+        checker = checker_class(constraint['attributes'], rules)
+    if context is not None:
+        checker.context = context
+    return checker
+
+
+def check_trace_conformance(trace, model, consider_vacuity, context=None, profiler=None):
+    # Set containing all constraints that raised SyntaxError in checker functions
+    error_constraint_set = set()
+
+    # The trace is walked only once: each event is dispatched to the checkers interested in its activity, which share
+    # the facts computed on the trace
+    checkers = {}
+    checkers_by_activity = {}
+    templates = {}
+    if context is None:
+        context = TraceContext()
+
+    for constraint in model.checkers:
+        constraint_str = constraint_to_str(constraint)
+        try:
+            checker = create_checker(constraint, consider_vacuity, context)
         except SyntaxError:
             if constraint_str not in error_constraint_set:
                 error_constraint_set.add(constraint_str)
                 print('Condition not properly formatted for constraint "' + constraint_str + '".')
+            continue
+
+        checkers[constraint_str] = checker
+        templates[constraint_str] = constraint['template'].templ_str
+        for activity in set(checker.activities):
+            checkers_by_activity.setdefault(activity, []).append(checker)
+
+    if profiler is not None:
+        return check_trace_profiled(trace, checkers, templates, context, profiler)
+
+    first = trace[0] if len(trace) > 0 else None
+    prev = None
+    for index, event in enumerate(trace):
+        context.set_event(index, event)
+        for checker in checkers_by_activity.get(event["concept:name"], ()):
+            checker.update(index, event, first, prev)
+        prev = event
+
+    return {constraint_str: checker.result(True, len(trace)) for constraint_str, checker in checkers.items()}
+
+
+def check_trace_profiled(trace, checkers, templates, context, profiler):
+    # Same walk of check_trace_conformance, timing the updates and results of each checker and counting its events and
+    # condition evaluations, then adding the profile of the trace to the profiler
+    profiles = {constraint_str: ConstraintProfile(templates[constraint_str], num_traces=1)
+                for constraint_str in checkers}
+    checkers_by_activity = {}
+    for constraint_str, checker in checkers.items():
+        instrument_checker(checker, profiles[constraint_str])
+        for activity in set(checker.activities):
+            checkers_by_activity.setdefault(activity, []).append((checker, profiles[constraint_str]))
+
+    clock = time.perf_counter
+    first = trace[0] if len(trace) > 0 else None
+    prev = None
+    for index, event in enumerate(trace):
+        context.set_event(index, event)
+        for checker, profile in checkers_by_activity.get(event["concept:name"], ()):
+            start = clock()
+            checker.update(index, event, first, prev)
+            profile.wall_time += clock() - start
+            profile.num_events += 1
+        prev = event
+
+    trace_res = {}
+    for constraint_str, checker in checkers.items():
+        profile = profiles[constraint_str]
+        start = clock()
+        trace_res[constraint_str] = result = checker.result(True, len(trace))
+        profile.wall_time += clock() - start
+        profile.num_activations = result.num_activations or 0
+        profiler.add(constraint_str, profile)
+    return trace_res
+
+
+def vectorized_discovery_result(compact_log, constraint, vec_result, min_support=0):
+    # Discovery result of a constraint from the arrays returned by a vectorized checker
+    sat_idx = np.flatnonzero(vec_result[-1])
+    if len(sat_idx) / len(compact_log) < min_support:
+        return {}
+    counters = [repeat(None) if c is None else c[sat_idx].tolist() for c in vec_result[:-1]]
+    sat_traces = {(i, compact_log.trace_names[i]):
+                  CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations,
+                                num_pendings=num_pendings, num_activations=num_activations, state=TraceState.SATISFIED)
+                  for i, num_fulfillments, num_violations, num_pendings, num_activations
+                  in zip(sat_idx.tolist(), *counters)}
+    return {constraint_to_str(constraint): sat_traces} if sat_traces else {}
+
+
+def discover_activity_constraints(compact_log, activity, consider_vacuity, max_declare_cardinality, stats,
+                                  min_support=0, itemset_support=None):
+    # Discover all the unary templates over an activity at once, skipping the ones whose support upper bound does not
+    # reach the minimum support
+    rules = {"vacuous_satisfaction": consider_vacuity, "n": max_declare_cardinality}
+    candidates = []
+    for templ in Template.get_unary_templates():
+        cardinalities = range(1, max_declare_cardinality + 1) if templ.supports_cardinality else [None]
+        for n in cardinalities:
+            constraint = {"template": templ, "attributes": activity, "condition": ("", "")}
+            if n is not None:
+                constraint['n'] = n
+            if reaches_min_support(constraint, consider_vacuity, itemset_support, min_support):
+                candidates.append((constraint, n))
+    if not candidates:
+        return {}
+    vec_results = vec_unary_templates(compact_log, activity, rules, stats,
+                                      {constraint['template'].templ_str for constraint, _ in candidates})
+
+    discovery_res = {}
+    for constraint, n in candidates:
+        discovery_res |= vectorized_discovery_result(compact_log, constraint,
+                                                     vec_results[constraint['template'].templ_str, n], min_support)
+    return discovery_res
+
 
-    return trace_results
+def discover_pair_constraints(compact_log, a, b, consider_vacuity, stats, min_support=0, itemset_support=None):
+    # Discover all the binary templates over the activity pair in both orders, from the events of a and b only. The
+    # templates whose support upper bound does not reach the minimum support are skipped, as well as the orders (or
+    # the whole pair) left without templates
+    rules = {"vacuous_satisfaction": consider_vacuity}
+    candidates = []
+    for templ in Template.get_binary_templates():
+        for couple in ((a, b), (b, a)):
+            constraint = {"template": templ, "attributes": ', '.join(couple), "condition": ("", "", "")}
+            if reaches_min_support(constraint, consider_vacuity, itemset_support, min_support):
+                candidates.append((couple, constraint))
+    vec_results = {}
+    for couple in ((a, b), (b, a)):
+        templates = {constraint['template'].templ_str for c, constraint in candidates if c == couple}
+        if templates:
+            vec_results[couple] = vec_binary_templates(compact_log, *couple, rules, stats, templates)
+
+    discovery_res = {}
+    for couple, constraint in candidates:
+        discovery_res |= vectorized_discovery_result(compact_log, constraint,
+                                                     vec_results[couple][constraint['template'].templ_str],
+                                                     min_support)
+    return discovery_res
+
+
+# Binary templates activated by their second activity
+TARGET_ACTIVATED_TEMPLATES = (Template.PRECEDENCE.templ_str, Template.ALTERNATE_PRECEDENCE.templ_str,
+                              Template.CHAIN_PRECEDENCE.templ_str, Template.NOT_PRECEDENCE.templ_str,
+                              Template.NOT_CHAIN_PRECEDENCE.templ_str)
+
+
+def support_upper_bound(constraint, consider_vacuity, itemset_support):
+    # Upper bound of the support of a constraint without conditions, computed from the supports of the item sets of
+    # its activities ('itemset_support' maps frozensets of activities to their support, missing ones are not bounded)
+    template = constraint['template']
+    if not template.is_binary:
+        # All the unary templates but Absence need the activity to occur (cardinalities start from 1)
+        if template is Template.ABSENCE:
+            return 1
+        return itemset_support.get(frozenset([constraint['attributes']]), 1)
+
+    a, b = constraint['attributes'].split(', ')
+    support_a = itemset_support.get(frozenset([a]), 1)
+    support_b = itemset_support.get(frozenset([b]), 1)
+    support_ab = itemset_support.get(frozenset([a, b]), min(support_a, support_b))
+    if template is Template.CHOICE:
+        return 1
+    if template is Template.EXCLUSIVE_CHOICE:
+        return support_a + support_b - 2 * support_ab
+
+    # Traces with activations satisfy the positive templates only if they contain the target too, any trace with
+    # activations may satisfy the negative ones. Traces without activations are satisfied only with vacuity.
+    activation_support = support_b if template.templ_str in TARGET_ACTIVATED_TEMPLATES else support_a
+    activated_support = activation_support if template.is_negative else support_ab
+    if consider_vacuity:
+        return activated_support + 1 - activation_support
+    return activated_support
+
+
+def reaches_min_support(constraint, consider_vacuity, itemset_support, min_support):
+    # Whether the support upper bound of a candidate constraint reaches the minimum support (up to the rounding errors
+    # of the sums of supports), always True without item set supports
+    if not itemset_support:
+        return True
+    return support_upper_bound(constraint, consider_vacuity, itemset_support) + 1e-9 >= min_support
+
+
+def discover_candidate(log, constraint, consider_vacuity, itemset_support, min_support=0, variants=None):
+    # Check a candidate constraint only if its support upper bound reaches the minimum support
+    if not reaches_min_support(constraint, consider_vacuity, itemset_support, min_support):
+        return {}
+    return discover_constraint(log, constraint, consider_vacuity, min_support=min_support, variants=variants)
+
+
+def discover_constraint_variants(variants, constraint, consider_vacuity, min_support=0):
+    # Check a constraint without conditions once per variant, the satisfied variants give the satisfied traces. The
+    # variants must keep their traces
+    constraint_str = constraint_to_str(constraint)
+    n_traces = variants.num_traces
+    variant_res = [None] * len(variants)
+    sat_ctr = 0
+    unchecked = n_traces
+    for v, trace in enumerate(variants.traces):
+        checker_res = create_checker(constraint, consider_vacuity).check(trace, True)
+        if checker_res.state == TraceState.SATISFIED:
+            variant_res[v] = checker_res
+            sat_ctr += variants.counts[v]
+        unchecked -= variants.counts[v]
+        # If there aren't enough more traces to reach the minimum support, stop checking
+        if (sat_ctr + unchecked) / n_traces < min_support:
+            return {}
+
+    if sat_ctr == 0:
+        return {}
+    return {constraint_str: {key: variant_res[v] for key, v in zip(variants.trace_keys, variants.trace_variants)
+                             if variant_res[v] is not None}}
+
+
+def discover_constraint(log, constraint, consider_vacuity, compact_log=None, min_support=0, variants=None):
+    if compact_log is not None and is_vectorizable(constraint):
+        vec_result = check_constraint_vectorized(compact_log, constraint, consider_vacuity)
+        return vectorized_discovery_result(compact_log, constraint, vec_result, min_support)
+    if variants is not None and is_vectorizable(constraint):
+        return discover_constraint_variants(variants, constraint, consider_vacuity, min_support)
 
-def discover_constraint(log, constraint, consider_vacuity):
     # Fake model composed by a single constraint
     model = DeclModel()
     model.checkers.append(constraint)
@@ -132,10 +611,96 @@ def discover_constraint(log, constraint, consider_vacuity):
                 discovery_res[constraint_str] |= new_val
             else:
                 discovery_res[constraint_str] = new_val
+        # If there aren't enough more traces to reach the minimum support, stop checking
+        sat_ctr = len(discovery_res.get(constraint_str, ()))
+        if (sat_ctr + len(log) - (i+1)) / len(log) < min_support:
+            return {}
 
     return discovery_res
 
-def query_constraint(log, constraint, consider_vacuity, min_support):
+
+def query_candidate_traces(compact_log, constraint, consider_vacuity, mask=None):
+    # Return the traces of the log to check for the constraint and whether all the other traces satisfy it, which
+    # follows from the activities they contain. E.g. the traces without the activation of a relation template are
+    # vacuously satisfied, and the ones without the activity of Existence are violated. Given the (truth, defined)
+    # mask of the activation condition, the events not satisfying it do not count as activations.
+    def activation_traces(activity):
+        if mask is None:
+            return compact_log.activity_traces(activity)
+        truth, defined = mask
+        positions = compact_log.activity_positions(activity)
+        positions = positions[truth[positions] | ~defined[positions]]
+        return np.unique(compact_log.trace_ids[positions])
+
+    template = constraint['template']
+    if not template.is_binary:
+        return activation_traces(constraint['attributes']), template is Template.ABSENCE
+
+    a, b = constraint['attributes'].split(', ')
+    if template is Template.CHOICE or template is Template.EXCLUSIVE_CHOICE:
+        return np.union1d(activation_traces(a), activation_traces(b)), False
+
+    activation, target = (b, a) if template.templ_str in TARGET_ACTIVATED_TEMPLATES else (a, b)
+    traces = activation_traces(activation)
+    if not consider_vacuity and not template.is_negative:
+        # Without vacuity, the traces without the target always violate the positive templates
+        traces = np.intersect1d(traces, compact_log.activity_traces(target), assume_unique=True)
+    return traces, consider_vacuity
+
+
+def query_constraint(log, constraint, consider_vacuity, min_support, compact_log=None, variants=None):
+    vec_result = None
+    if compact_log is not None and is_vectorizable(constraint, compact=True):
+        vec_result = check_constraint_vectorized(compact_log, constraint, consider_vacuity)
+    if vec_result is not None:
+        sat_ctr = int(vec_result[-1].sum())
+        if sat_ctr > 0 and sat_ctr / len(log) >= min_support:
+            return constraint_to_str(constraint)
+        return None
+
+    if variants is not None and is_vectorizable(constraint):
+        # Each variant is checked once and counts as many times as its traces
+        sat_ctr = 0
+        unchecked = len(log)
+        for v, trace in enumerate(variants.traces):
+            if create_checker(constraint, consider_vacuity).check(trace, True).state == TraceState.SATISFIED:
+                sat_ctr += variants.counts[v]
+                # If the constraint is already above the minimum support, return it directly
+                if sat_ctr / len(log) >= min_support:
+                    return constraint_to_str(constraint)
+            unchecked -= variants.counts[v]
+            # If there aren't enough more traces to reach the minimum support, return nothing
+            if (sat_ctr + unchecked) / len(log) < min_support:
+                return None
+        return None
+
+    if compact_log is not None:
+        # Only the traces whose result does not follow from their activities are checked, thanks to the
+        # activity-to-trace index of the compact log
+        constraint_str = constraint_to_str(constraint)
+        try:
+            create_checker(constraint, consider_vacuity)
+        except SyntaxError:
+            print('Condition not properly formatted for constraint "' + constraint_str + '".')
+            return None
+
+        mask = None
+        if constraint['condition'][0].strip():
+            mask = compact_log.condition_mask(compile_data_cond(constraint['condition'][0]))
+        traces, others_satisfied = query_candidate_traces(compact_log, constraint, consider_vacuity, mask)
+        sat_ctr = len(log) - len(traces) if others_satisfied else 0
+        for k, i in enumerate(traces.tolist()):
+            # If the constraint is already above the minimum support, return it directly
+            if sat_ctr > 0 and sat_ctr / len(log) >= min_support:
+                return constraint_str
+            # If there aren't enough more traces to reach the minimum support, return nothing
+            if (sat_ctr + len(traces) - k) / len(log) < min_support:
+                return None
+            if create_checker(constraint, consider_vacuity).check(compact_log[i], True).state == TraceState.SATISFIED:
+                sat_ctr += 1
+
+        return constraint_str if sat_ctr > 0 and sat_ctr / len(log) >= min_support else None
+
     # Fake model composed by a single constraint
     model = DeclModel()
     model.checkers.append(constraint)
@@ -157,3 +722,69 @@ def query_constraint(log, constraint, consider_vacuity, min_support):
             return None
 
     return None
+
+
+# Candidate constraints checked by the worker processes of query_constraints, received once when each worker starts
+_worker_query = None
+# Index of the first candidate found above the minimum support, shared by the workers when only the first is returned
+_worker_first_hit = None
+
+
+def _init_query_worker(log, constraints, consider_vacuity, min_support, compact_log, variants, first_hit):
+    global _worker_query, _worker_first_hit
+    _worker_query = (log, constraints, consider_vacuity, min_support, compact_log, variants)
+    _worker_first_hit = first_hit
+
+
+def _query_candidates(start, stop):
+    # Check the candidates in [start, stop). When only the first hit is wanted, the candidates following a hit already
+    # found by any worker are skipped, since they cannot be returned anymore
+    log, constraints, consider_vacuity, min_support, compact_log, variants = _worker_query
+    res = []
+    for k in range(start, stop):
+        if _worker_first_hit is not None and k > _worker_first_hit.value:
+            break
+        constraint_str = query_constraint(log, constraints[k], consider_vacuity, min_support, compact_log, variants)
+        res.append(constraint_str)
+        if constraint_str and _worker_first_hit is not None:
+            with _worker_first_hit.get_lock():
+                _worker_first_hit.value = min(_worker_first_hit.value, k)
+            break
+    return res
+
+
+def query_constraints(log, constraints, consider_vacuity, min_support, compact_log=None, n_jobs=1, return_first=False,
+                      variants=None):
+    # Yield, in the order of 'constraints', the string of each constraint above the minimum support or None. The
+    # candidates are split in chunks checked by 'n_jobs' parallel processes (all the available cores if -1). With
+    # 'return_first', the yielded values stop after the first hit and the workers give up the following candidates.
+    # The candidate traces of the compact log are rebuilt once for all the candidates, in each process
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+    with compact_log.keep_traces() if compact_log is not None else nullcontext():
+        yield from _query_constraints(log, constraints, consider_vacuity, min_support, compact_log, n_jobs,
+                                      return_first, variants)
+
+
+def _query_constraints(log, constraints, consider_vacuity, min_support, compact_log, n_jobs, return_first, variants):
+    # Check the candidates of query_constraints sequentially or in the worker processes
+    if n_jobs <= 1 or len(constraints) <= 1:
+        for constraint in constraints:
+            yield query_constraint(log, constraint, consider_vacuity, min_support, compact_log, variants)
+        return
+
+    first_hit = multiprocessing.Value('q', len(constraints)) if return_first else None
+    chunk_size = max(1, ceil(len(constraints) / (4 * n_jobs)))
+    executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_query_worker,
+                                   initargs=(log, constraints, consider_vacuity, min_support, compact_log, variants,
+                                             first_hit))
+    try:
+        futures = [executor.submit(_query_candidates, start, min(start + chunk_size, len(constraints)))
+                   for start in range(0, len(constraints), chunk_size)]
+        for future in futures:
+            chunk_res = future.result()
+            yield from chunk_res
+            if return_first and any(chunk_res):
+                return
+    finally:
+        executor.shutdown(cancel_futures=True)
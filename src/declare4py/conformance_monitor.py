@@ -0,0 +1,124 @@
+from .api_functions import constraint_to_str, create_checker
+from .constraint_checkers import TraceContext
+from .models import CheckerResult
+
+
+class _CaseState:
+    # Checkers and trace position of an open case
+    def __init__(self, checkers):
+        self.checkers = checkers
+        self.checkers_by_activity = {}
+        for constraint_str, checker in checkers.items():
+            for activity in set(checker.activities):
+                self.checkers_by_activity.setdefault(activity, []).append((constraint_str, checker))
+        self.length = 0
+        self.first = None
+        self.prev = None
+        self.states = {constraint_str: checker.result(False, 0).state for constraint_str, checker in checkers.items()}
+        # Checkers updated by the last event whose result changes with the next event, whatever it is
+        self.watched = []
+
+
+class ConformanceMonitor:
+    """
+    Online conformance checker of a DECLARE model, which is fed the events of many concurrent cases one at a time.
+    Each open case keeps the state of the incremental checkers of all the constraints, so that each incoming event only
+    updates the checkers of the constraints involving its activity.
+
+    Attributes
+    ----------
+    model : DeclModel
+        the monitored DECLARE model
+    consider_vacuity : bool
+        True means that vacuously satisfied traces are considered as satisfied, violated otherwise
+    """
+    def __init__(self, model, consider_vacuity):
+        self.model = model
+        self.consider_vacuity = consider_vacuity
+        self._constraints = []
+        for constraint in model.checkers:
+            constraint_str = constraint_to_str(constraint)
+            try:
+                create_checker(constraint, consider_vacuity)
+            except SyntaxError:
+                print('Condition not properly formatted for constraint "' + constraint_str + '".')
+                continue
+            self._constraints.append((constraint_str, constraint))
+        self._cases = {}
+
+    def __len__(self):
+        return len(self._cases)
+
+    def __contains__(self, case_id):
+        return case_id in self._cases
+
+    def _get_case(self, case_id):
+        case = self._cases.get(case_id)
+        if case is None:
+            context = TraceContext()
+            checkers = {constraint_str: create_checker(constraint, self.consider_vacuity, context)
+                        for constraint_str, constraint in self._constraints}
+            case = self._cases[case_id] = _CaseState(checkers)
+        return case
+
+    def process_event(self, case_id, event) -> dict[str: CheckerResult]:
+        """
+        Append an event to a case, which is opened if it is new, and update the state of the constraints.
+
+        Parameters
+        ----------
+        case_id : hashable
+            the identifier of the case the event belongs to.
+        event : Event or dict
+            the event, carrying at least the 'concept:name' attribute.
+
+        Returns
+        -------
+        transitions
+            dictionary with keys the constraints whose state has been changed by the event and values the
+            CheckerResult of the case prefix, where the state is one of the POSSIBLY_* states or a definitive one.
+        """
+        case = self._get_case(case_id)
+        index = case.length
+        if index == 0:
+            case.first = event
+
+        updated = case.checkers_by_activity.get(event["concept:name"], ())
+        for constraint_str, checker in updated:
+            checker.update(index, event, case.first, case.prev)
+        case.prev = event
+        case.length += 1
+
+        transitions = {}
+        for constraint_str, checker in [*case.watched, *updated]:
+            result = checker.result(False, case.length)
+            if result.state != case.states[constraint_str]:
+                case.states[constraint_str] = result.state
+                transitions[constraint_str] = result
+        case.watched = [(constraint_str, checker) for constraint_str, checker in updated if checker.depends_on_length]
+
+        return transitions
+
+    def get_case_results(self, case_id) -> dict[str: CheckerResult]:
+        """
+        Return the result of each constraint on the events received so far for an open case.
+        """
+        if case_id not in self._cases:
+            raise RuntimeError(f"Case {case_id} is not open.")
+        case = self._cases[case_id]
+        return {constraint_str: checker.result(False, case.length) for constraint_str, checker in case.checkers.items()}
+
+    def close_case(self, case_id) -> dict[str: CheckerResult]:
+        """
+        Close a case, i.e. declare that no more events will be received for it, and return its final results.
+
+        Returns
+        -------
+        case_results
+            dictionary with keys the constraints and values the CheckerResult of the completed trace, the same that
+            conformance checking gives for it.
+        """
+        if case_id not in self._cases:
+            raise RuntimeError(f"Case {case_id} is not open.")
+        case = self._cases.pop(case_id)
+        return {constraint_str: checker.result(True, case.length) for constraint_str, checker in case.checkers.items()}
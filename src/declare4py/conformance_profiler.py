@@ -0,0 +1,135 @@
+import pandas as pd
+
+PROFILE_COUNTERS = ("num_traces", "wall_time", "num_events", "num_evaluations", "num_activations")
+
+
+class ConstraintProfile:
+    """
+    Cost of checking a constraint, accumulated over the checked traces.
+
+    Attributes
+    ----------
+    template : str
+        the template name of the constraint
+    num_traces : int
+        the number of traces checked
+    wall_time : float
+        the seconds spent in the checker of the constraint
+    num_events : int
+        the number of events examined by the checker
+    num_evaluations : int
+        the number of evaluations of the activation, correlation and time conditions of the constraint
+    num_activations : int
+        the number of activations of the constraint
+    """
+    __slots__ = ("template",) + PROFILE_COUNTERS
+
+    def __init__(self, template, num_traces=0, wall_time=0.0, num_events=0, num_evaluations=0, num_activations=0):
+        self.template = template
+        self.num_traces = num_traces
+        self.wall_time = wall_time
+        self.num_events = num_events
+        self.num_evaluations = num_evaluations
+        self.num_activations = num_activations
+
+
+class _CountedCondition:
+    # Compiled condition counting its evaluations in a profile. It is equal to the wrapped condition, so that the
+    # activation results shared by the checkers of a trace and the masks of the compact log are still found
+    def __init__(self, condition, profile):
+        self.condition = condition
+        self.profile = profile
+
+    def __call__(self, A, T):
+        self.profile.num_evaluations += 1
+        return self.condition(A, T)
+
+    def __getattr__(self, name):
+        return getattr(self.condition, name)
+
+    def __hash__(self):
+        return hash(self.condition)
+
+    def __eq__(self, other):
+        return self.condition == (other.condition if isinstance(other, _CountedCondition) else other)
+
+
+def instrument_checker(checker, profile):
+    # Count the evaluations of the conditions of a checker in the given profile. Empty conditions, which read no
+    # event, are not counted
+    for name in ("activation_rules", "correlation_rules"):
+        condition = getattr(checker, name, None)
+        if condition is not None and condition.names:
+            setattr(checker, name, _CountedCondition(condition, profile))
+    if getattr(checker, "time_window", None) is not None:
+        in_time_window = checker.in_time_window
+
+        def counted_in_time_window(A, T):
+            profile.num_evaluations += 1
+            return in_time_window(A, T)
+        checker.in_time_window = counted_in_time_window
+
+
+class ConformanceProfiler:
+    """
+    Opt-in instrumentation of conformance checking. It records, for each constraint, the time spent in its checker,
+    the examined events, the evaluations of its conditions and its activations. It is passed to
+    Declare4Py.conformance_checking(). Without a profiler, the checking loop is not instrumented at all.
+
+    The constraints checked at once over the compact log are timed as a whole and evaluate no condition one event at
+    a time. The ones checked once per variant of a streamed log count each variant once. Traces are always checked in
+    the calling process while profiling, whatever the number of jobs.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        called with the constraint string and the ConstraintProfile of each checked trace, or of the whole log for the
+        constraints checked at once.
+
+    Attributes
+    ----------
+    profiles : dict[str: ConstraintProfile]
+        the profile of each constraint string, accumulated over all the checks
+    """
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.profiles = {}
+
+    def add(self, constraint_str, profile):
+        """
+        Add the profile of a check of a constraint to its total.
+        """
+        total = self.profiles.get(constraint_str)
+        if total is None:
+            total = self.profiles[constraint_str] = ConstraintProfile(profile.template)
+        for name in PROFILE_COUNTERS:
+            setattr(total, name, getattr(total, name) + getattr(profile, name))
+        if self.callback is not None:
+            self.callback(constraint_str, profile)
+
+    def reset(self):
+        """
+        Discard the recorded profiles.
+        """
+        self.profiles = {}
+
+    def to_dataframe(self, by: str = "constraint") -> pd.DataFrame:
+        """
+        Return the recorded profiles as a DataFrame sorted by decreasing wall time.
+
+        Parameters
+        ----------
+        by : str, optional
+            'constraint' for one row for each constraint, 'template' for one row for each template, with the totals of
+            its constraints and their number in 'num_constraints' (default 'constraint').
+        """
+        profiles = pd.DataFrame([(constraint_str, profile.template) + tuple(getattr(profile, name)
+                                                                            for name in PROFILE_COUNTERS)
+                                 for constraint_str, profile in self.profiles.items()],
+                                columns=("constraint", "template") + PROFILE_COUNTERS)
+        if by == "template":
+            profiles = profiles.groupby("template", as_index=False).agg(
+                num_constraints=("constraint", "size"), **{name: (name, "sum") for name in PROFILE_COUNTERS})
+        elif by != "constraint":
+            raise RuntimeError("The profiles can only be grouped by 'constraint' or 'template'.")
+        return profiles.sort_values("wall_time", ascending=False, ignore_index=True)
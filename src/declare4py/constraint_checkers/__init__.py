@@ -1,4 +1,6 @@
+from .base import *
 from .existence import *
 from .relation import *
 from .negative_relation import *
 from .choice import *
+from .vectorized import *
@@ -0,0 +1,161 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+
+# Maximum number of event timestamps kept by a trace context, the oldest ones are evicted first
+MAX_CACHED_TIMESTAMPS = 10000
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+# Names read by the conditions that only depend on the activation event
+ACTIVATION_NAMES = frozenset({'A'})
+
+
+class TraceContext:
+    """
+    Facts about the trace being checked that are shared by all the checkers of its constraints, so that they are
+    computed only once: the results of the activation conditions on the current event and the timestamps of the
+    events as epoch microseconds. The checkers of a trace are updated event by event, hence only the activation
+    results of the last event are kept, while timestamps are evicted once they are more than 'max_timestamps', which
+    bounds the memory of long or streamed traces. The results of the activation conditions can also be taken from
+    masks precomputed over the whole log, see CompactLog.condition_mask.
+
+    Attributes
+    ----------
+    max_timestamps : int
+        the maximum number of cached event timestamps
+    masks : dict
+        for some activation conditions, the list of their results over the events of the log, None for the events
+        where they have to be evaluated
+    offset : int
+        the position inside the log of the first event of the trace
+    """
+    def __init__(self, max_timestamps=MAX_CACHED_TIMESTAMPS, masks=None, offset=0):
+        self.max_timestamps = max_timestamps
+        self.masks = masks if masks is not None else {}
+        self.offset = offset
+        self._event = None
+        self._index = None
+        self._activations = {}
+        # Events are kept along with their timestamp, so that their id is not reused while they are cached
+        self._timestamps = {}
+
+    def is_activated(self, condition, event):
+        """
+        Return the result of an activation condition reading only the activation event 'A' on the given event, which
+        is the event the checkers are being updated with.
+        """
+        if event is not self._event:
+            self.set_event(None, event)
+        if condition not in self._activations:
+            result = None
+            if self._index is not None and condition in self.masks:
+                result = self.masks[condition][self.offset + self._index]
+            self._activations[condition] = condition(event, None) if result is None else result
+        return self._activations[condition]
+
+    def set_event(self, index, event):
+        """
+        Set the event the checkers are going to be updated with and its position inside the trace, which is needed to
+        read the masks (None if unknown).
+        """
+        self._event = event
+        self._index = index
+        self._activations = {}
+
+    def timestamp(self, event):
+        """
+        Return the timestamp of the event in microseconds since the epoch.
+        """
+        cached = self._timestamps.get(id(event))
+        if cached is not None:
+            return cached[1]
+
+        ts = event["time:timestamp"]
+        ts = (ts - (EPOCH if ts.tzinfo is None else EPOCH_UTC)) // MICROSECOND
+        if len(self._timestamps) >= self.max_timestamps:
+            del self._timestamps[next(iter(self._timestamps))]
+        self._timestamps[id(event)] = (event, ts)
+        return ts
+
+    def in_time_window(self, window, A, T):
+        """
+        Return whether the time distance between the events A and T is within the bounds of a time condition.
+        """
+        return window[0] <= abs(self.timestamp(A) - self.timestamp(T)) <= window[1]
+
+
+class ConstraintChecker(ABC):
+    """
+    Incremental checker of a DECLARE constraint over a single trace. The events of the trace are fed in order to
+    update(), but only the ones whose activity name is in 'activities' have to be fed; result() returns the
+    CheckerResult of the events seen so far.
+
+    Attributes
+    ----------
+    activities : tuple[str]
+        the activity names of the events the checker has to be updated with
+    context : TraceContext
+        the trace facts shared with the checkers of the other constraints of the trace
+    depends_on_length : bool
+        True if the result can change when an event that is not fed to the checker is appended to the trace, which
+        happens only right after the checker has been updated
+    """
+    depends_on_length = False
+
+    def __init__(self, *activities):
+        self.activities = activities
+        self.context = TraceContext()
+
+    @abstractmethod
+    def update(self, index, event, first, prev):
+        """
+        Update the checker with an event of the trace.
+
+        Parameters
+        ----------
+        index : int
+            position of the event inside the trace.
+        event : Event
+            the event, whose activity is one of 'activities'.
+        first : Event
+            the first event of the trace.
+        prev : Event
+            the event preceding the current one in the trace, None for the first event.
+        """
+
+    @abstractmethod
+    def result(self, done, length):
+        """
+        Return the CheckerResult for the events fed so far.
+
+        Parameters
+        ----------
+        done : bool
+            True if the trace is completed, False if further events can still be fed.
+        length : int
+            the number of events of the trace (fed or not) seen so far.
+        """
+
+    def check(self, trace, done):
+        """
+        Feed the relevant events of the whole trace to the checker and return its result.
+        """
+        first = trace[0] if len(trace) > 0 else None
+        prev = None
+        for index, event in enumerate(trace):
+            if event["concept:name"] in self.activities:
+                self.context.set_event(index, event)
+                self.update(index, event, first, prev)
+            prev = event
+        return self.result(done, len(trace))
+
+    def is_activated(self, event, first=None):
+        # Activation conditions reading only A are evaluated once per event for all the checkers of the trace
+        if self.activation_rules.names <= ACTIVATION_NAMES:
+            return self.context.is_activated(self.activation_rules, event)
+        return self.activation_rules(event, first)
+
+    def in_time_window(self, A, T):
+        return self.time_window is None or self.context.in_time_window(self.time_window, A, T)
@@ -1,66 +1,77 @@
 from ..enums import TraceState
 from ..models import CheckerResult
-from ..parsers import parse_data_cond, parse_time_cond
-from datetime import timedelta
-
-# Defining global and local functions/variables to use within eval() to prevent code injection
-glob = {'__builtins__': None}
+from ..parsers import compile_data_cond, compile_time_window
+from .base import ConstraintChecker
 
 
 # mp-choice constraint checker
 # Description:
-def mp_choice(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    time_rule = parse_time_cond(rules["time"])
+class ChoiceChecker(ConstraintChecker):
+    def __init__(self, a, b, rules):
+        super().__init__(a, b)
+        self.activation_rules = compile_data_cond(rules["activation"])
+        self.time_window = compile_time_window(rules["time"])
+        self.a_or_b_occurs = False
+
+    def update(self, index, event, first, prev):
+        if not self.a_or_b_occurs:
+            if self.is_activated(event, first) and self.in_time_window(event, first):
+                self.a_or_b_occurs = True
 
-    a_or_b_occurs = False
-    for A in trace:
-        if A["concept:name"] == a or A["concept:name"] == b:
-            locl = {'A': A, 'T': trace[0], 'timedelta': timedelta, 'abs': abs, 'float': float}
-            if eval(activation_rules, glob, locl) and eval(time_rule, glob, locl):
-                a_or_b_occurs = True
-                break
+    def result(self, done, length):
+        a_or_b_occurs = self.a_or_b_occurs
+        state = None
+        if not done and not a_or_b_occurs:
+            state = TraceState.POSSIBLY_VIOLATED
+        elif done and not a_or_b_occurs:
+            state = TraceState.VIOLATED
+        elif a_or_b_occurs:
+            state = TraceState.SATISFIED
 
-    state = None
-    if not done and not a_or_b_occurs:
-        state = TraceState.POSSIBLY_VIOLATED
-    elif done and not a_or_b_occurs:
-        state = TraceState.VIOLATED
-    elif a_or_b_occurs:
-        state = TraceState.SATISFIED
+        return CheckerResult(num_fulfillments=None, num_violations=None, num_pendings=None, num_activations=None,
+                             state=state)
 
-    return CheckerResult(num_fulfillments=None, num_violations=None, num_pendings=None, num_activations=None,
-                         state=state)
+
+def mp_choice(trace, done, a, b, rules):
+    return ChoiceChecker(a, b, rules).check(trace, done)
 
 
 # mp-exclusive-choice constraint checker
 # Description:
-def mp_exclusive_choice(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    time_rule = parse_time_cond(rules["time"])
+class ExclusiveChoiceChecker(ConstraintChecker):
+    def __init__(self, a, b, rules):
+        super().__init__(a, b)
+        self.a = a
+        self.b = b
+        self.activation_rules = compile_data_cond(rules["activation"])
+        self.time_window = compile_time_window(rules["time"])
+        self.a_occurs = False
+        self.b_occurs = False
+
+    def update(self, index, event, first, prev):
+        if not self.a_occurs and event["concept:name"] == self.a:
+            if self.is_activated(event, first) and self.in_time_window(event, first):
+                self.a_occurs = True
+        if not self.b_occurs and event["concept:name"] == self.b:
+            if self.is_activated(event, first) and self.in_time_window(event, first):
+                self.b_occurs = True
 
-    a_occurs = False
-    b_occurs = False
-    for A in trace:
-        locl = {'A': A, 'T': trace[0], 'timedelta': timedelta, 'abs': abs, 'float': float}
-        if not a_occurs and A["concept:name"] == a:
-            if eval(activation_rules, glob, locl) and eval(time_rule, glob, locl):
-                a_occurs = True
-        if not b_occurs and A["concept:name"] == b:
-            if eval(activation_rules, glob, locl) and eval(time_rule, glob, locl):
-                b_occurs = True
-        if a_occurs and b_occurs:
-            break
+    def result(self, done, length):
+        a_occurs = self.a_occurs
+        b_occurs = self.b_occurs
+        state = None
+        if not done and (not a_occurs and not b_occurs):
+            state = TraceState.POSSIBLY_VIOLATED
+        elif not done and (a_occurs ^ b_occurs):
+            state = TraceState.POSSIBLY_SATISFIED
+        elif (a_occurs and b_occurs) or (done and (not a_occurs and not b_occurs)):
+            state = TraceState.VIOLATED
+        elif done and (a_occurs ^ b_occurs):
+            state = TraceState.SATISFIED
 
-    state = None
-    if not done and (not a_occurs and not b_occurs):
-        state = TraceState.POSSIBLY_VIOLATED
-    elif not done and (a_occurs ^ b_occurs):
-        state = TraceState.POSSIBLY_SATISFIED
-    elif (a_occurs and b_occurs) or (done and (not a_occurs and not b_occurs)):
-        state = TraceState.VIOLATED
-    elif done and (a_occurs ^ b_occurs):
-        state = TraceState.SATISFIED
+        return CheckerResult(num_fulfillments=None, num_violations=None, num_pendings=None, num_activations=None,
+                             state=state)
 
-    return CheckerResult(num_fulfillments=None, num_violations=None, num_pendings=None, num_activations=None,
-                         state=state)
+
+def mp_exclusive_choice(trace, done, a, b, rules):
+    return ExclusiveChoiceChecker(a, b, rules).check(trace, done)
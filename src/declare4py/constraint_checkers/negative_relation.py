@@ -1,249 +1,190 @@
+from abc import abstractmethod
+
 from ..enums import TraceState
 from ..models import CheckerResult
-from ..parsers import parse_data_cond, parse_time_cond
-from datetime import timedelta
+from .relation import RelationChecker
+
+
+class NegativeRelationChecker(RelationChecker):
+    # Common result computation of the negative templates
+    def result(self, done, length):
+        num_fulfillments, num_violations, num_pendings, num_activations = self.counters(done, length)
+        vacuous_satisfaction = self.vacuous_satisfaction
+        state = None
+
+        if not vacuous_satisfaction and num_activations == 0:
+            if done:
+                state = TraceState.VIOLATED
+            else:
+                state = TraceState.POSSIBLY_VIOLATED
+        elif not done and num_violations == 0:
+            state = TraceState.POSSIBLY_SATISFIED
+        elif num_violations > 0:
+            state = TraceState.VIOLATED
+        elif done and num_violations == 0:
+            state = TraceState.SATISFIED
+
+        return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations,
+                             num_pendings=num_pendings, num_activations=num_activations, state=state)
 
-# Defining global and local functions/variables to use within eval() to prevent code injection
-glob = {'__builtins__': None}
+    @abstractmethod
+    def counters(self, done, length):
+        """
+        Return the number of fulfillments, violations, pendings and activations.
+        """
 
 
 # mp-not-responded-existence constraint checker
 # Description:
-def mp_not_responded_existence(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
-
-    pendings = []
-    num_fulfillments = 0
-    num_violations = 0
-    num_pendings = 0
-
-    for event in trace:
-        if event["concept:name"] == a:
-            locl = {'A': event}
-            if eval(activation_rules, glob, locl):
-                pendings.append(event)
-
-    for event in trace:
-        if not pendings:
-            break
-
-        if event["concept:name"] == b:
-            for A in reversed(pendings):
-                locl = {'A': A, 'T': event, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                    pendings.remove(A)
-                    num_violations += 1
-
-    if done:
-        num_fulfillments = len(pendings)
-    else:
-        num_pendings = len(pendings)
-
-    num_activations = num_fulfillments + num_violations + num_pendings
-    vacuous_satisfaction = rules["vacuous_satisfaction"]
-    state = None
-
-    if not vacuous_satisfaction and num_activations == 0:
+class NotRespondedExistenceChecker(NegativeRelationChecker):
+    def __init__(self, a, b, rules):
+        super().__init__(a, b, rules)
+        self.pendings = self.event_buckets(self.activation_keys)
+        self.targets = self.event_buckets(self.target_keys)
+        self.num_violations = 0
+
+    def update(self, index, event, first, prev):
+        # An activation is violated by any target of the trace, no matter if it occurs before or after it
+        if event["concept:name"] == self.a and self.is_activated(event):
+            if self.targets.any(lambda T: self.correlation_rules(event, T), self.timestamp(event)):
+                self.num_violations += 1
+            else:
+                self.pendings.add(event, self.timestamp(event))
+
+        if event["concept:name"] == self.b:
+            if self.pendings:
+                self.num_violations += self.pendings.remove_if(lambda A: self.correlation_rules(A, event),
+                                                               self.timestamp(event))
+            self.targets.add(event, self.timestamp(event))
+
+    def counters(self, done, length):
+        num_fulfillments = 0
+        num_pendings = 0
         if done:
-            state = TraceState.VIOLATED
+            num_fulfillments = len(self.pendings)
         else:
-            state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_violations == 0:
-        state = TraceState.POSSIBLY_SATISFIED
-    elif num_violations > 0:
-        state = TraceState.VIOLATED
-    elif done and num_violations == 0:
-        state = TraceState.SATISFIED
+            num_pendings = len(self.pendings)
 
-    return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations, num_pendings=num_pendings,
-                         num_activations=num_activations, state=state)
+        num_activations = num_fulfillments + self.num_violations + num_pendings
+        return num_fulfillments, self.num_violations, num_pendings, num_activations
+
+
+def mp_not_responded_existence(trace, done, a, b, rules):
+    return NotRespondedExistenceChecker(a, b, rules).check(trace, done)
 
 
 # mp-not-response constraint checker
 # Description:
-def mp_not_response(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
-
-    pendings = []
-    num_fulfillments = 0
-    num_violations = 0
-    num_pendings = 0
-
-    for event in trace:
-        if event["concept:name"] == a:
-            locl = {'A': event}
-            if eval(activation_rules, glob, locl):
-                pendings.append(event)
-
-        if pendings and event["concept:name"] == b:
-            for A in reversed(pendings):
-                locl = {'A': A, 'T': event, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                    pendings.remove(A)
-                    num_violations += 1
-
-    if done:
-        num_fulfillments = len(pendings)
-    else:
-        num_pendings = len(pendings)
-
-    num_activations = num_fulfillments + num_violations + num_pendings
-    vacuous_satisfaction = rules["vacuous_satisfaction"]
-    state = None
-
-    if not vacuous_satisfaction and num_activations == 0:
+class NotResponseChecker(NegativeRelationChecker):
+    def __init__(self, a, b, rules):
+        super().__init__(a, b, rules)
+        self.pendings = self.event_buckets(self.activation_keys)
+        self.num_violations = 0
+
+    def update(self, index, event, first, prev):
+        if event["concept:name"] == self.a and self.is_activated(event):
+            self.pendings.add(event, self.timestamp(event))
+
+        if self.pendings and event["concept:name"] == self.b:
+            self.num_violations += self.pendings.remove_if(lambda A: self.correlation_rules(A, event),
+                                                           self.timestamp(event))
+
+    def counters(self, done, length):
+        num_fulfillments = 0
+        num_pendings = 0
         if done:
-            state = TraceState.VIOLATED
+            num_fulfillments = len(self.pendings)
         else:
-            state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_violations == 0:
-        state = TraceState.POSSIBLY_SATISFIED
-    elif num_violations > 0:
-        state = TraceState.VIOLATED
-    elif done and num_violations == 0:
-        state = TraceState.SATISFIED
+            num_pendings = len(self.pendings)
+
+        num_activations = num_fulfillments + self.num_violations + num_pendings
+        return num_fulfillments, self.num_violations, num_pendings, num_activations
 
-    return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations, num_pendings=num_pendings,
-                         num_activations=num_activations, state=state)
+
+def mp_not_response(trace, done, a, b, rules):
+    return NotResponseChecker(a, b, rules).check(trace, done)
 
 
 # mp-not-chain-response constraint checker
 # Description:
-def mp_not_chain_response(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
+class NotChainResponseChecker(NegativeRelationChecker):
+    # The last activation is pending only until the next event of the trace
+    depends_on_length = True
 
-    num_activations = 0
-    num_violations = 0
-    num_pendings = 0
+    def __init__(self, a, b, rules):
+        super().__init__(a, b, rules)
+        self.last_activation = None
+        self.num_activations = 0
+        self.num_violations = 0
 
-    for index, event in enumerate(trace):
+    def update(self, index, event, first, prev):
+        # The target is checked before the activation, as the same event can violate the previous activation
+        if event["concept:name"] == self.b and self.last_activation == index - 1:
+            if self.is_correlated(prev, event):
+                self.num_violations += 1
 
-        if event["concept:name"] == a:
-            locl = {'A': event}
+        if event["concept:name"] == self.a and self.is_activated(event):
+            self.num_activations += 1
+            self.last_activation = index
 
-            if eval(activation_rules, glob, locl):
-                num_activations += 1
+    def counters(self, done, length):
+        num_pendings = 0
+        if not done and self.last_activation == length - 1:
+            num_pendings = 1
 
-                if index < len(trace) - 1:
-                    if trace[index+1]["concept:name"] == b:
-                        locl = {'A': event, 'T': trace[index+1], 'timedelta': timedelta, 'abs': abs, 'float': float}
-                        if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                            num_violations += 1
-                else:
-                    if not done:
-                        num_pendings = 1
+        num_fulfillments = self.num_activations - self.num_violations - num_pendings
+        return num_fulfillments, self.num_violations, num_pendings, self.num_activations
 
-    num_fulfillments = num_activations - num_violations - num_pendings
-    vacuous_satisfaction = rules["vacuous_satisfaction"]
-    state = None
-
-    if not vacuous_satisfaction and num_activations == 0:
-        if done:
-            state = TraceState.VIOLATED
-        else:
-            state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_violations == 0:
-        state = TraceState.POSSIBLY_SATISFIED
-    elif num_violations > 0:
-        state = TraceState.VIOLATED
-    elif done and num_violations == 0:
-        state = TraceState.SATISFIED
 
-    return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations, num_pendings=num_pendings,
-                         num_activations=num_activations, state=state)
+def mp_not_chain_response(trace, done, a, b, rules):
+    return NotChainResponseChecker(a, b, rules).check(trace, done)
 
 
 # mp-not-precedence constraint checker
 # Description:
-def mp_not_precedence(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
-
-    num_activations = 0
-    num_violations = 0
-    Ts = []
+class NotPrecedenceChecker(NegativeRelationChecker):
+    def __init__(self, a, b, rules):
+        super().__init__(a, b, rules)
+        self.Ts = self.event_buckets(self.target_keys)
+        self.num_activations = 0
+        self.num_violations = 0
 
-    for event in trace:
-        if event["concept:name"] == a:
-            Ts.append(event)
+    def update(self, index, event, first, prev):
+        if event["concept:name"] == self.a:
+            self.Ts.add(event, self.timestamp(event))
 
-        if event["concept:name"] == b:
-            locl = {'A': event}
+        if event["concept:name"] == self.b and self.is_activated(event):
+            self.num_activations += 1
+            if self.Ts.any(lambda T: self.correlation_rules(event, T), self.timestamp(event)):
+                self.num_violations += 1
 
-            if eval(activation_rules, glob, locl):
-                num_activations += 1
+    def counters(self, done, length):
+        return self.num_activations - self.num_violations, self.num_violations, None, self.num_activations
 
-                for T in Ts:
-                    locl = {'A': event, 'T': T, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                    if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                        num_violations += 1
-                        break
 
-    num_fulfillments = num_activations - num_violations
-    vacuous_satisfaction = rules["vacuous_satisfaction"]
-    state = None
-
-    if not vacuous_satisfaction and num_activations == 0:
-        if done:
-            state = TraceState.VIOLATED
-        else:
-            state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_violations == 0:
-        state = TraceState.POSSIBLY_SATISFIED
-    elif num_violations > 0:
-        state = TraceState.VIOLATED
-    elif done and num_violations == 0:
-        state = TraceState.SATISFIED
-
-    return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations, num_pendings=None,
-                         num_activations=num_activations, state=state)
+def mp_not_precedence(trace, done, a, b, rules):
+    return NotPrecedenceChecker(a, b, rules).check(trace, done)
 
 
 # mp-not-chain-precedence constraint checker
 # Description:
-def mp_not_chain_precedence(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
-
-    num_activations = 0
-    num_violations = 0
-
-    for index, event in enumerate(trace):
-
-        if event["concept:name"] == b:
-            locl = {'A': event}
+class NotChainPrecedenceChecker(NegativeRelationChecker):
+    def __init__(self, a, b, rules):
+        super().__init__(a, b, rules)
+        # Only activations need to be fed, the preceding event is always given
+        self.activities = (b,)
+        self.num_activations = 0
+        self.num_violations = 0
 
-            if eval(activation_rules, glob, locl):
-                num_activations += 1
+    def update(self, index, event, first, prev):
+        if self.is_activated(event):
+            self.num_activations += 1
+            if index != 0 and prev["concept:name"] == self.a and self.is_correlated(event, prev):
+                self.num_violations += 1
 
-                if index != 0 and trace[index-1]["concept:name"] == a:
-                    locl = {'A': event, 'T': trace[index-1], 'timedelta': timedelta, 'abs': abs, 'float': float}
-                    if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                        num_violations += 1
+    def counters(self, done, length):
+        return self.num_activations - self.num_violations, self.num_violations, None, self.num_activations
 
-    num_fulfillments = num_activations - num_violations
-    vacuous_satisfaction = rules["vacuous_satisfaction"]
-    state = None
 
-    if not vacuous_satisfaction and num_activations == 0:
-        if done:
-            state = TraceState.VIOLATED
-        else:
-            state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_violations == 0:
-        state = TraceState.POSSIBLY_SATISFIED
-    elif num_violations > 0:
-        state = TraceState.VIOLATED
-    elif done and num_violations == 0:
-        state = TraceState.SATISFIED
-
-    return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations, num_pendings=None,
-                         num_activations=num_activations, state=state)
+def mp_not_chain_precedence(trace, done, a, b, rules):
+    return NotChainPrecedenceChecker(a, b, rules).check(trace, done)
@@ -1,10 +1,117 @@
+from bisect import bisect_left, bisect_right, insort
+
 from ..enums import TraceState
 from ..models import CheckerResult
-from ..parsers import parse_data_cond, parse_time_cond
-from datetime import timedelta
-
-# Defining global and local functions/variables to use within eval() to prevent code injection
-glob = {'__builtins__': None}
+from ..parsers import compile_data_cond, compile_time_window, correlation_keys
+from .base import ConstraintChecker
+
+
+class EventBuckets:
+    # Multiset of events grouped by the values of the attribute keys read by the correlation condition. The condition
+    # gives the same result for all the events of a group, which are then checked only once through the first event of
+    # the group. Each event is a group of its own if the read keys are unknown (None). With a time window, each group
+    # keeps the timestamps of its events in sorted order, and the events within the window of another event are found
+    # by bisection
+    def __init__(self, keys, time_window=None):
+        self.keys = keys
+        self.time_window = time_window
+        self.buckets = {}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _bucket_key(self, event):
+        if self.keys is None:
+            return object()
+        # The presence of the key is part of the group, as the condition checks it
+        key = tuple((k in event, event[k] if k in event else None) for k in self.keys)
+        try:
+            hash(key)
+        except TypeError:   # Unhashable attribute values, e.g. lists
+            return object()
+        return key
+
+    def _window_ranges(self, timestamps, timestamp):
+        # Index ranges of the sorted timestamps whose distance from 'timestamp' is within the time window, the later
+        # range first
+        min_td, max_td = self.time_window
+        if min_td <= 0:
+            bounds = [(timestamp - max_td, timestamp + max_td)]
+        else:
+            bounds = [(timestamp + min_td, timestamp + max_td), (timestamp - max_td, timestamp - min_td)]
+        return [(bisect_left(timestamps, low), bisect_right(timestamps, high)) for low, high in bounds]
+
+    def add(self, event, timestamp=None):
+        # The timestamp of the event is needed only with a time window
+        bucket = self.buckets.setdefault(self._bucket_key(event), [event, 0, []])
+        bucket[1] += 1
+        self.size += 1
+        if self.time_window is not None:
+            timestamps = bucket[2]
+            if not timestamps or timestamps[-1] <= timestamp:
+                timestamps.append(timestamp)
+            else:
+                insort(timestamps, timestamp)
+
+    def clear(self):
+        self.buckets = {}
+        self.size = 0
+
+    def any(self, predicate, timestamp=None):
+        # Whether an event satisfies the predicate and, with a time window, is within the window of 'timestamp'
+        for event, _, timestamps in self.buckets.values():
+            if predicate(event) and (self.time_window is None or
+                                     any(start < stop for start, stop in self._window_ranges(timestamps, timestamp))):
+                return True
+        return False
+
+    def remove_if(self, predicate, timestamp=None):
+        # Remove the events satisfying the predicate and, with a time window, within the window of 'timestamp', then
+        # return their number
+        kept = {}
+        removed = 0
+        for key, bucket in self.buckets.items():
+            if predicate(bucket[0]):
+                if self.time_window is None:
+                    removed += bucket[1]
+                    continue
+                timestamps = bucket[2]
+                for start, stop in self._window_ranges(timestamps, timestamp):
+                    if start < stop:
+                        del timestamps[start:stop]
+                        removed += stop - start
+                bucket[1] = len(timestamps)
+                if not timestamps:
+                    continue
+            kept[key] = bucket
+        self.buckets = kept
+        self.size -= removed
+        return removed
+
+
+class RelationChecker(ConstraintChecker):
+    # Common initialization of the checkers of binary templates
+    def __init__(self, a, b, rules):
+        super().__init__(a, b)
+        self.a = a
+        self.b = b
+        self.activation_rules = compile_data_cond(rules["activation"])
+        self.correlation_rules = compile_data_cond(rules["correlation"])
+        self.time_window = compile_time_window(rules["time"])
+        self.activation_keys, self.target_keys = correlation_keys(rules["correlation"])
+        self.vacuous_satisfaction = rules["vacuous_satisfaction"]
+
+    def is_correlated(self, A, T):
+        return self.correlation_rules(A, T) and self.in_time_window(A, T)
+
+    def event_buckets(self, keys):
+        # Buckets of activations or targets, whose time window is checked by the buckets themselves
+        return EventBuckets(keys, self.time_window)
+
+    def timestamp(self, event):
+        # Timestamp of the event for the buckets, None without time window
+        return None if self.time_window is None else self.context.timestamp(event)
 
 
 # mp-responded-existence constraint checker
@@ -13,58 +120,60 @@ glob = {'__builtins__': None}
 # respondedExistence(a, b) indicates that, if event a occurs in the trace
 # then event b occurs in the trace as well.
 # Event a activates the constraint.
-def mp_responded_existence(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
-
-    pendings = []
-    num_fulfillments = 0
-    num_violations = 0
-    num_pendings = 0
-
-    for event in trace:
-        if event["concept:name"] == a:
-            locl = {'A': event}
-            if eval(activation_rules, glob, locl):
-                pendings.append(event)
-
-    for event in trace:
-        if not pendings:
-            break
-
-        if event["concept:name"] == b:
-            for A in reversed(pendings):
-                locl = {'A': A, 'T': event, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                    pendings.remove(A)
-                    num_fulfillments += 1
-
-    if done:
-        num_violations = len(pendings)
-    else:
-        num_pendings = len(pendings)
-
-    num_activations = num_fulfillments + num_violations + num_pendings
-    vacuous_satisfaction = rules["vacuous_satisfaction"]
-    state = None
-
-    if not vacuous_satisfaction and num_activations == 0:
+class RespondedExistenceChecker(RelationChecker):
+    def __init__(self, a, b, rules):
+        super().__init__(a, b, rules)
+        self.pendings = self.event_buckets(self.activation_keys)
+        self.targets = self.event_buckets(self.target_keys)
+        self.num_fulfillments = 0
+
+    def update(self, index, event, first, prev):
+        # An activation is fulfilled by any target of the trace, no matter if it occurs before or after it
+        if event["concept:name"] == self.a and self.is_activated(event):
+            if self.targets.any(lambda T: self.correlation_rules(event, T), self.timestamp(event)):
+                self.num_fulfillments += 1
+            else:
+                self.pendings.add(event, self.timestamp(event))
+
+        if event["concept:name"] == self.b:
+            if self.pendings:
+                self.num_fulfillments += self.pendings.remove_if(lambda A: self.correlation_rules(A, event),
+                                                                 self.timestamp(event))
+            self.targets.add(event, self.timestamp(event))
+
+    def result(self, done, length):
+        num_fulfillments = self.num_fulfillments
+        num_violations = 0
+        num_pendings = 0
         if done:
-            state = TraceState.VIOLATED
+            num_violations = len(self.pendings)
         else:
+            num_pendings = len(self.pendings)
+
+        num_activations = num_fulfillments + num_violations + num_pendings
+        vacuous_satisfaction = self.vacuous_satisfaction
+        state = None
+
+        if not vacuous_satisfaction and num_activations == 0:
+            if done:
+                state = TraceState.VIOLATED
+            else:
+                state = TraceState.POSSIBLY_VIOLATED
+        elif not done and num_violations > 0:
             state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_violations > 0:
-        state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_violations == 0:
-        state = TraceState.POSSIBLY_SATISFIED
-    elif done and num_violations > 0:
-        state = TraceState.VIOLATED
-    elif done and num_violations == 0:
-        state = TraceState.SATISFIED
+        elif not done and num_violations == 0:
+            state = TraceState.POSSIBLY_SATISFIED
+        elif done and num_violations > 0:
+            state = TraceState.VIOLATED
+        elif done and num_violations == 0:
+            state = TraceState.SATISFIED
+
+        return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations,
+                             num_pendings=num_pendings, num_activations=num_activations, state=state)
+
 
-    return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations, num_pendings=num_pendings,
-                         num_activations=num_activations, state=state)
+def mp_responded_existence(trace, done, a, b, rules):
+    return RespondedExistenceChecker(a, b, rules).check(trace, done)
 
 
 # mp-response constraint checker
@@ -72,54 +181,53 @@ def mp_responded_existence(trace, done, a, b, rules):
 # The future constraining constraint response(a, b) indicates that
 # if event a occurs in the trace, then event b occurs after a.
 # Event a activates the constraint.
-def mp_response(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
-
-    pendings = []
-    num_fulfillments = 0
-    num_violations = 0
-    num_pendings = 0
-
-    for event in trace:
-        if event["concept:name"] == a:
-            locl = {'A': event}
-            if eval(activation_rules, glob, locl):
-                pendings.append(event)
-
-        if pendings and event["concept:name"] == b:
-            for A in reversed(pendings):
-                locl = {'A': A, 'T': event, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                    pendings.remove(A)
-                    num_fulfillments += 1
-
-    if done:
-        num_violations = len(pendings)
-    else:
-        num_pendings = len(pendings)
-
-    num_activations = num_fulfillments + num_violations + num_pendings
-    vacuous_satisfaction = rules["vacuous_satisfaction"]
-    state = None
-
-    if not vacuous_satisfaction and num_activations == 0:
+class ResponseChecker(RelationChecker):
+    def __init__(self, a, b, rules):
+        super().__init__(a, b, rules)
+        self.pendings = self.event_buckets(self.activation_keys)
+        self.num_fulfillments = 0
+
+    def update(self, index, event, first, prev):
+        if event["concept:name"] == self.a and self.is_activated(event):
+            self.pendings.add(event, self.timestamp(event))
+
+        if self.pendings and event["concept:name"] == self.b:
+            self.num_fulfillments += self.pendings.remove_if(lambda A: self.correlation_rules(A, event),
+                                                             self.timestamp(event))
+
+    def result(self, done, length):
+        num_fulfillments = self.num_fulfillments
+        num_violations = 0
+        num_pendings = 0
         if done:
-            state = TraceState.VIOLATED
+            num_violations = len(self.pendings)
         else:
+            num_pendings = len(self.pendings)
+
+        num_activations = num_fulfillments + num_violations + num_pendings
+        vacuous_satisfaction = self.vacuous_satisfaction
+        state = None
+
+        if not vacuous_satisfaction and num_activations == 0:
+            if done:
+                state = TraceState.VIOLATED
+            else:
+                state = TraceState.POSSIBLY_VIOLATED
+        elif not done and num_pendings > 0:
             state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_pendings > 0:
-        state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_pendings == 0:
-        state = TraceState.POSSIBLY_SATISFIED
-    elif done and num_violations > 0:
-        state = TraceState.VIOLATED
-    elif done and num_violations == 0:
-        state = TraceState.SATISFIED
+        elif not done and num_pendings == 0:
+            state = TraceState.POSSIBLY_SATISFIED
+        elif done and num_violations > 0:
+            state = TraceState.VIOLATED
+        elif done and num_violations == 0:
+            state = TraceState.SATISFIED
 
-    return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations, num_pendings=num_pendings,
-                         num_activations=num_activations, state=state)
+        return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations,
+                             num_pendings=num_pendings, num_activations=num_activations, state=state)
+
+
+def mp_response(trace, done, a, b, rules):
+    return ResponseChecker(a, b, rules).check(trace, done)
 
 
 # mp-alternate-response constraint checker
@@ -128,52 +236,54 @@ def mp_response(trace, done, a, b, rules):
 # each time event a occurs in the trace then event b occurs afterwards
 # before event a recurs.
 # Event a activates the constraint.
-def mp_alternate_response(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
-
-    pending = None
-    num_activations = 0
-    num_fulfillments = 0
-    num_pendings = 0
-
-    for event in trace:
-        if event["concept:name"] == a:
-            locl = {'A': event}
-            if eval(activation_rules, glob, locl):
-                pending = event
-                num_activations += 1
-
-        if event["concept:name"] == b and pending is not None:
-            locl = {'A': pending, 'T': event, 'timedelta': timedelta, 'abs': abs, 'float': float}
-            if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                pending = None
-                num_fulfillments += 1
-
-    if not done and pending is not None:
-        num_pendings = 1
-
-    num_violations = num_activations - num_fulfillments - num_pendings
-    vacuous_satisfaction = rules["vacuous_satisfaction"]
-    state = None
-
-    if not vacuous_satisfaction and num_activations == 0:
-        if done:
-            state = TraceState.VIOLATED
-        else:
+class AlternateResponseChecker(RelationChecker):
+    def __init__(self, a, b, rules):
+        super().__init__(a, b, rules)
+        self.pending = None
+        self.num_activations = 0
+        self.num_fulfillments = 0
+
+    def update(self, index, event, first, prev):
+        if event["concept:name"] == self.a and self.is_activated(event):
+            self.pending = event
+            self.num_activations += 1
+
+        if event["concept:name"] == self.b and self.pending is not None:
+            if self.is_correlated(self.pending, event):
+                self.pending = None
+                self.num_fulfillments += 1
+
+    def result(self, done, length):
+        num_activations = self.num_activations
+        num_fulfillments = self.num_fulfillments
+        num_pendings = 0
+        if not done and self.pending is not None:
+            num_pendings = 1
+
+        num_violations = num_activations - num_fulfillments - num_pendings
+        vacuous_satisfaction = self.vacuous_satisfaction
+        state = None
+
+        if not vacuous_satisfaction and num_activations == 0:
+            if done:
+                state = TraceState.VIOLATED
+            else:
+                state = TraceState.POSSIBLY_VIOLATED
+        elif not done and num_violations == 0 and num_pendings > 0:
             state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_violations == 0 and num_pendings > 0:
-        state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_violations == 0 and num_pendings == 0:
-        state = TraceState.POSSIBLY_SATISFIED
-    elif num_violations > 0 or (done and num_pendings > 0):
-        state = TraceState.VIOLATED
-    elif done and num_violations == 0 and num_pendings == 0:
-        state = TraceState.SATISFIED
+        elif not done and num_violations == 0 and num_pendings == 0:
+            state = TraceState.POSSIBLY_SATISFIED
+        elif num_violations > 0 or (done and num_pendings > 0):
+            state = TraceState.VIOLATED
+        elif done and num_violations == 0 and num_pendings == 0:
+            state = TraceState.SATISFIED
 
-    return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations, num_pendings=num_pendings,
-                         num_activations=num_activations, state=state)
+        return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations,
+                             num_pendings=num_pendings, num_activations=num_activations, state=state)
+
+
+def mp_alternate_response(trace, done, a, b, rules):
+    return AlternateResponseChecker(a, b, rules).check(trace, done)
 
 
 # mp-chain-response constraint checker
@@ -181,101 +291,107 @@ def mp_alternate_response(trace, done, a, b, rules):
 # The future constraining constraint chain_response(a, b) indicates that,
 # each time event a occurs in the trace, event b occurs immediately afterwards.
 # Event a activates the constraint.
-def mp_chain_response(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
-
-    num_activations = 0
-    num_fulfillments = 0
-    num_pendings = 0
-
-    for index, event in enumerate(trace):
-
-        if event["concept:name"] == a:
-            locl = {'A': event}
-
-            if eval(activation_rules, glob, locl):
-                num_activations += 1
+class ChainResponseChecker(RelationChecker):
+    # The last activation is pending only until the next event of the trace
+    depends_on_length = True
+
+    def __init__(self, a, b, rules):
+        super().__init__(a, b, rules)
+        self.last_activation = None
+        self.num_activations = 0
+        self.num_fulfillments = 0
+
+    def update(self, index, event, first, prev):
+        # The target is checked before the activation, as the same event can fulfill the previous activation
+        if event["concept:name"] == self.b and self.last_activation == index - 1:
+            if self.is_correlated(prev, event):
+                self.num_fulfillments += 1
+
+        if event["concept:name"] == self.a and self.is_activated(event):
+            self.num_activations += 1
+            self.last_activation = index
+
+    def result(self, done, length):
+        num_activations = self.num_activations
+        num_fulfillments = self.num_fulfillments
+        num_pendings = 0
+        if not done and self.last_activation == length - 1:
+            num_pendings = 1
+
+        num_violations = num_activations - num_fulfillments - num_pendings
+        vacuous_satisfaction = self.vacuous_satisfaction
+        state = None
+
+        if not vacuous_satisfaction and num_activations == 0:
+            if done:
+                state = TraceState.VIOLATED
+            else:
+                state = TraceState.POSSIBLY_VIOLATED
+        elif not done and num_violations == 0 and num_pendings > 0:
+            state = TraceState.POSSIBLY_VIOLATED
+        elif not done and num_violations == 0 and num_pendings == 0:
+            state = TraceState.POSSIBLY_SATISFIED
+        elif num_violations > 0 or (done and num_pendings > 0):
+            state = TraceState.VIOLATED
+        elif done and num_violations == 0 and num_pendings == 0:
+            state = TraceState.SATISFIED
 
-                if index < len(trace) - 1:
-                    if trace[index+1]["concept:name"] == b:
-                        locl = {'A': event, 'T': trace[index+1], 'timedelta': timedelta, 'abs': abs, 'float': float}
-                        if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                            num_fulfillments += 1
-                else:
-                    if not done:
-                        num_pendings = 1
+        return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations,
+                             num_pendings=num_pendings, num_activations=num_activations, state=state)
 
-    num_violations = num_activations - num_fulfillments - num_pendings
-    vacuous_satisfaction = rules["vacuous_satisfaction"]
-    state = None
 
-    if not vacuous_satisfaction and num_activations == 0:
-        if done:
+def mp_chain_response(trace, done, a, b, rules):
+    return ChainResponseChecker(a, b, rules).check(trace, done)
+
+
+class PrecedenceFamilyChecker(RelationChecker):
+    # Common result computation of the history-based templates activated by b, which never have pendings
+    def result(self, done, length):
+        num_activations = self.num_activations
+        num_fulfillments = self.num_fulfillments
+        num_violations = num_activations - num_fulfillments
+        vacuous_satisfaction = self.vacuous_satisfaction
+        state = None
+
+        if not vacuous_satisfaction and num_activations == 0:
+            if done:
+                state = TraceState.VIOLATED
+            else:
+                state = TraceState.POSSIBLY_VIOLATED
+        elif not done and num_violations == 0:
+            state = TraceState.POSSIBLY_SATISFIED
+        elif num_violations > 0:
             state = TraceState.VIOLATED
-        else:
-            state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_violations == 0 and num_pendings > 0:
-        state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_violations == 0 and num_pendings == 0:
-        state = TraceState.POSSIBLY_SATISFIED
-    elif num_violations > 0 or (done and num_pendings > 0):
-        state = TraceState.VIOLATED
-    elif done and num_violations == 0 and num_pendings == 0:
-        state = TraceState.SATISFIED
+        elif done and num_violations == 0:
+            state = TraceState.SATISFIED
 
-    return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations, num_pendings=num_pendings,
-                         num_activations=num_activations, state=state)
+        return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations, num_pendings=None,
+                             num_activations=num_activations, state=state)
 
 
 # mp-precedence constraint checker
 # Description:
 # The history-based constraint precedence(a,b) indicates that event b occurs
 # only in the trace, if preceded by a. Event b activates the constraint.
-def mp_precedence(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
+class PrecedenceChecker(PrecedenceFamilyChecker):
+    def __init__(self, a, b, rules):
+        super().__init__(a, b, rules)
+        self.Ts = self.event_buckets(self.target_keys)
+        self.num_activations = 0
+        self.num_fulfillments = 0
 
-    num_activations = 0
-    num_fulfillments = 0
-    Ts = []
+    def update(self, index, event, first, prev):
+        if event["concept:name"] == self.a:
+            self.Ts.add(event, self.timestamp(event))
 
-    for event in trace:
-        if event["concept:name"] == a:
-            Ts.append(event)
+        if event["concept:name"] == self.b and self.is_activated(event):
+            self.num_activations += 1
+            if self.Ts.any(lambda T: self.correlation_rules(event, T), self.timestamp(event)):
+                self.num_fulfillments += 1
 
-        if event["concept:name"] == b:
-            locl = {'A': event}
 
-            if eval(activation_rules, glob, locl):
-                num_activations += 1
-
-                for T in Ts:
-                    locl = {'A': event, 'T': T, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                    if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                        num_fulfillments += 1
-                        break
-
-    num_violations = num_activations - num_fulfillments
-    vacuous_satisfaction = rules["vacuous_satisfaction"]
-    state = None
-
-    if not vacuous_satisfaction and num_activations == 0:
-        if done:
-            state = TraceState.VIOLATED
-        else:
-            state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_violations == 0:
-        state = TraceState.POSSIBLY_SATISFIED
-    elif num_violations > 0:
-        state = TraceState.VIOLATED
-    elif done and num_violations == 0:
-        state = TraceState.SATISFIED
-
-    return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations, num_pendings=None,
-                         num_activations=num_activations, state=state)
+def mp_precedence(trace, done, a, b, rules):
+    return PrecedenceChecker(a, b, rules).check(trace, done)
 
 
 # mp-alternate-precedence constraint checker
@@ -284,48 +400,20 @@ def mp_precedence(trace, done, a, b, rules):
 # each time event b occurs in the trace
 # it is preceded by event a and no other event b can recur in between.
 # Event b activates the constraint.
-def mp_alternate_precedence(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
-
-    num_activations = 0
-    num_fulfillments = 0
-    Ts = []
-
-    for event in trace:
-        if event["concept:name"] == a:
-            Ts.append(event)
-
-        if event["concept:name"] == b:
-            locl = {'A': event}
-            if eval(activation_rules, glob, locl):
-                num_activations += 1
-                for T in Ts:
-                    locl = {'A': event, 'T': T, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                    if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                        num_fulfillments += 1
-                        break
-                Ts = []
-
-    num_violations = num_activations - num_fulfillments
-    vacuous_satisfaction = rules["vacuous_satisfaction"]
-    state = None
-
-    if not vacuous_satisfaction and num_activations == 0:
-        if done:
-            state = TraceState.VIOLATED
-        else:
-            state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_violations == 0:
-        state = TraceState.POSSIBLY_SATISFIED
-    elif num_violations > 0:
-        state = TraceState.VIOLATED
-    elif done and num_violations == 0:
-        state = TraceState.SATISFIED
+class AlternatePrecedenceChecker(PrecedenceChecker):
+    def update(self, index, event, first, prev):
+        if event["concept:name"] == self.a:
+            self.Ts.add(event, self.timestamp(event))
+
+        if event["concept:name"] == self.b and self.is_activated(event):
+            self.num_activations += 1
+            if self.Ts.any(lambda T: self.correlation_rules(event, T), self.timestamp(event)):
+                self.num_fulfillments += 1
+            self.Ts.clear()
 
-    return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations, num_pendings=None,
-                         num_activations=num_activations, state=state)
+
+def mp_alternate_precedence(trace, done, a, b, rules):
+    return AlternatePrecedenceChecker(a, b, rules).check(trace, done)
 
 
 # mp-chain-precedence constraint checker
@@ -333,41 +421,20 @@ def mp_alternate_precedence(trace, done, a, b, rules):
 # The history-based constraint chain_precedence(a, b) indicates that,
 # each time event b occurs in the trace, event a occurs immediately beforehand.
 # Event b activates the constraint.
-def mp_chain_precedence(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
-
-    num_activations = 0
-    num_fulfillments = 0
+class ChainPrecedenceChecker(PrecedenceFamilyChecker):
+    def __init__(self, a, b, rules):
+        super().__init__(a, b, rules)
+        # Only activations need to be fed, the preceding event is always given
+        self.activities = (b,)
+        self.num_activations = 0
+        self.num_fulfillments = 0
 
-    for index, event in enumerate(trace):
-        if event["concept:name"] == b:
-            locl = {'A': event}
+    def update(self, index, event, first, prev):
+        if self.is_activated(event):
+            self.num_activations += 1
+            if index != 0 and prev["concept:name"] == self.a and self.is_correlated(event, prev):
+                self.num_fulfillments += 1
 
-            if eval(activation_rules, glob, locl):
-                num_activations += 1
 
-                if index != 0 and trace[index-1]["concept:name"] == a:
-                    locl = {'A': event, 'T': trace[index-1], 'timedelta': timedelta, 'abs': abs, 'float': float}
-                    if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                        num_fulfillments += 1
-
-    num_violations = num_activations - num_fulfillments
-    vacuous_satisfaction = rules["vacuous_satisfaction"]
-    state = None
-
-    if not vacuous_satisfaction and num_activations == 0:
-        if done:
-            state = TraceState.VIOLATED
-        else:
-            state = TraceState.POSSIBLY_VIOLATED
-    elif not done and num_violations == 0:
-        state = TraceState.POSSIBLY_SATISFIED
-    elif num_violations > 0:
-        state = TraceState.VIOLATED
-    elif done and num_violations == 0:
-        state = TraceState.SATISFIED
-
-    return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations, num_pendings=None,
-                         num_activations=num_activations, state=state)
+def mp_chain_precedence(trace, done, a, b, rules):
+    return ChainPrecedenceChecker(a, b, rules).check(trace, done)
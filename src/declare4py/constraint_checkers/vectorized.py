@@ -0,0 +1,467 @@
+from functools import cache
+
+import numpy as np
+
+from ..enums import Template
+
+# Vectorized checkers working on a CompactLog for constraints without correlation conditions. The activation
+# condition, if any, is given as the boolean mask rules["activation_mask"] of the events that satisfy it (see
+# CompactLog.condition_mask). The checkers of TIME_WINDOW_TEMPLATES also support time conditions, given as the
+# bounds rules["time_window"] of the time distance in nanoseconds, on logs whose timestamps are sorted along the traces
+# (see CompactLog.sorted_timestamps). They check all the (completed) traces of the log at once and return the tuple
+#   (num_fulfillments, num_violations, num_pendings, num_activations, satisfied)
+# where each element is an array with one entry per trace, or None when the corresponding mp-checker does not
+# compute that quantity. 'satisfied' is True for SATISFIED traces and False for VIOLATED ones.
+
+
+def _occurrences(log, activity):
+    return log.events == log.activity_code(activity)
+
+
+def _activations(log, activity, rules):
+    # Events of the activity satisfying the activation condition
+    mask = _occurrences(log, activity)
+    if rules.get("activation_mask") is not None:
+        mask &= rules["activation_mask"]
+    return mask
+
+
+def _in_window(log, pos1, pos2, rules):
+    # True where the time distance between the events at the given positions is within the time window, if any
+    if rules.get("time_window") is None:
+        return np.ones(len(pos1), dtype=bool)
+    min_ns, max_ns = rules["time_window"]
+    distance = np.abs(log.timestamps[pos1] - log.timestamps[pos2])
+    return (min_ns <= distance) & (distance <= max_ns)
+
+
+def _activations_near_first(log, activity, rules):
+    # Activations within the time window from the first event of their trace, as the unary and choice templates
+    # apply time conditions to the activation and the first event
+    mask = _activations(log, activity, rules)
+    if rules.get("time_window") is not None:
+        idx = np.flatnonzero(mask)
+        mask[idx] = _in_window(log, idx, log.offsets[log.trace_ids[idx]], rules)
+    return mask
+
+
+def _search_ranges(values, start, stop, targets):
+    # Vectorized binary search: for each row, the first index in start:stop whose value is at least the target, stop
+    # if none. The values must be sorted within each range
+    lo, hi = start.copy(), stop.copy()
+    active = lo < hi
+    while active.any():
+        mid = (lo + hi) // 2
+        go_right = active & (values[np.minimum(mid, len(values) - 1)] < targets)
+        lo = np.where(go_right, mid + 1, lo)
+        hi = np.where(active & ~go_right, mid, hi)
+        active = lo < hi
+    return lo
+
+
+def _window_matched(log, mask_act, mask_target, window, direction):
+    # For each event selected by mask_act, True if an event selected by mask_target of the same trace is within the
+    # time window, looking at the events at the same position or 'after', at the same position or 'before', or at
+    # 'any' position. Since timestamps are sorted along the traces, the targets in range are found by binary search
+    # on their timestamps instead of checking each (activation, target) pair
+    # Distances are never negative, so a negative minimum is the same as 0
+    min_ns, max_ns = max(window[0], 0), window[1]
+    act_idx = np.flatnonzero(mask_act)
+    target_idx = np.flatnonzero(mask_target)
+    matched = np.zeros(len(act_idx), dtype=bool)
+    if len(target_idx) == 0 or max_ns < min_ns:
+        return matched
+
+    target_ts = log.timestamps[target_idx]
+    act_ts = log.timestamps[act_idx]
+    tids = log.trace_ids[act_idx]
+    start = np.searchsorted(target_idx, log.offsets[tids])
+    stop = np.searchsorted(target_idx, log.offsets[tids + 1])
+
+    def match_interval(start, stop, low, high):
+        # Whether a target in start:stop has a timestamp in [low, high]
+        found = _search_ranges(target_ts, start, stop, low)
+        return (found < stop) & (target_ts[np.minimum(found, len(target_ts) - 1)] <= high)
+
+    if direction in ('after', 'any'):
+        after_start = start if direction == 'any' else np.searchsorted(target_idx, act_idx)
+        matched |= match_interval(after_start, stop, act_ts + min_ns, act_ts + max_ns)
+    if direction in ('before', 'any'):
+        before_stop = stop if direction == 'any' else np.searchsorted(target_idx, act_idx, side='right')
+        matched |= match_interval(start, before_stop, act_ts - max_ns, act_ts - min_ns)
+    return matched
+
+
+def _count(log, mask):
+    return np.bincount(log.trace_ids[mask], minlength=len(log))
+
+
+def _first_last(log, mask):
+    # Position inside the log of the first and last events selected by the mask in each trace
+    idx = np.flatnonzero(mask)
+    return _first_last_positions(log, idx, log.trace_ids[idx])
+
+
+def _first_last_positions(log, idx, tids):
+    # Position inside the log of the first and last of the given sorted event positions in each trace
+    first = np.full(len(log), log.num_events, dtype=np.int64)
+    last = np.full(len(log), -1, dtype=np.int64)
+    if len(idx) > 0:
+        change = tids[1:] != tids[:-1]
+        starts = np.concatenate(([True], change))
+        ends = np.concatenate((change, [True]))
+        first[tids[starts]] = idx[starts]
+        last[tids[ends]] = idx[ends]
+    return first, last
+
+
+def _followed_by(log, mask_a, mask_b):
+    # Mask over the events of the log, True where an event selected by mask_a is immediately followed in the same
+    # trace by an event selected by mask_b
+    same_trace = log.trace_ids[:-1] == log.trace_ids[1:]
+    return mask_a[:-1] & mask_b[1:] & same_trace
+
+
+def _alternate_fulfillments(log, mask_a, mask_b):
+    # For each event selected by mask_b, True if at least one event selected by mask_a occurs after the previous
+    # mask_b event of the same trace (or the trace start) and up to the event itself
+    b_idx = np.flatnonzero(mask_b)
+    b_tids = log.trace_ids[b_idx]
+    cum_a = np.concatenate(([0], np.cumsum(mask_a)))
+    prev = np.empty_like(b_idx)
+    prev[1:] = b_idx[:-1]
+    first_of_trace = np.ones(len(b_idx), dtype=bool)
+    first_of_trace[1:] = b_tids[1:] != b_tids[:-1]
+    prev[first_of_trace] = log.offsets[b_tids[first_of_trace]] - 1
+    return b_tids, cum_a[b_idx + 1] - cum_a[prev + 1] > 0
+
+
+def _binary_result(num_fulfillments, num_violations, num_pendings, num_activations, rules):
+    satisfied = num_violations == 0
+    if not rules["vacuous_satisfaction"]:
+        satisfied &= num_activations > 0
+    return num_fulfillments, num_violations, num_pendings, num_activations, satisfied
+
+
+def _responded(log, mask_a, b, rules):
+    # Number of events selected by mask_a in each trace with an event of b anywhere in the trace (within the time
+    # window, if any)
+    if rules.get("time_window") is None:
+        return np.where(_count(log, _occurrences(log, b)) > 0, _count(log, mask_a), 0)
+    matched = _window_matched(log, mask_a, _occurrences(log, b), rules["time_window"], 'any')
+    return np.bincount(log.trace_ids[np.flatnonzero(mask_a)[matched]], minlength=len(log))
+
+
+def _followed(log, mask_a, b, rules):
+    # Number of events selected by mask_a in each trace with an event of b at the same or at a later position
+    if rules.get("time_window") is None:
+        _, last_b = _first_last(log, _occurrences(log, b))
+        return _count(log, mask_a & (np.arange(log.num_events) <= last_b[log.trace_ids]))
+    matched = _window_matched(log, mask_a, _occurrences(log, b), rules["time_window"], 'after')
+    return np.bincount(log.trace_ids[np.flatnonzero(mask_a)[matched]], minlength=len(log))
+
+
+def _preceded(log, mask_b, a, rules):
+    # Number of events selected by mask_b in each trace with an event of a at the same or at an earlier position
+    if rules.get("time_window") is None:
+        first_a, _ = _first_last(log, _occurrences(log, a))
+        return _count(log, mask_b & (first_a[log.trace_ids] <= np.arange(log.num_events)))
+    matched = _window_matched(log, mask_b, _occurrences(log, a), rules["time_window"], 'before')
+    return np.bincount(log.trace_ids[np.flatnonzero(mask_b)[matched]], minlength=len(log))
+
+
+def _chained(log, mask_first, mask_second, rules):
+    # Number of events selected by mask_first in each trace immediately followed by an event selected by mask_second
+    idx = np.flatnonzero(_followed_by(log, mask_first, mask_second))
+    idx = idx[_in_window(log, idx, idx + 1, rules)]
+    return np.bincount(log.trace_ids[idx], minlength=len(log))
+
+
+def vec_existence(log, a, rules):
+    return None, None, None, None, _count(log, _activations_near_first(log, a, rules)) >= rules["n"]
+
+
+def vec_absence(log, a, rules):
+    return None, None, None, None, _count(log, _activations_near_first(log, a, rules)) < rules["n"]
+
+
+def vec_exactly(log, a, rules):
+    return None, None, None, None, _count(log, _activations_near_first(log, a, rules)) == rules["n"]
+
+
+def vec_init(log, a, rules):
+    # Time conditions do not apply to init
+    satisfied = np.zeros(len(log), dtype=bool)
+    not_empty = log.offsets[:-1] < log.offsets[1:]
+    satisfied[not_empty] = _activations(log, a, rules)[log.offsets[:-1][not_empty]]
+    return None, None, None, None, satisfied
+
+
+def vec_choice(log, a, b, rules):
+    occurs = _activations_near_first(log, a, rules) | _activations_near_first(log, b, rules)
+    return None, None, None, None, _count(log, occurs) > 0
+
+
+def vec_exclusive_choice(log, a, b, rules):
+    a_occurs = _count(log, _activations_near_first(log, a, rules)) > 0
+    b_occurs = _count(log, _activations_near_first(log, b, rules)) > 0
+    return None, None, None, None, a_occurs ^ b_occurs
+
+
+def vec_responded_existence(log, a, b, rules):
+    mask_a = _activations(log, a, rules)
+    num_activations = _count(log, mask_a)
+    num_fulfillments = _responded(log, mask_a, b, rules)
+    return _binary_result(num_fulfillments, num_activations - num_fulfillments, np.zeros_like(num_activations),
+                          num_activations, rules)
+
+
+def vec_response(log, a, b, rules):
+    mask_a = _activations(log, a, rules)
+    num_activations = _count(log, mask_a)
+    num_fulfillments = _followed(log, mask_a, b, rules)
+    return _binary_result(num_fulfillments, num_activations - num_fulfillments, np.zeros_like(num_activations),
+                          num_activations, rules)
+
+
+def vec_alternate_response(log, a, b, rules):
+    mask_a = _activations(log, a, rules)
+    b_tids, fulfilled = _alternate_fulfillments(log, mask_a, _occurrences(log, b))
+    num_activations = _count(log, mask_a)
+    num_fulfillments = np.bincount(b_tids[fulfilled], minlength=len(log))
+    return _binary_result(num_fulfillments, num_activations - num_fulfillments, np.zeros_like(num_activations),
+                          num_activations, rules)
+
+
+def vec_chain_response(log, a, b, rules):
+    mask_a = _activations(log, a, rules)
+    num_activations = _count(log, mask_a)
+    num_fulfillments = _chained(log, mask_a, _occurrences(log, b), rules)
+    return _binary_result(num_fulfillments, num_activations - num_fulfillments, np.zeros_like(num_activations),
+                          num_activations, rules)
+
+
+def vec_precedence(log, a, b, rules):
+    mask_b = _activations(log, b, rules)
+    num_activations = _count(log, mask_b)
+    num_fulfillments = _preceded(log, mask_b, a, rules)
+    return _binary_result(num_fulfillments, num_activations - num_fulfillments, None, num_activations, rules)
+
+
+def vec_alternate_precedence(log, a, b, rules):
+    mask_b = _activations(log, b, rules)
+    b_tids, fulfilled = _alternate_fulfillments(log, _occurrences(log, a), mask_b)
+    num_activations = _count(log, mask_b)
+    num_fulfillments = np.bincount(b_tids[fulfilled], minlength=len(log))
+    return _binary_result(num_fulfillments, num_activations - num_fulfillments, None, num_activations, rules)
+
+
+def vec_chain_precedence(log, a, b, rules):
+    mask_b = _activations(log, b, rules)
+    num_activations = _count(log, mask_b)
+    num_fulfillments = _chained(log, _occurrences(log, a), mask_b, rules)
+    return _binary_result(num_fulfillments, num_activations - num_fulfillments, None, num_activations, rules)
+
+
+def vec_not_responded_existence(log, a, b, rules):
+    mask_a = _activations(log, a, rules)
+    num_activations = _count(log, mask_a)
+    num_violations = _responded(log, mask_a, b, rules)
+    return _binary_result(num_activations - num_violations, num_violations, np.zeros_like(num_activations),
+                          num_activations, rules)
+
+
+def vec_not_response(log, a, b, rules):
+    mask_a = _activations(log, a, rules)
+    num_activations = _count(log, mask_a)
+    num_violations = _followed(log, mask_a, b, rules)
+    return _binary_result(num_activations - num_violations, num_violations, np.zeros_like(num_activations),
+                          num_activations, rules)
+
+
+def vec_not_chain_response(log, a, b, rules):
+    mask_a = _activations(log, a, rules)
+    num_activations = _count(log, mask_a)
+    num_violations = _chained(log, mask_a, _occurrences(log, b), rules)
+    return _binary_result(num_activations - num_violations, num_violations, np.zeros_like(num_activations),
+                          num_activations, rules)
+
+
+def vec_not_precedence(log, a, b, rules):
+    mask_b = _activations(log, b, rules)
+    num_activations = _count(log, mask_b)
+    num_violations = _preceded(log, mask_b, a, rules)
+    return _binary_result(num_activations - num_violations, num_violations, None, num_activations, rules)
+
+
+def vec_not_chain_precedence(log, a, b, rules):
+    mask_b = _activations(log, b, rules)
+    num_activations = _count(log, mask_b)
+    num_violations = _chained(log, _occurrences(log, a), mask_b, rules)
+    return _binary_result(num_activations - num_violations, num_violations, None, num_activations, rules)
+
+
+class ActivityStats:
+    """
+    Per-trace statistics of the events of an activity, shared by the evaluation of all the templates involving it.
+
+    Attributes
+    ----------
+    positions : ndarray[int64]
+        the sorted positions inside the log of the events of the activity
+    trace_ids : ndarray[int64]
+        the trace containing each of these events
+    counts : ndarray[int64]
+        the number of events of the activity in each trace
+    first : ndarray[int64]
+        the position of the first event of the activity in each trace, the number of events of the log if absent
+    last : ndarray[int64]
+        the position of the last event of the activity in each trace, -1 if absent
+    """
+    def __init__(self, log, activity):
+        self.positions = log.activity_positions(activity)
+        self.trace_ids = log.trace_ids[self.positions]
+        self.counts = np.bincount(self.trace_ids, minlength=len(log))
+        self.first, self.last = _first_last_positions(log, self.positions, self.trace_ids)
+
+
+def get_activity_stats(log, activity, stats):
+    # Return the statistics of the activity from the 'stats' cache, computing them if missing
+    if activity not in stats:
+        stats[activity] = ActivityStats(log, activity)
+    return stats[activity]
+
+
+def vec_unary_templates(log, a, rules, stats, templates=None):
+    """
+    Check all the unary templates over the activity 'a' at once, with the cardinalities 1, ..., rules["n"]. If
+    'templates' is given, only the templates with these names are checked.
+
+    Returns
+    -------
+    results
+        dictionary with keys the tuples (template name, cardinality or None) and values the tuples returned by the
+        corresponding vectorized checkers.
+    """
+    counts = get_activity_stats(log, a, stats).counts
+    results = {}
+    for n in range(1, rules["n"] + 1):
+        results[Template.EXISTENCE.templ_str, n] = None, None, None, None, counts >= n
+        results[Template.ABSENCE.templ_str, n] = None, None, None, None, counts < n
+        results[Template.EXACTLY.templ_str, n] = None, None, None, None, counts == n
+    if templates is None or Template.INIT.templ_str in templates:
+        results[Template.INIT.templ_str, None] = vec_init(log, a, rules)
+    if templates is not None:
+        results = {key: result for key, result in results.items() if key[0] in templates}
+    return results
+
+
+def vec_binary_templates(log, a, b, rules, stats, templates=None):
+    """
+    Check all the binary templates over the activities (a, b) at once. Only the positions of the events of 'a' and 'b'
+    are visited, and the quantities shared by several templates are computed once. If 'templates' is given, only the
+    templates with these names are checked, and only the quantities they need are computed.
+
+    Returns
+    -------
+    results
+        dictionary with keys the template names and values the tuples returned by the corresponding vectorized
+        checkers.
+    """
+    stats_a = get_activity_stats(log, a, stats)
+    stats_b = get_activity_stats(log, b, stats)
+    pos_a, pos_b = stats_a.positions, stats_b.positions
+    a_occurs = stats_a.counts > 0
+    b_occurs = stats_b.counts > 0
+    zeros = np.zeros(len(log), dtype=np.int64)
+
+    # Events of a followed by b (response) and of b preceded by a (precedence)
+    @cache
+    def a_before_last_b():
+        return np.bincount(stats_a.trace_ids[pos_a <= stats_b.last[stats_a.trace_ids]], minlength=len(log))
+
+    @cache
+    def b_after_first_a():
+        return np.bincount(stats_b.trace_ids[pos_b >= stats_a.first[stats_b.trace_ids]], minlength=len(log))
+
+    # Couples of a and b events in a row, counted once for chain response and chain precedence
+    @cache
+    def num_in_row():
+        next_pos = pos_a + 1
+        k = np.minimum(np.searchsorted(pos_b, next_pos), max(len(pos_b) - 1, 0))
+        in_row = (pos_b[k] == next_pos) & (next_pos < log.offsets[stats_a.trace_ids + 1]) if len(pos_b) else \
+            np.zeros(len(pos_a), dtype=bool)
+        return np.bincount(stats_a.trace_ids[in_row], minlength=len(log))
+
+    # Events of b with an event of a since the previous b of the trace (or the trace start), included themselves
+    @cache
+    def num_alternated():
+        prev_b = np.empty_like(pos_b)
+        prev_b[1:] = pos_b[:-1]
+        first_of_trace = np.ones(len(pos_b), dtype=bool)
+        first_of_trace[1:] = stats_b.trace_ids[1:] != stats_b.trace_ids[:-1]
+        prev_b[first_of_trace] = log.offsets[stats_b.trace_ids[first_of_trace]] - 1
+        alternated = np.searchsorted(pos_a, pos_b, side='right') > np.searchsorted(pos_a, prev_b, side='right')
+        return np.bincount(stats_b.trace_ids[alternated], minlength=len(log))
+
+    num_a, num_b = stats_a.counts, stats_b.counts
+    num_a_with_b = np.where(b_occurs, num_a, 0)
+    checkers = {
+        Template.CHOICE.templ_str: lambda: (None, None, None, None, a_occurs | b_occurs),
+        Template.EXCLUSIVE_CHOICE.templ_str: lambda: (None, None, None, None, a_occurs ^ b_occurs),
+        Template.RESPONDED_EXISTENCE.templ_str: lambda: _binary_result(num_a_with_b, num_a - num_a_with_b, zeros,
+                                                                       num_a, rules),
+        Template.RESPONSE.templ_str: lambda: _binary_result(a_before_last_b(), num_a - a_before_last_b(), zeros, num_a,
+                                                            rules),
+        Template.ALTERNATE_RESPONSE.templ_str: lambda: _binary_result(num_alternated(), num_a - num_alternated(),
+                                                                      zeros, num_a, rules),
+        Template.CHAIN_RESPONSE.templ_str: lambda: _binary_result(num_in_row(), num_a - num_in_row(), zeros, num_a,
+                                                                  rules),
+        Template.PRECEDENCE.templ_str: lambda: _binary_result(b_after_first_a(), num_b - b_after_first_a(), None,
+                                                              num_b, rules),
+        Template.ALTERNATE_PRECEDENCE.templ_str: lambda: _binary_result(num_alternated(), num_b - num_alternated(),
+                                                                        None, num_b, rules),
+        Template.CHAIN_PRECEDENCE.templ_str: lambda: _binary_result(num_in_row(), num_b - num_in_row(), None, num_b,
+                                                                    rules),
+        Template.NOT_RESPONDED_EXISTENCE.templ_str: lambda: _binary_result(num_a - num_a_with_b, num_a_with_b, zeros,
+                                                                           num_a, rules),
+        Template.NOT_RESPONSE.templ_str: lambda: _binary_result(num_a - a_before_last_b(), a_before_last_b(), zeros,
+                                                                num_a, rules),
+        Template.NOT_CHAIN_RESPONSE.templ_str: lambda: _binary_result(num_a - num_in_row(), num_in_row(), zeros, num_a,
+                                                                      rules),
+        Template.NOT_PRECEDENCE.templ_str: lambda: _binary_result(num_b - b_after_first_a(), b_after_first_a(), None,
+                                                                  num_b, rules),
+        Template.NOT_CHAIN_PRECEDENCE.templ_str: lambda: _binary_result(num_b - num_in_row(), num_in_row(), None,
+                                                                        num_b, rules),
+    }
+    return {templ_str: check() for templ_str, check in checkers.items() if templates is None or templ_str in templates}
+
+
+# Templates are str enums sharing the same (empty) string value, so the checkers are indexed by template name
+VECTORIZED_CHECKERS = {
+    Template.EXISTENCE.templ_str: vec_existence,
+    Template.ABSENCE.templ_str: vec_absence,
+    Template.EXACTLY.templ_str: vec_exactly,
+    Template.INIT.templ_str: vec_init,
+    Template.CHOICE.templ_str: vec_choice,
+    Template.EXCLUSIVE_CHOICE.templ_str: vec_exclusive_choice,
+    Template.RESPONDED_EXISTENCE.templ_str: vec_responded_existence,
+    Template.RESPONSE.templ_str: vec_response,
+    Template.ALTERNATE_RESPONSE.templ_str: vec_alternate_response,
+    Template.CHAIN_RESPONSE.templ_str: vec_chain_response,
+    Template.PRECEDENCE.templ_str: vec_precedence,
+    Template.ALTERNATE_PRECEDENCE.templ_str: vec_alternate_precedence,
+    Template.CHAIN_PRECEDENCE.templ_str: vec_chain_precedence,
+    Template.NOT_RESPONDED_EXISTENCE.templ_str: vec_not_responded_existence,
+    Template.NOT_RESPONSE.templ_str: vec_not_response,
+    Template.NOT_CHAIN_RESPONSE.templ_str: vec_not_chain_response,
+    Template.NOT_PRECEDENCE.templ_str: vec_not_precedence,
+    Template.NOT_CHAIN_PRECEDENCE.templ_str: vec_not_chain_precedence,
+}
+
+
+# Templates whose vectorized checkers support time conditions. The alternate templates keep the trace by trace check,
+# as their activations are matched with the targets one at a time
+TIME_WINDOW_TEMPLATES = frozenset(templ_str for templ_str in VECTORIZED_CHECKERS
+                                  if templ_str not in (Template.ALTERNATE_RESPONSE.templ_str,
+                                                       Template.ALTERNATE_PRECEDENCE.templ_str))
@@ -1,6 +1,11 @@
 from .parsers import *
 from .api_functions import *
+from .conformance_monitor import *
+from .conformance_profiler import *
+from .progress import *
+from .log_utils import CompactLog, LogVariants, XesTraceStream, mine_frequent_itemsets, read_event_log, read_xes_cached
 import sys
+from collections.abc import Iterator
 import pm4py
 import pandas as pd
 from mlxtend.preprocessing import TransactionEncoder
@@ -15,8 +20,11 @@ class Declare4Py:
 
     Attributes
     ----------
-    log : EventLog
-        the input event log parsed from a XES file
+    log : CompactLog or XesTraceStream
+        the input event log parsed from a XES file, i.e. its compact version or, if the log is read in streaming mode,
+        a stream of its traces
+    compact_log : CompactLog
+        the columnar, integer-encoded version of the input log
     model : DeclModel
         the input DECLARE model parsed from a decl file
     log_length : int
@@ -27,8 +35,10 @@ class Declare4Py:
         the binary encoded version of the input log
     frequent_item_sets : DataFrame
         list of the most frequent item sets found along the log traces, together with their support and length
-    conformance_checking_results : dict[tuple[int, str]: dict[str: CheckerResult]]
-        output dictionary of the conformance_checking() function. Each entry contains:
+    frequent_item_sets_dimension : str
+        the dimension the frequent item sets are computed over, 'act' for activity names or 'payload' for resources
+    conformance_checking_results : ConformanceResults
+        output of the conformance_checking() function, stored in columns but read as a dictionary. Each entry contains:
         key = tuple[trace_pos_inside_log, trace_name]
         val = dict[ constraint_string : CheckerResult ]
     query_checking_results : dict[str: dict[str: str]]
@@ -42,11 +52,12 @@ class Declare4Py:
     """
     def __init__(self):
         self.log = None
+        self.compact_log = None
         self.model = None
-        self.log_length = None # exported to log utils
         self.supported_templates = tuple(map(lambda c: c.templ_str, Template))
         self.binary_encoded_log = None # exported to log utils
         self.frequent_item_sets = None # exported to log utils
+        self.frequent_item_sets_dimension = None
         self.conformance_checking_results = None
         self.query_checking_results = None
         self.discovery_results = None
@@ -66,22 +77,51 @@ class Declare4Py:
             raise RuntimeError("You must load a log before.")
         if self.frequent_item_sets is None:
             raise RuntimeError("You must run the item set extraction algorithm before.")
+        if self.binary_encoded_log is None:
+            self.log_encoding(self.frequent_item_sets_dimension)
 
         return self.binary_encoded_log
 
     # exported to log utils
-    def parse_xes_log(self, log_path: str) -> None:
+    def parse_xes_log(self, log_path: str, streaming: bool = False, cache_dir: str = None) -> None:
         """
-        Set the 'log' EventLog object and the 'log_length' integer by reading and parsing the log corresponding to
-        given log file path.
+        Set the 'log' and 'compact_log' objects by reading and parsing the log corresponding to given log file path.
+        The parsed EventLog is only kept as its compact encoding, both 'log' and 'compact_log' are set to the compact
+        log, whose traces are rebuilt when they are accessed.
 
         Parameters
         ----------
         log_path : str
             File path where the log is stored.
-        """
-        self.log = pm4py.read_xes(log_path)
-        self.log_length = len(self.log)
+        streaming : bool, optional
+            if True, the log is not loaded in memory: 'log' streams the traces from the file each time it is iterated
+            and no 'compact_log' is built (default False).
+        cache_dir : str, optional
+            if specified, the 'compact_log' is stored in this directory after the first parsing and it is
+            memory-mapped from there by the next calls, until the log file changes.
+        """
+        if streaming:
+            self.log = XesTraceStream(log_path)
+            self.compact_log = None
+        else:
+            if cache_dir is not None:
+                self.compact_log = read_xes_cached(log_path, cache_dir)
+            else:
+                self.compact_log = CompactLog.from_event_log(read_event_log(log_path))
+            self.log = self.compact_log
+
+    @property
+    def log_length(self) -> int:
+        # Counted when requested, as the length of a streamed log is only known after parsing the whole file
+        return None if self.log is None else len(self.log)
+
+    def _log_source(self):
+        # The compact log answers projections and alphabets, the trace stream is scanned instead in streaming mode
+        return self.compact_log if self.compact_log is not None else self.log
+
+    def _log_variants(self):
+        # In streaming mode, the constraints without conditions are checked once per variant of the log
+        return self.log.variants() if isinstance(self.log, XesTraceStream) else None
 
     # exported to log utils
     def activities_log_projection(self) -> list[list[str]]:
@@ -93,15 +133,9 @@ class Declare4Py:
         projection
             nested lists, the outer one addresses traces while the inner one contains event activity names.
         """
-        projection = []
         if self.log is None:
             raise RuntimeError("You must load a log before.")
-        for trace in self.log:
-            tmp_trace = []
-            for event in trace:
-                tmp_trace.append(event["concept:name"])
-            projection.append(tmp_trace)
-        return projection
+        return self._log_source().projection("concept:name")
 
     # exported to log utils
     def resources_log_projection(self) -> list[list[str]]:
@@ -113,15 +147,9 @@ class Declare4Py:
         projection
             nested lists, the outer one addresses traces while the inner one contains event activity names.
         """
-        projection = []
         if self.log is None:
             raise RuntimeError("You must load a log before.")
-        for trace in self.log:
-            tmp_trace = []
-            for event in trace:
-                tmp_trace.append(event["org:group"])
-            projection.append(tmp_trace)
-        return projection
+        return self._log_source().projection("org:group")
 
     # exported to log utils
     def log_encoding(self, dimension: str = 'act') -> pd.DataFrame:
@@ -168,13 +196,26 @@ class Declare4Py:
         algorithm : str, optional
             the algorithm for extracting frequent itemsets, choose between 'fpgrowth' (default) and 'apriori'.
         len_itemset : int, optional
-            the maximum length of the extracted itemsets.
+            the maximum length of the extracted itemsets. If it is at most 2, e.g. for discovery, the supports are
+            counted directly on the traces containing each item, without running 'algorithm' on the binary encoding
+            of the log, which is then only computed if requested by get_binary_encoded_log().
         """
         if self.log is None:
             raise RuntimeError("You must load a log before.")
         if not 0 <= min_support <= 1:
             raise RuntimeError("Min. support must be in range [0, 1].")
 
+        if len_itemset is not None and len_itemset <= 2:
+            if dimension not in ('act', 'payload'):
+                raise RuntimeError(f"{dimension} dimension not supported. Choose between 'act' and 'payload'")
+            if algorithm not in ('fpgrowth', 'apriori'):
+                raise RuntimeError(f"{algorithm} algorithm not supported. Choose between fpgrowth and apriori")
+            attribute = "concept:name" if dimension == 'act' else "org:group"
+            self.binary_encoded_log = None
+            self.frequent_item_sets = mine_frequent_itemsets(self._log_source(), min_support, attribute, len_itemset)
+            self.frequent_item_sets_dimension = dimension
+            return
+
         self.log_encoding(dimension)
         if algorithm == 'fpgrowth':
             frequent_itemsets = fpgrowth(self.binary_encoded_log, min_support=min_support, use_colnames=True)
@@ -187,6 +228,7 @@ class Declare4Py:
             self.frequent_item_sets = frequent_itemsets
         else:
             self.frequent_item_sets = frequent_itemsets[(frequent_itemsets['length'] <= len_itemset)]
+        self.frequent_item_sets_dimension = dimension
 
     def get_trace_keys(self) -> list[tuple[int, str]]:
         """
@@ -199,10 +241,7 @@ class Declare4Py:
         """
         if self.log is None:
             raise RuntimeError("You must load a log before.")
-        trace_ids = []
-        for trace_id, trace in enumerate(self.log):
-            trace_ids.append((trace_id, trace.attributes["concept:name"]))
-        return trace_ids
+        return self._log_source().get_trace_keys()
 
     # exported to log utils
     def get_log_length(self) -> int:
@@ -221,7 +260,8 @@ class Declare4Py:
     # exported to log utils
     def get_log(self) -> pm4py.objects.log.obj.EventLog:
         """
-        Return the log previously fed in input.
+        Return the log previously fed in input. A new EventLog is built from the compact log at each call, the stream
+        of the traces is returned in streaming mode.
 
         Returns
         -------
@@ -230,6 +270,8 @@ class Declare4Py:
         """
         if self.log is None:
             raise RuntimeError("You must load a log before.")
+        if isinstance(self.log, CompactLog):
+            return self.log.to_event_log()
         return self.log
 
     # exported to log utils
@@ -244,11 +286,7 @@ class Declare4Py:
         """
         if self.log is None:
             raise RuntimeError("You must load a log before.")
-        resources = set()
-        for trace in self.log:
-            for event in trace:
-                resources.add(event["org:group"])
-        return resources
+        return set(self._log_source().alphabet("org:group"))
 
     # exported to log utils
     def get_log_alphabet_activities(self):
@@ -262,11 +300,7 @@ class Declare4Py:
         """
         if self.log is None:
             raise RuntimeError("You must load a log before.")
-        activities = set()
-        for trace in self.log:
-            for event in trace:
-                activities.add(event["concept:name"])
-        return list(activities)
+        return self._log_source().alphabet("concept:name")
 
     # exported to log utils
     def get_frequent_item_sets(self) -> pd.DataFrame:
@@ -299,6 +333,8 @@ class Declare4Py:
             raise RuntimeError("You must load a log before.")
         if self.frequent_item_sets is None:
             raise RuntimeError("You must run the item set extraction algorithm before.")
+        if self.binary_encoded_log is None:
+            self.log_encoding(self.frequent_item_sets_dimension)
 
         return self.binary_encoded_log
 
@@ -354,7 +390,8 @@ class Declare4Py:
         return self.model.get_decl_model_constraints()
 
     # PROCESS MINING TASKS
-    def conformance_checking(self, consider_vacuity: bool) -> dict[tuple[int, str]: dict[str: CheckerResult]]:
+    def conformance_checking(self, consider_vacuity: bool, n_jobs: int = 1, profiler: ConformanceProfiler = None,
+                             progress: ProgressTracker = None) -> ConformanceResults:
         """
         Performs conformance checking for the provided event log and DECLARE model.
 
@@ -363,13 +400,25 @@ class Declare4Py:
         consider_vacuity : bool
             True means that vacuously satisfied traces are considered as satisfied, violated otherwise.
 
+        n_jobs : int, optional
+            the number of processes checking the traces in parallel, -1 means all the available cores (default 1).
+
+        profiler : ConformanceProfiler, optional
+            if given, it records the time, examined events, condition evaluations and activations of each constraint.
+            The traces are then checked in this process only.
+
+        progress : ProgressTracker, optional
+            if given, it is advanced after each checked trace. If it is cancelled or its time budget is over, the
+            results of the traces checked so far are returned.
+
         Returns
         -------
         conformance_checking_results
             dictionary where the key is a list containing trace position inside the log and the trace name, the value is
             a dictionary with keys the names of the constraints and values a CheckerResult object containing
             the number of pendings, activations, violations, fulfilments and the truth value of the trace for that
-            constraint.
+            constraint. The CheckerResult objects are built when they are accessed, to_dataframe() exports all the
+            results at once.
         """
         print("Computing conformance checking ...")
         if self.log is None:
@@ -377,15 +426,120 @@ class Declare4Py:
         if self.model is None:
             raise RuntimeError("You must load the DECLARE model before checking the model.")
 
-        self.conformance_checking_results = {}
-        for i, trace in enumerate(self.log):
-            trc_res = check_trace_conformance(trace, self.model, consider_vacuity)
-            self.conformance_checking_results[(i, trace.attributes["concept:name"])] = trc_res
+        self.conformance_checking_results = check_log_conformance(self.log, self.model, consider_vacuity,
+                                                                  self.compact_log, n_jobs, self._log_variants(),
+                                                                  profiler, progress)
 
         return self.conformance_checking_results
 
-    def discovery(self, consider_vacuity: bool, max_declare_cardinality: int = 3, output_path: str = None) \
-            -> dict[str: dict[tuple[int, str]: CheckerResult]]:
+    def iter_conformance(self, consider_vacuity: bool, n_jobs: int = 1) \
+            -> Iterator[tuple[tuple[int, str], dict[str: CheckerResult]]]:
+        """
+        Performs conformance checking for the provided event log and DECLARE model, yielding the results of each trace
+        as soon as it is checked instead of returning them all at the end. With a streamed log, only a few traces are
+        in memory at once.
+
+        Parameters
+        ----------
+        consider_vacuity : bool
+            True means that vacuously satisfied traces are considered as satisfied, violated otherwise.
+
+        n_jobs : int, optional
+            the number of processes checking the traces in parallel, -1 means all the available cores (default 1).
+
+        Returns
+        -------
+        conformance_checking_results
+            iterator of the tuples (trace key, trace results), in log order. The trace key contains the trace position
+            inside the log and the trace name, the trace results are a dictionary with keys the names of the
+            constraints and values CheckerResult objects.
+        """
+        print("Computing conformance checking ...")
+        if self.log is None:
+            raise RuntimeError("You must load the log before checking the model.")
+        if self.model is None:
+            raise RuntimeError("You must load the DECLARE model before checking the model.")
+
+        return iter_conformance(self.log, self.model, consider_vacuity, self.compact_log, n_jobs)
+
+    def conformance_statistics(self, consider_vacuity: bool, n_jobs: int = 1, violating_traces: bool = False,
+                               profiler: ConformanceProfiler = None,
+                               progress: ProgressTracker = None) -> ConformanceStatistics:
+        """
+        Performs conformance checking for the provided event log and DECLARE model, keeping only the aggregated
+        results of each constraint instead of the results of each trace.
+
+        Parameters
+        ----------
+        consider_vacuity : bool
+            True means that vacuously satisfied traces are considered as satisfied, violated otherwise.
+
+        n_jobs : int, optional
+            the number of processes checking the traces in parallel, -1 means all the available cores (default 1).
+
+        violating_traces : bool, optional
+            True to record the positions of the traces violating each constraint (default False).
+
+        profiler : ConformanceProfiler, optional
+            if given, it records the time, examined events, condition evaluations and activations of each constraint.
+            The traces are then checked in this process only.
+
+        progress : ProgressTracker, optional
+            if given, it is advanced after each checked trace. If it is cancelled or its time budget is over, the
+            results of the traces checked so far are returned.
+
+        Returns
+        -------
+        conformance_statistics
+            ConformanceStatistics object with, for each constraint, the number of traces in each state and the sums of
+            the pendings, activations, violations and fulfilments over the traces.
+        """
+        print("Computing conformance statistics ...")
+        if self.log is None:
+            raise RuntimeError("You must load the log before checking the model.")
+        if self.model is None:
+            raise RuntimeError("You must load the DECLARE model before checking the model.")
+
+        return check_log_statistics(self.log, self.model, consider_vacuity, self.compact_log, n_jobs,
+                                    self._log_variants(), violating_traces, profiler, progress)
+
+    def get_conformance_results_dataframe(self) -> pd.DataFrame:
+        """
+        Return the conformance checking results as a DataFrame.
+
+        Returns
+        -------
+        conformance_checking_results
+            DataFrame with one row for each trace and constraint, and the columns 'trace_id', 'trace_name',
+            'constraint', 'num_fulfillments', 'num_violations', 'num_pendings', 'num_activations' and 'state'.
+        """
+        if self.conformance_checking_results is None:
+            raise RuntimeError("You must run conformance checking before!")
+
+        return self.conformance_checking_results.to_dataframe()
+
+    def get_conformance_monitor(self, consider_vacuity: bool) -> ConformanceMonitor:
+        """
+        Return an online conformance monitor of the DECLARE model, to be fed the events of running cases one at a time.
+
+        Parameters
+        ----------
+        consider_vacuity : bool
+            True means that vacuously satisfied traces are considered as satisfied, violated otherwise.
+
+        Returns
+        -------
+        monitor
+            the conformance monitor of the loaded model, with no open case.
+        """
+        if self.model is None:
+            raise RuntimeError("You must load the DECLARE model before monitoring it.")
+
+        return ConformanceMonitor(self.model, consider_vacuity)
+
+    def discovery(self, consider_vacuity: bool, max_declare_cardinality: int = 3, output_path: str = None,
+                  min_support: float = 0,
+                  progress: ProgressTracker = None) -> dict[str: dict[tuple[int, str]: CheckerResult]]:
         """
         Performs discovery of the supported DECLARE templates for the provided log by using the computed frequent item
         sets.
@@ -401,6 +555,14 @@ class Declare4Py:
         output_path : str, optional
             if specified, save the discovered constraints in a DECLARE model to the provided path.
 
+        min_support : float, optional
+            the minimum support that a constraint needs to have to be discovered (default 0). Candidates whose support
+            cannot reach it, according to the supports of the frequent item sets, are not checked at all.
+
+        progress : ProgressTracker, optional
+            if given, it is advanced after the candidate constraints of each frequent item set are checked. If it is
+            cancelled or its time budget is over, the constraints discovered so far are returned.
+
         Returns
         -------
         discovery_results
@@ -415,29 +577,60 @@ class Declare4Py:
             raise RuntimeError("You must discover frequent itemsets before.")
         if max_declare_cardinality <= 0:
             raise RuntimeError("Cardinality must be greater than 0.")
+        if not 0 <= min_support <= 1:
+            raise RuntimeError("Min. support must be in range [0, 1].")
 
         self.discovery_results = {}
-
+        # The variants of a streamed log keep the variant of each trace during discovery, as the satisfied traces of
+        # every discovered constraint are returned
+        log_variants = LogVariants(self.log, keep_traces=True) if isinstance(self.log, XesTraceStream) else None
+        # Per-activity statistics shared by all the candidate constraints involving the same activity
+        activity_stats = {}
+        # Item set supports bound the support of the constraints only if the item sets are made of activities
+        itemset_support = {}
+        if self.frequent_item_sets_dimension == 'act':
+            itemset_support = dict(zip(self.frequent_item_sets['itemsets'], self.frequent_item_sets['support']))
+
+        if progress is not None:
+            progress.start("discovery", len(self.frequent_item_sets))
         for item_set in self.frequent_item_sets['itemsets']:
             length = len(item_set)
 
-            if length == 1:
+            if self.compact_log is not None and length == 1:
+                self.discovery_results |= discover_activity_constraints(self.compact_log, *item_set, consider_vacuity,
+                                                                        max_declare_cardinality, activity_stats,
+                                                                        min_support, itemset_support)
+
+            elif self.compact_log is not None and length == 2:
+                self.discovery_results |= discover_pair_constraints(self.compact_log, *item_set, consider_vacuity,
+                                                                    activity_stats, min_support, itemset_support)
+
+            elif length == 1:
                 for templ in Template.get_unary_templates():
                     constraint = {"template": templ, "attributes": ', '.join(item_set), "condition": ("", "")}
                     if not templ.supports_cardinality:
-                        self.discovery_results |= discover_constraint(self.log, constraint, consider_vacuity)
+                        self.discovery_results |= discover_candidate(self.log, constraint, consider_vacuity,
+                                                                     itemset_support, min_support, log_variants)
                     else:
                         for i in range(max_declare_cardinality):
                             constraint['n'] = i+1
-                            self.discovery_results |= discover_constraint(self.log, constraint, consider_vacuity)
+                            self.discovery_results |= discover_candidate(self.log, constraint, consider_vacuity,
+                                                                         itemset_support, min_support, log_variants)
 
             elif length == 2:
                 for templ in Template.get_binary_templates():
                     constraint = {"template": templ, "attributes": ', '.join(item_set), "condition": ("", "", "")}
-                    self.discovery_results |= discover_constraint(self.log, constraint, consider_vacuity)
+                    self.discovery_results |= discover_candidate(self.log, constraint, consider_vacuity,
+                                                                 itemset_support, min_support, log_variants)
 
                     constraint['attributes'] = ', '.join(reversed(list(item_set)))
-                    self.discovery_results |= discover_constraint(self.log, constraint, consider_vacuity)
+                    self.discovery_results |= discover_candidate(self.log, constraint, consider_vacuity,
+                                                                 itemset_support, min_support, log_variants)
+
+            if progress is not None and not progress.advance():
+                break
+        if progress is not None:
+            progress.finish()
 
         activities_decl_format = "activity " + "\nactivity ".join(self.get_log_alphabet_activities()) + "\n"
         if output_path is not None:
@@ -492,7 +685,8 @@ class Declare4Py:
                        template_str: str = None, max_declare_cardinality: int = 1,
                        activation: str = None, target: str = None,
                        act_cond: str = None, trg_cond: str = None, time_cond: str = None,
-                       min_support: float = 1.0, return_first: bool = False) -> dict[str: dict[str: str]]:
+                       min_support: float = 1.0, return_first: bool = False, n_jobs: int = 1,
+                       progress: ProgressTracker = None) -> dict[str: dict[str: str]]:
         """
         Performs query checking for a (list of) template, activation activity and target activity. Optional
         activation, target and time conditions can be specified.
@@ -533,6 +727,14 @@ class Declare4Py:
             if True, the algorithm returns only the first queried constraint that is above the minimum support. If
             False, the algorithm returns all the constraints above the min. support (default False).
 
+        n_jobs : int, optional
+            the number of processes checking the candidate constraints in parallel, -1 means all the available cores
+            (default 1). The results are the same of the serial checking, with 'return_first' too.
+
+        progress : ProgressTracker, optional
+            if given, it is advanced after each candidate constraint is checked. If it is cancelled or its time budget
+            is over, the constraints found so far are returned.
+
         Returns
         -------
         query_checking_results
@@ -583,7 +785,8 @@ class Declare4Py:
         targets_to_check = self.get_log_alphabet_activities() if target is None else [target]
         activity_combos = tuple(filter(lambda c: c[0] != c[1], product(activations_to_check, targets_to_check)))
 
-        self.query_checking_results = {}
+        # Candidate constraints, along with their structured representation, in checking order
+        candidates = []
 
         for template_str in templates_to_check:
             template_str, cardinality = re.search(r'(^.+?)(\d*$)', template_str).groups()
@@ -596,32 +799,38 @@ class Declare4Py:
             if template.is_binary:
                 constraint['condition'] = (act_cond, trg_cond, time_cond)
                 for couple in activity_combos:
-                    constraint['attributes'] = ', '.join(couple)
-
-                    constraint_str = query_constraint(self.log, constraint, consider_vacuity, min_support)
-                    if constraint_str:
-                        res_value = {
-                            "template": template_str, "activation": couple[0], "target": couple[1],
-                            "act_cond": act_cond, "trg_cond": trg_cond, "time_cond": time_cond
-                        }
-                        self.query_checking_results[constraint_str] = res_value
-                        if return_first:
-                            return self.query_checking_results
+                    res_value = {
+                        "template": template_str, "activation": couple[0], "target": couple[1],
+                        "act_cond": act_cond, "trg_cond": trg_cond, "time_cond": time_cond
+                    }
+                    candidates.append(({**constraint, "attributes": ', '.join(couple)}, res_value))
 
             else:   # unary template
                 constraint['condition'] = (act_cond, time_cond)
                 for activity in activations_to_check:
-                    constraint['attributes'] = activity
-
-                    constraint_str = query_constraint(self.log, constraint, consider_vacuity, min_support)
-                    if constraint_str:
-                        res_value = {
-                            "template": template_str, "activation": activity,
-                            "act_cond": act_cond, "time_cond": time_cond
-                        }
-                        self.query_checking_results[constraint_str] = res_value
-                        if return_first:
-                            return self.query_checking_results
+                    res_value = {
+                        "template": template_str, "activation": activity,
+                        "act_cond": act_cond, "time_cond": time_cond
+                    }
+                    candidates.append(({**constraint, "attributes": activity}, res_value))
+
+        self.query_checking_results = {}
+        if progress is not None:
+            progress.start("query checking", len(candidates))
+
+        constraint_strs = query_constraints(self.log, [constraint for constraint, _ in candidates], consider_vacuity,
+                                            min_support, self.compact_log, n_jobs, return_first, self._log_variants())
+        for (_, res_value), constraint_str in zip(candidates, constraint_strs):
+            if constraint_str:
+                self.query_checking_results[constraint_str] = res_value
+                if return_first:
+                    break
+            if progress is not None and not progress.advance():
+                break
+        # The parallel checking of the remaining candidates is cancelled
+        constraint_strs.close()
+        if progress is not None:
+            progress.finish()
 
         return self.query_checking_results
 
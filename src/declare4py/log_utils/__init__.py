@@ -0,0 +1,5 @@
+from .compact_log import *
+from .xes_stream import *
+from .log_cache import *
+from .variants import *
+from .itemsets import *
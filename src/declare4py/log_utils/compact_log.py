@@ -0,0 +1,542 @@
+import json
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import cached_property, lru_cache
+
+import numpy as np
+from pm4py.objects.log.obj import Event, EventLog, Trace
+
+from .condition_masks import condition_mask
+
+# Value stored in date columns for the events that do not carry the attribute
+NO_TIMESTAMP = np.iinfo(np.int64).min
+
+# Bound on the magnitude of the timestamps, in nanoseconds, such that adding or subtracting time distances up to the
+# same bound cannot overflow (about 146 years around the epoch)
+MAX_TIMESTAMP = 2**62
+
+# Number of traces accessed by position that a CompactLog keeps after rebuilding them from the columns, outside of
+# CompactLog.keep_traces()
+TRACE_CACHE_SIZE = 128
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_ns(dt):
+    delta = dt - (_EPOCH if dt.tzinfo is None else _EPOCH_UTC)
+    return (delta.days * 86400 + delta.seconds) * 10**9 + delta.microseconds * 1000
+
+
+@lru_cache(maxsize=None)
+def _epoch_at(utc_offset):
+    # The epoch in the fixed timezone with the given UTC offset in seconds
+    return _EPOCH_UTC.astimezone(timezone.utc if utc_offset == 0 else timezone(timedelta(seconds=utc_offset)))
+
+
+def _from_ns(ns, utc_offset=None):
+    # Naive datetime if the UTC offset is None, aware datetime in the timezone with that offset otherwise
+    return (_EPOCH if utc_offset is None else _epoch_at(utc_offset)) + timedelta(microseconds=int(ns) // 1000)
+
+
+def _encode_value(value):
+    # JSON form of a value of an 'object' column, the values that JSON does not represent as they are are tagged
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return _encode_value(value.item())
+    if isinstance(value, datetime):
+        return {"date": value.isoformat()}
+    if isinstance(value, list):
+        return {"list": [_encode_value(v) for v in value]}
+    if isinstance(value, tuple):
+        return {"tuple": [_encode_value(v) for v in value]}
+    if isinstance(value, dict) and all(isinstance(k, str) for k in value):
+        return {"dict": {k: _encode_value(v) for k, v in value.items()}}
+    raise TypeError(f"Attribute values of type {type(value).__name__} cannot be stored.")
+
+
+def _decode_value(value):
+    if not isinstance(value, dict):
+        return value
+    (tag, content), = value.items()
+    if tag == "date":
+        return datetime.fromisoformat(content)
+    if tag == "list":
+        return [_decode_value(v) for v in content]
+    if tag == "tuple":
+        return tuple(_decode_value(v) for v in content)
+    return {k: _decode_value(v) for k, v in content.items()}
+
+
+def _all_instances(types, *classes):
+    # Booleans are subclasses of int, so they are told apart explicitly
+    is_bool_kind = bool in classes
+    return all(issubclass(t, classes) and is_bool_kind == issubclass(t, (bool, np.bool_)) for t in types)
+
+
+class AttributeColumn:
+    """
+    Typed column holding the values that an event attribute takes along the whole log.
+
+    Attributes
+    ----------
+    kind : str
+        the type of the column, one among 'str', 'bool', 'int', 'float', 'date' and 'object'
+    values : ndarray
+        one value for each event of the log. Strings are interned to int32 codes of 'categories', dates are int64
+        nanoseconds since the epoch and 'object' columns keep the original Python values
+    present : ndarray[bool]
+        True for the events carrying the attribute, False otherwise
+    categories : list
+        the distinct values of a 'str' column, indexed by their code
+    tz_aware : bool
+        whether the dates of a 'date' column are timezone aware (they are stored in UTC)
+    utc_offsets : ndarray[int32]
+        the UTC offset in seconds of each date of a timezone aware 'date' column, None for the other columns
+    """
+    def __init__(self, kind, values, present, categories=None, tz_aware=False, utc_offsets=None):
+        self.kind = kind
+        self.values = values
+        self.present = present
+        self.categories = categories
+        self.tz_aware = tz_aware
+        if tz_aware and utc_offsets is None:
+            utc_offsets = np.zeros(len(values), dtype=np.int32)
+        self.utc_offsets = utc_offsets
+
+    @classmethod
+    def from_sparse(cls, num_events, positions, values):
+        """
+        Build a column from the positions of the events carrying the attribute and the corresponding values.
+        """
+        present = np.zeros(num_events, dtype=bool)
+        present[positions] = True
+        types = set(map(type, values))
+
+        if _all_instances(types, str):
+            codes = {}
+            column = np.full(num_events, -1, dtype=np.int32)
+            column[positions] = [codes.setdefault(v, len(codes)) for v in values]
+            return cls('str', column, present, categories=list(codes))
+
+        if _all_instances(types, datetime) and len({v.tzinfo is None for v in values}) == 1:
+            column = np.full(num_events, NO_TIMESTAMP, dtype=np.int64)
+            column[positions] = [_to_ns(v) for v in values]
+            if values[0].tzinfo is None:
+                return cls('date', column, present)
+            # The offsets are kept to decode the dates in their original timezone
+            utc_offsets = np.zeros(num_events, dtype=np.int32)
+            utc_offsets[positions] = [int(v.utcoffset().total_seconds()) for v in values]
+            return cls('date', column, present, tz_aware=True, utc_offsets=utc_offsets)
+
+        if _all_instances(types, bool, np.bool_):
+            kind, dtype = 'bool', bool
+        elif _all_instances(types, int, np.integer):
+            kind, dtype = 'int', np.int64
+        elif _all_instances(types, int, np.integer, float, np.floating):
+            kind, dtype = 'float', np.float64
+        else:
+            column = np.empty(num_events, dtype=object)
+            for pos, value in zip(positions, values):
+                column[pos] = value
+            return cls('object', column, present)
+
+        column = np.zeros(num_events, dtype=dtype)
+        column[positions] = values
+        return cls(kind, column, present)
+
+    def decode(self, i):
+        """
+        Return the Python value of the attribute for the event at the i-th position of the log.
+        """
+        value = self.values[i]
+        if self.kind == 'str':
+            return self.categories[value]
+        if self.kind == 'date':
+            return _from_ns(value, self.utc_offsets[i].item() if self.tz_aware else None)
+        if self.kind == 'object':
+            return value
+        return value.item()
+
+    def decode_range(self, start, end):
+        """
+        Return the Python values of the attribute for the events in the range start:end of the log, which must all
+        carry the attribute.
+        """
+        values = self.values[start:end]
+        if self.kind == 'str':
+            categories = self.categories
+            return [categories[value] for value in values.tolist()]
+        if self.kind == 'date':
+            if not self.tz_aware:
+                return [_from_ns(value) for value in values.tolist()]
+            return [_from_ns(value, offset) for value, offset in zip(values.tolist(),
+                                                                     self.utc_offsets[start:end].tolist())]
+        if self.kind == 'object':
+            return list(values)
+        return values.tolist()
+
+
+class CompactLog:
+    """
+    Columnar and integer-encoded representation of an event log. Activity names are interned to small integer codes
+    and all the events of the log are stored in flat NumPy arrays, the events of the i-th trace being the ones in the
+    range offsets[i]:offsets[i+1]. Iterating over a CompactLog yields pm4py traces, so it can be used wherever an
+    EventLog is expected: each trace is rebuilt from the columns when it is accessed, only the last TRACE_CACHE_SIZE
+    traces accessed by position are kept, so the log is never materialized as a whole. A task accessing many traces
+    more than once, e.g. query checking, keeps all of them for its duration with keep_traces().
+
+    Attributes
+    ----------
+    activities : list[str]
+        the activity names of the log, indexed by their integer code
+    activity_codes : dict[str: int]
+        the integer code of each activity name
+    events : ndarray[int32]
+        the activity code of each event of the log
+    offsets : ndarray[int64]
+        the position of the first event of each trace, followed by the total number of events
+    trace_names : list[str]
+        the name of each trace of the log
+    columns : dict[str: AttributeColumn]
+        the typed columns of the event attributes other than the activity name
+    """
+    def __init__(self, activities, events, offsets, trace_names, columns):
+        self.activities = activities
+        self.activity_codes = {act: code for code, act in enumerate(activities)}
+        self.events = events
+        self.offsets = offsets
+        self.trace_names = trace_names
+        self.columns = columns
+        self._traces = OrderedDict()
+        self._keep_depth = 0
+        self._condition_masks = {}
+
+    @classmethod
+    def from_event_log(cls, log):
+        """
+        Build the compact representation of the given log.
+
+        Parameters
+        ----------
+        log : EventLog
+            the event log to encode.
+
+        Returns
+        -------
+        compact_log
+            the columnar encoding of the log.
+        """
+        activity_codes = {}
+        events = []
+        offsets = [0]
+        trace_names = []
+        sparse_columns = {}
+
+        for trace in log:
+            trace_names.append(trace.attributes["concept:name"])
+            for event in trace:
+                pos = len(events)
+                events.append(activity_codes.setdefault(event["concept:name"], len(activity_codes)))
+                for key, value in event.items():
+                    if key != "concept:name":
+                        positions, values = sparse_columns.setdefault(key, ([], []))
+                        positions.append(pos)
+                        values.append(value)
+            offsets.append(len(events))
+
+        columns = {key: AttributeColumn.from_sparse(len(events), positions, values)
+                   for key, (positions, values) in sparse_columns.items()}
+        return cls(list(activity_codes), np.array(events, dtype=np.int32), np.array(offsets, dtype=np.int64),
+                   trace_names, columns)
+
+    def save(self, path):
+        """
+        Store the compact log in the given directory, as one NumPy file for each array and JSON files for the rest.
+        The values of the 'object' columns are stored as JSON, so that loading a log never unpickles data.
+
+        Parameters
+        ----------
+        path : str
+            the directory where the log is stored, it is created if it does not exist.
+
+        Raises
+        ------
+        TypeError
+            if an 'object' column contains values other than strings, numbers, booleans, None, dates and lists or
+            dictionaries of them.
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "events.npy"), self.events)
+        np.save(os.path.join(path, "offsets.npy"), self.offsets)
+        columns = []
+        for i, (key, column) in enumerate(self.columns.items()):
+            if column.kind == 'object':
+                values = [_encode_value(value) for value in column.values[column.present]]
+                with open(os.path.join(path, f"column{i}_values.json"), 'w') as f:
+                    json.dump(values, f)
+            else:
+                np.save(os.path.join(path, f"column{i}_values.npy"), column.values, allow_pickle=False)
+            np.save(os.path.join(path, f"column{i}_present.npy"), column.present)
+            if column.tz_aware:
+                np.save(os.path.join(path, f"column{i}_utc_offsets.npy"), column.utc_offsets)
+            columns.append({"key": key, "kind": column.kind, "categories": column.categories,
+                            "tz_aware": column.tz_aware})
+        with open(os.path.join(path, "log.json"), 'w') as f:
+            json.dump({"activities": self.activities, "trace_names": self.trace_names, "columns": columns}, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a compact log stored with save().
+
+        Parameters
+        ----------
+        path : str
+            the directory where the log is stored.
+        mmap : bool, optional
+            if True, the arrays are memory-mapped instead of being read in memory, except for the columns of 'object'
+            kind (default True).
+
+        Returns
+        -------
+        compact_log
+            the stored compact log.
+        """
+        # Memory-mapped arrays are viewed as plain arrays, which are faster to slice
+        def load_array(name):
+            return np.asarray(np.load(os.path.join(path, name), mmap_mode='r' if mmap else None, allow_pickle=False))
+
+        with open(os.path.join(path, "log.json")) as f:
+            meta = json.load(f)
+        columns = {}
+        for i, col in enumerate(meta["columns"]):
+            present = load_array(f"column{i}_present.npy")
+            if col["kind"] == 'object':
+                with open(os.path.join(path, f"column{i}_values.json")) as f:
+                    stored = json.load(f)
+                values = np.empty(len(present), dtype=object)
+                for pos, value in zip(np.flatnonzero(present).tolist(), stored):
+                    values[pos] = _decode_value(value)
+            else:
+                values = load_array(f"column{i}_values.npy")
+            utc_offsets = load_array(f"column{i}_utc_offsets.npy") if col["tz_aware"] else None
+            columns[col["key"]] = AttributeColumn(col["kind"], values, present, categories=col["categories"],
+                                                  tz_aware=col["tz_aware"], utc_offsets=utc_offsets)
+        return cls(meta["activities"], load_array("events.npy"), load_array("offsets.npy"), meta["trace_names"], columns)
+
+    def __getstate__(self):
+        # Compiled conditions cannot be pickled, the masks are computed again by the receiving process. The rebuilt
+        # traces are not sent either, while a receiving process keeps its traces as the sender does
+        state = self.__dict__.copy()
+        state["_traces"] = OrderedDict()
+        state["_condition_masks"] = {}
+        return state
+
+    def __len__(self):
+        return len(self.trace_names)
+
+    def __getitem__(self, i):
+        trace = self._traces.get(i)
+        if trace is None:
+            trace = self._traces[i] = self._build_trace(i)
+            if not self._keep_depth and len(self._traces) > TRACE_CACHE_SIZE:
+                self._traces.popitem(last=False)
+        else:
+            self._traces.move_to_end(i)
+        return trace
+
+    @contextmanager
+    def keep_traces(self):
+        """
+        Context manager keeping all the traces accessed by position inside the block, instead of the last
+        TRACE_CACHE_SIZE only, so that each of them is rebuilt at most once. When the (outermost) block ends, only the
+        last TRACE_CACHE_SIZE traces are kept again.
+        """
+        self._keep_depth += 1
+        try:
+            yield self
+        finally:
+            self._keep_depth -= 1
+            if not self._keep_depth:
+                while len(self._traces) > TRACE_CACHE_SIZE:
+                    self._traces.popitem(last=False)
+
+    def _build_trace(self, i):
+        start, end = int(self.offsets[i]), int(self.offsets[i+1])
+        events = [{"concept:name": self.activities[code]} for code in self.events[start:end].tolist()]
+        # Attributes are decoded column by column over the whole trace
+        for key, column in self.columns.items():
+            present = column.present[start:end]
+            if present.all():
+                for attributes, value in zip(events, column.decode_range(start, end)):
+                    attributes[key] = value
+            else:
+                for j in np.flatnonzero(present).tolist():
+                    events[j][key] = column.decode(start + j)
+        return Trace([Event(attributes) for attributes in events], attributes={"concept:name": self.trace_names[i]})
+
+    def __iter__(self):
+        # The traces of a scan are rebuilt without being kept
+        for i in range(len(self)):
+            yield self._build_trace(i)
+
+    def to_event_log(self) -> EventLog:
+        """
+        Return a new pm4py EventLog with all the traces of the log.
+        """
+        return EventLog([self._build_trace(i) for i in range(len(self))])
+
+    @property
+    def num_events(self) -> int:
+        return len(self.events)
+
+    @cached_property
+    def trace_ids(self) -> np.ndarray:
+        """
+        The position inside the log of the trace containing each event.
+        """
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.offsets))
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """
+        The event timestamps as int64 nanoseconds since the epoch, NO_TIMESTAMP for events without timestamp.
+        """
+        column = self.columns.get("time:timestamp")
+        if column is None or column.kind != 'date':
+            return np.full(self.num_events, NO_TIMESTAMP, dtype=np.int64)
+        return column.values
+
+    @cached_property
+    def sorted_timestamps(self) -> bool:
+        """
+        True if all the events carry a timestamp, within MAX_TIMESTAMP of the epoch, and the timestamps never
+        decrease along the traces, which allows to search them by binary search.
+        """
+        column = self.columns.get("time:timestamp")
+        if column is None or column.kind != 'date' or not column.present.all():
+            return False
+        values = column.values
+        if len(values) > 0 and np.abs(values).max() >= MAX_TIMESTAMP:
+            return False
+        same_trace = self.trace_ids[1:] == self.trace_ids[:-1]
+        return not (same_trace & (values[1:] < values[:-1])).any()
+
+    @cached_property
+    def _activity_index(self):
+        # Inverted index of the activities: the positions of the events of the activity with code c are
+        # order[bounds[c]:bounds[c+1]], sorted by position
+        order = np.argsort(self.events, kind='stable')
+        bounds = np.searchsorted(self.events[order], np.arange(len(self.activities) + 1))
+        return order, bounds
+
+    def activity_positions(self, activity: str) -> np.ndarray:
+        """
+        Return the sorted positions inside the log of the events of the given activity.
+        """
+        code = self.activity_code(activity)
+        if code == -1:
+            return np.empty(0, dtype=np.int64)
+        order, bounds = self._activity_index
+        return order[bounds[code]:bounds[code+1]]
+
+    @cached_property
+    def _activity_trace_index(self):
+        # Inverted index from the activities to the traces: the traces containing the activity with code c are
+        # values[bounds[c]:bounds[c+1]], sorted by position
+        order, bounds = self._activity_index
+        trace_ids = self.trace_ids[order]
+        # Keep the first event of each activity in each trace
+        keep = np.ones(len(trace_ids), dtype=bool)
+        keep[1:] = trace_ids[1:] != trace_ids[:-1]
+        keep[bounds[:-1][bounds[:-1] < len(trace_ids)]] = True
+        kept_before = np.concatenate(([0], np.cumsum(keep)))
+        return trace_ids[keep], kept_before[bounds]
+
+    def activity_traces(self, activity: str) -> np.ndarray:
+        """
+        Return the sorted positions inside the log of the traces containing the given activity.
+        """
+        code = self.activity_code(activity)
+        if code == -1:
+            return np.empty(0, dtype=np.int64)
+        values, bounds = self._activity_trace_index
+        return values[bounds[code]:bounds[code+1]]
+
+    def condition_mask(self, condition):
+        """
+        Return the (truth, defined) boolean arrays of an activation condition over the events of the log, None if it
+        cannot be evaluated on whole columns. Masks are computed once for each condition and then kept, as the same
+        condition is usually checked for many activities.
+        """
+        if condition not in self._condition_masks:
+            self._condition_masks[condition] = condition_mask(self, condition)
+        return self._condition_masks[condition]
+
+    def activity_code(self, activity: str) -> int:
+        """
+        Return the integer code of the given activity, -1 if it never occurs in the log.
+        """
+        return self.activity_codes.get(activity, -1)
+
+    def trace_activities(self, i: int) -> np.ndarray:
+        """
+        Return the activity codes of the events of the i-th trace.
+        """
+        return self.events[self.offsets[i]:self.offsets[i+1]]
+
+    def event_attributes(self, pos: int) -> dict:
+        """
+        Return the attributes of the event at the given position of the log.
+        """
+        attributes = {"concept:name": self.activities[self.events[pos]]}
+        for key, column in self.columns.items():
+            if column.present[pos]:
+                attributes[key] = column.decode(pos)
+        return attributes
+
+    def get_trace_keys(self) -> list[tuple[int, str]]:
+        """
+        Return the position in the log and the name of each trace.
+        """
+        return list(enumerate(self.trace_names))
+
+    def projection(self, attribute: str = "concept:name") -> list[list]:
+        """
+        Return for each trace the time-ordered list of values that the given attribute takes on the events.
+
+        Parameters
+        ----------
+        attribute : str, optional
+            the event attribute to project the log on (default 'concept:name').
+
+        Returns
+        -------
+        projection
+            nested lists, the outer one addresses traces while the inner one contains the attribute values.
+        """
+        if attribute == "concept:name":
+            names = np.array(self.activities, dtype=object)[self.events]
+        else:
+            column = self.columns.get(attribute)
+            if column is None or not column.present.all():
+                raise KeyError(attribute)
+            names = [column.decode(pos) for pos in range(self.num_events)]
+        return [list(names[start:end]) for start, end in zip(self.offsets[:-1], self.offsets[1:])]
+
+    def alphabet(self, attribute: str = "concept:name") -> list:
+        """
+        Return the distinct values that the given attribute takes on the events of the log.
+        """
+        if attribute == "concept:name":
+            return list(self.activities)
+        column = self.columns.get(attribute)
+        if column is None:
+            return []
+        if column.kind == 'str':
+            return [column.categories[code] for code in np.unique(column.values[column.present])]
+        return list(dict.fromkeys(column.decode(pos) for pos in np.flatnonzero(column.present)))
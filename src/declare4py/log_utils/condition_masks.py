@@ -0,0 +1,234 @@
+import ast
+import operator
+
+import numpy as np
+
+# Vectorized evaluation of the activation conditions, which only read the activation event 'A', over the attribute
+# columns of a CompactLog. The result is exact: the events where evaluating the condition would raise an error (e.g.
+# a missing attribute or an ordering comparison between a string and a number) are reported as undefined, so that
+# the condition is evaluated on them event by event, raising the error as before.
+
+COMPARE_OPS = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+    ast.GtE: operator.ge, ast.In: lambda x, y: x in y, ast.NotIn: lambda x, y: x not in y,
+}
+# Comparison equivalent to 'y op x' for 'x op y'
+SWAPPED_OPS = {ast.Eq: ast.Eq, ast.NotEq: ast.NotEq, ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Gt: ast.Lt, ast.GtE: ast.LtE}
+ORDERING_OPS = (ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+# Largest integer such that all the integers with smaller magnitude are exactly represented as float64
+MAX_EXACT_FLOAT = 2**53
+
+
+class _NotVectorizable(Exception):
+    pass
+
+
+class _Constant:
+    def __init__(self, value):
+        self.value = value
+
+
+class _Column:
+    # Values of an attribute over the events of the log, with the same encoding of AttributeColumn
+    def __init__(self, kind, values, categories=None):
+        self.kind = kind
+        self.values = values
+        self.categories = categories
+
+
+def _all(num_events, value):
+    return np.full(num_events, value, dtype=bool)
+
+
+def _is_number(value):
+    return isinstance(value, (bool, int, float))
+
+
+def _truth(log, value):
+    # Truth value of each event of the result of an expression
+    if isinstance(value, _Constant):
+        return _all(log.num_events, bool(value.value))
+    if isinstance(value, _Column):
+        if value.kind == 'str':
+            return np.append([bool(c) for c in value.categories], False).astype(bool)[value.values]
+        if value.kind == 'date':
+            return _all(log.num_events, True)
+        return value.values != 0
+    return value
+
+
+def _compare_categories(op, column, constant):
+    # Compare each distinct string of the column in Python, then spread the results over the events
+    truth, error = [], []
+    for category in column.categories:
+        try:
+            truth.append(bool(op(category, constant)))
+            error.append(False)
+        except TypeError:
+            truth.append(False)
+            error.append(True)
+    # Events without the attribute have code -1, which picks the trailing value
+    return np.append(truth, False).astype(bool)[column.values], np.append(error, False).astype(bool)[column.values]
+
+
+def _compare_numbers(op_type, column, constant):
+    num_events = len(column.values)
+    no_error = _all(num_events, False)
+    if op_type in (ast.In, ast.NotIn):
+        if not isinstance(constant, tuple):
+            raise _NotVectorizable
+        numbers = [c for c in constant if _is_number(c)]
+        for number in numbers:
+            _check_exact(column, number)
+        truth = np.isin(column.values, numbers) if numbers else _all(num_events, False)
+        return (truth if op_type is ast.In else ~truth), no_error
+
+    if not _is_number(constant):
+        # Numbers are never equal to other values, and cannot be ordered with them
+        if op_type in ORDERING_OPS:
+            return _all(num_events, False), _all(num_events, True)
+        return _all(num_events, op_type is ast.NotEq), no_error
+
+    _check_exact(column, constant)
+    return COMPARE_OPS[op_type](column.values, constant), no_error
+
+
+def _check_exact(column, number):
+    # NumPy compares integers and floats as float64, which is exact only up to MAX_EXACT_FLOAT
+    if isinstance(number, int) and not -MAX_EXACT_FLOAT <= number <= MAX_EXACT_FLOAT:
+        raise _NotVectorizable
+    if column.kind == 'int' and isinstance(number, float) and len(column.values) > 0 and \
+            np.abs(column.values).max() > MAX_EXACT_FLOAT:
+        raise _NotVectorizable
+
+
+def _compare(log, node):
+    if len(node.ops) != 1 or type(node.ops[0]) not in COMPARE_OPS:
+        raise _NotVectorizable
+    op_type = type(node.ops[0])
+    right_node = node.comparators[0]
+
+    # Presence of an attribute in the activation event
+    if op_type in (ast.In, ast.NotIn) and isinstance(right_node, ast.Name) and right_node.id == 'A':
+        left, defined = _evaluate(log, node.left)
+        if not isinstance(left, _Constant):
+            raise _NotVectorizable
+        if left.value == "concept:name":
+            present = _all(log.num_events, True)
+        elif left.value in log.columns:
+            present = log.columns[left.value].present.copy()
+        else:
+            present = _all(log.num_events, False)
+        return (present if op_type is ast.In else ~present), defined
+
+    left, left_defined = _evaluate(log, node.left)
+    right, right_defined = _evaluate(log, right_node)
+    defined = left_defined & right_defined
+    if isinstance(left, _Constant) and isinstance(right, _Constant):
+        try:
+            return _all(log.num_events, bool(COMPARE_OPS[op_type](left.value, right.value))), defined
+        except TypeError:
+            return _all(log.num_events, False), _all(log.num_events, False)
+
+    if isinstance(left, _Constant) and isinstance(right, _Column) and op_type in SWAPPED_OPS:
+        left, right, op_type = right, left, SWAPPED_OPS[op_type]
+    if not (isinstance(left, _Column) and isinstance(right, _Constant)):
+        raise _NotVectorizable
+
+    if left.kind == 'str':
+        truth, error = _compare_categories(COMPARE_OPS[op_type], left, right.value)
+    elif left.kind == 'date':
+        # Dates are never equal to the constants of the conditions, and cannot be ordered with them
+        if op_type in ORDERING_OPS:
+            truth, error = _all(log.num_events, False), _all(log.num_events, True)
+        elif op_type in (ast.In, ast.NotIn) and not isinstance(right.value, tuple):
+            raise _NotVectorizable
+        else:
+            truth, error = _all(log.num_events, op_type in (ast.NotEq, ast.NotIn)), _all(log.num_events, False)
+    else:
+        truth, error = _compare_numbers(op_type, left, right.value)
+    return truth, defined & ~error
+
+
+def _bool_op(log, node):
+    # The result of 'and' and 'or' is one of the operands, only its truth value is needed. An operand is evaluated
+    # only if the previous ones do not decide the result, hence errors are raised only on those events
+    is_and = isinstance(node.op, ast.And)
+    truth = None
+    defined = None
+    for value_node in node.values:
+        value, value_defined = _evaluate(log, value_node)
+        value_truth = _truth(log, value)
+        if truth is None:
+            truth, defined = value_truth, value_defined
+        elif is_and:
+            defined = defined & (~truth | value_defined)
+            truth = truth & value_truth
+        else:
+            defined = defined & (truth | value_defined)
+            truth = truth | value_truth
+    return truth, defined
+
+
+def _evaluate(log, node):
+    # Return the value of the expression over the events, a _Constant, a _Column or an array of truth values, and
+    # the mask of the events where it is defined
+    defined = _all(log.num_events, True)
+
+    if isinstance(node, ast.Constant):
+        return _Constant(node.value), defined
+
+    if isinstance(node, ast.Tuple) and all(isinstance(elt, ast.Constant) for elt in node.elts):
+        return _Constant(tuple(elt.value for elt in node.elts)), defined
+
+    if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) and node.value.id == 'A' and \
+            isinstance(node.slice, ast.Constant):
+        key = node.slice.value
+        if key == "concept:name":
+            return _Column('str', log.events, log.activities), defined
+        column = log.columns.get(key)
+        if column is None:
+            return _Constant(None), _all(log.num_events, False)
+        if column.kind == 'object':
+            raise _NotVectorizable
+        return _Column(column.kind, column.values, column.categories), column.present.copy()
+
+    if isinstance(node, ast.Compare):
+        return _compare(log, node)
+
+    if isinstance(node, ast.BoolOp):
+        return _bool_op(log, node)
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        value, defined = _evaluate(log, node.operand)
+        return ~_truth(log, value), defined
+
+    raise _NotVectorizable
+
+
+def condition_mask(log, condition):
+    """
+    Evaluate an activation condition on all the events of a compact log at once.
+
+    Parameters
+    ----------
+    log : CompactLog
+        the log whose events are the activation events.
+    condition
+        the compiled condition, reading only the activation event 'A'.
+
+    Returns
+    -------
+    mask
+        a tuple (truth, defined) of boolean arrays over the events of the log, where 'truth' is the truth value of the
+        condition on each event and 'defined' is False for the events where evaluating the condition raises an error.
+        None if the condition uses constructs that cannot be evaluated on whole columns, e.g. arithmetic.
+    """
+    if not condition.names <= {'A'}:
+        return None
+    try:
+        value, defined = _evaluate(log, condition.tree)
+        return _truth(log, value), defined
+    except _NotVectorizable:
+        return None
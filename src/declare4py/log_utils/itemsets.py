@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from .compact_log import CompactLog
+
+# Number of set bits of each byte, for NumPy versions without bitwise_count
+POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(words):
+    # Number of set bits of each row of an array of uint64 words
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return POPCOUNT_TABLE[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def _bitsets(codes, trace_ids, num_items, num_traces):
+    # Pack the (item code, trace position) pairs, sorted by code then position, into one row of uint64 words for each
+    # item, where the bit of a trace is set if the trace contains the item
+    num_words = (num_traces + 63) // 64
+    bitsets = np.zeros((num_items, num_words), dtype=np.uint64)
+    if len(codes) == 0:
+        return bitsets
+    flat = codes.astype(np.int64) * num_words + (trace_ids >> 6)
+    bits = np.left_shift(np.uint64(1), (trace_ids & 63).astype(np.uint64))
+    starts = np.flatnonzero(np.concatenate(([True], flat[1:] != flat[:-1])))
+    bitsets.reshape(-1)[flat[starts]] = np.bitwise_or.reduceat(bits, starts)
+    return bitsets
+
+
+def trace_bitsets(log, attribute="concept:name"):
+    """
+    Return the values of an event attribute in the log and, for each of them, the bitset of the traces containing it.
+
+    Parameters
+    ----------
+    log : CompactLog or XesTraceStream
+        the log. The traces of each activity of a compact log are read from its index, the other logs are projected.
+    attribute : str, optional
+        the event attribute (default 'concept:name').
+
+    Returns
+    -------
+    items, bitsets
+        the sorted attribute values and a uint64 array with one row for each of them, whose i-th bit is set if the i-th
+        trace of the log contains the value.
+    """
+    if isinstance(log, CompactLog) and attribute == "concept:name":
+        items = sorted(log.activities)
+        traces = [log.activity_traces(item) for item in items]
+        codes = np.repeat(np.arange(len(items)), [len(t) for t in traces])
+        trace_ids = np.concatenate(traces).astype(np.int64) if traces else np.empty(0, dtype=np.int64)
+        return items, _bitsets(codes, trace_ids, len(items), len(log))
+
+    projection = log.projection(attribute)
+    items = sorted({item for trace in projection for item in trace})
+    item_codes = {item: code for code, item in enumerate(items)}
+    codes, trace_ids = [], []
+    for i, trace in enumerate(projection):
+        for item in set(trace):
+            codes.append(item_codes[item])
+            trace_ids.append(i)
+    codes = np.array(codes, dtype=np.int64)
+    trace_ids = np.array(trace_ids, dtype=np.int64)
+    order = np.lexsort((trace_ids, codes))
+    return items, _bitsets(codes[order], trace_ids[order], len(items), len(projection))
+
+
+def mine_frequent_itemsets(log, min_support, attribute="concept:name", max_length=2) -> pd.DataFrame:
+    """
+    Compute the item sets of at most two values of an event attribute whose support, i.e. the fraction of the traces
+    containing all their values, is at least 'min_support'. The supports are counted on the trace bitsets of the values
+    with popcount, without building the one-hot encoding of the log.
+
+    Parameters
+    ----------
+    log : CompactLog or XesTraceStream
+        the log.
+    min_support : float
+        the minimum support of the returned item sets, item sets never occurring are not returned.
+    attribute : str, optional
+        the event attribute (default 'concept:name').
+    max_length : int, optional
+        the maximum length of the item sets, 1 or 2 (default 2).
+
+    Returns
+    -------
+    frequent_itemsets
+        DataFrame with the same columns of the mlxtend item sets, 'support' and 'itemsets' (frozensets of values),
+        plus 'length'. The 1-item sets come first by decreasing support, then the 2-item sets.
+    """
+    items, bitsets = trace_bitsets(log, attribute)
+    num_traces = len(log)
+    rows = []
+    if max_length >= 1 and num_traces:
+        counts = _popcount(bitsets)
+        # The order of the sorted items is kept among equal supports
+        order = np.argsort(-counts, kind="stable").tolist()
+        counts = counts.tolist()
+        frequent = [code for code in order if counts[code] > 0 and counts[code] / num_traces >= min_support]
+        rows = [(counts[code] / num_traces, frozenset([items[code]]), 1) for code in frequent]
+        if max_length >= 2:
+            for k, code in enumerate(frequent[:-1]):
+                others = frequent[k + 1:]
+                pair_counts = _popcount(bitsets[code] & bitsets[others]).tolist()
+                rows += [(count / num_traces, frozenset([items[code], items[other]]), 2)
+                         for other, count in zip(others, pair_counts)
+                         if count > 0 and count / num_traces >= min_support]
+    return pd.DataFrame(rows, columns=["support", "itemsets", "length"]).astype({"support": float, "length": np.int64})
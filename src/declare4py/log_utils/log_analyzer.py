@@ -2,6 +2,10 @@ import pandas as pd
 import pm4py
 from mlxtend.frequent_patterns import fpgrowth, apriori
 
+from .compact_log import CompactLog
+from .log_cache import read_event_log, read_xes_cached
+from .xes_stream import XesTraceStream
+
 
 class LogAnalyzer:
     """
@@ -10,8 +14,11 @@ class LogAnalyzer:
 
         Attributes
         ----------
-        log : EventLog
-            the input event log parsed from a XES file
+        log : CompactLog or XesTraceStream
+            the input event log parsed from a XES file, i.e. its compact version or, if the log is read in streaming
+            mode, a stream of its traces
+        compact_log : CompactLog
+            the columnar, integer-encoded version of the input log, None in streaming mode
         log_length : int
             the trace number of the input log
         frequent_item_sets : DataFrame
@@ -20,22 +27,45 @@ class LogAnalyzer:
 
     def __init__(self):
         self.log = None
-        self.log_length = None
+        self.compact_log = None
         self.frequent_item_sets = None
 
     # LOG MANAGEMENT UTILITIES
-    def parse_xes_log(self, log_path: str) -> None:
+    def parse_xes_log(self, log_path: str, streaming: bool = False, cache_dir: str = None) -> None:
         """
-        Set the 'log' EventLog object and the 'log_length' integer by reading and parsing the log corresponding to
-        given log file path.
+        Set the 'log' and 'compact_log' objects by reading and parsing the log corresponding to given log file path.
+        The parsed EventLog is only kept as its compact encoding, both 'log' and 'compact_log' are set to the compact
+        log, whose traces are rebuilt when they are accessed.
 
         Parameters
         ----------
         log_path : str
             File path where the log is stored.
-        """
-        self.log = pm4py.read_xes(log_path)
-        self.log_length = len(self.log)
+        streaming : bool, optional
+            if True, the log is not loaded in memory: 'log' streams the traces from the file each time it is iterated
+            and no 'compact_log' is built (default False).
+        cache_dir : str, optional
+            if specified, the 'compact_log' is stored in this directory after the first parsing and it is
+            memory-mapped from there by the next calls, until the log file changes.
+        """
+        if streaming:
+            self.log = XesTraceStream(log_path)
+            self.compact_log = None
+        else:
+            if cache_dir is not None:
+                self.compact_log = read_xes_cached(log_path, cache_dir)
+            else:
+                self.compact_log = CompactLog.from_event_log(read_event_log(log_path))
+            self.log = self.compact_log
+
+    @property
+    def log_length(self) -> int:
+        # Counted when requested, as the length of a streamed log is only known after parsing the whole file
+        return None if self.log is None else len(self.log)
+
+    def _log_source(self):
+        # The compact log answers projections and alphabets, the trace stream is scanned instead in streaming mode
+        return self.compact_log if self.compact_log is not None else self.log
 
     def activities_log_projection(self) -> list[list[str]]:
         """
@@ -46,15 +76,9 @@ class LogAnalyzer:
         projection
             nested lists, the outer one addresses traces while the inner one contains event activity names.
         """
-        projection = []
         if self.log is None:
             raise RuntimeError("You must load a log before.")
-        for trace in self.log:
-            tmp_trace = []
-            for event in trace:
-                tmp_trace.append(event["concept:name"])
-            projection.append(tmp_trace)
-        return projection
+        return self._log_source().projection("concept:name")
 
     def resources_log_projection(self) -> list[list[str]]:
         """
@@ -65,15 +89,9 @@ class LogAnalyzer:
         projection
             nested lists, the outer one addresses traces while the inner one contains event activity names.
         """
-        projection = []
         if self.log is None:
             raise RuntimeError("You must load a log before.")
-        for trace in self.log:
-            tmp_trace = []
-            for event in trace:
-                tmp_trace.append(event["org:group"])
-            projection.append(tmp_trace)
-        return projection
+        return self._log_source().projection("org:group")
 
     def compute_frequent_itemsets(self, min_support: float, dimension: str = 'act', algorithm: str = 'fpgrowth',
                                   len_itemset: int = None) -> None:
@@ -126,7 +144,8 @@ class LogAnalyzer:
 
     def get_log(self) -> pm4py.objects.log.obj.EventLog:
         """
-        Return the log previously fed in input.
+        Return the log previously fed in input. A new EventLog is built from the compact log at each call, the stream
+        of the traces is returned in streaming mode.
 
         Returns
         -------
@@ -135,6 +154,8 @@ class LogAnalyzer:
         """
         if self.log is None:
             raise RuntimeError("You must load a log before.")
+        if isinstance(self.log, CompactLog):
+            return self.log.to_event_log()
         return self.log
 
 
@@ -149,11 +170,7 @@ class LogAnalyzer:
         """
         if self.log is None:
             raise RuntimeError("You must load a log before.")
-        resources = set()
-        for trace in self.log:
-            for event in trace:
-                resources.add(event["org:group"])
-        return resources
+        return set(self._log_source().alphabet("org:group"))
 
 
     def get_log_alphabet_activities(self):
@@ -167,11 +184,7 @@ class LogAnalyzer:
         """
         if self.log is None:
             raise RuntimeError("You must load a log before.")
-        activities = set()
-        for trace in self.log:
-            for event in trace:
-                activities.add(event["concept:name"])
-        return list(activities)
+        return self._log_source().alphabet("concept:name")
 
     def get_frequent_item_sets(self) -> pd.DataFrame:
         """
@@ -0,0 +1,154 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+
+import pm4py
+
+from .compact_log import CompactLog
+
+# Version of the cache layout, cached logs written with a different version are parsed again
+CACHE_VERSION = 2
+
+
+def read_event_log(log_path):
+    """
+    Return the pm4py EventLog of the given XES file. Since pm4py 2.3, read_xes() returns a DataFrame unless the legacy
+    EventLog object is requested, the older versions always return an EventLog.
+
+    Parameters
+    ----------
+    log_path : str
+        File path where the log is stored.
+
+    Returns
+    -------
+    log
+        the event log of the file.
+    """
+    if "return_legacy_log_object" in inspect.signature(pm4py.read_xes).parameters:
+        return pm4py.read_xes(log_path, return_legacy_log_object=True)
+    return pm4py.read_xes(log_path)
+
+
+def _file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _cache_entry(log_path, cache_dir):
+    # Each log file has its own entry, named after the hash of its absolute path
+    abs_path = os.path.abspath(log_path)
+    return abs_path, os.path.join(cache_dir, hashlib.sha1(abs_path.encode()).hexdigest())
+
+
+def load_cached_log(log_path, cache_dir, mmap=True):
+    """
+    Return the cached compact log of the given XES file, None if it is not cached or if the cache is stale. The cache
+    is valid if it was built for the same file path and either the file modification time is unchanged or, when it
+    changed, the content hash is the same.
+
+    Parameters
+    ----------
+    log_path : str
+        File path where the log is stored.
+    cache_dir : str
+        the directory of the cache.
+    mmap : bool, optional
+        if True, the arrays of the cached log are memory-mapped (default True).
+
+    Returns
+    -------
+    compact_log
+        the cached compact log, None on cache misses.
+    """
+    abs_path, entry = _cache_entry(log_path, cache_dir)
+    key_path = os.path.join(entry, "key.json")
+    if not os.path.isfile(key_path):
+        return None
+    with open(key_path) as f:
+        key = json.load(f)
+    if key.get("version") != CACHE_VERSION or key.get("path") != abs_path:
+        return None
+
+    stat = os.stat(log_path)
+    if key["size"] != stat.st_size:
+        return None
+    if key["mtime"] != stat.st_mtime_ns:
+        # The file has been touched, its content is checked before reusing the cache
+        if key["sha256"] != _file_hash(log_path):
+            return None
+        key["mtime"] = stat.st_mtime_ns
+        with open(key_path, 'w') as f:
+            json.dump(key, f)
+    return CompactLog.load(os.path.join(entry, "log"), mmap=mmap)
+
+
+def store_cached_log(log_path, cache_dir, compact_log):
+    """
+    Store the compact log of the given XES file in the cache, replacing the previous entry of the file (if any).
+
+    Parameters
+    ----------
+    log_path : str
+        File path where the log is stored.
+    cache_dir : str
+        the directory of the cache.
+    compact_log : CompactLog
+        the compact log of the file.
+
+    Raises
+    ------
+    TypeError
+        if the log has attribute values that cannot be stored, see CompactLog.save().
+    """
+    abs_path, entry = _cache_entry(log_path, cache_dir)
+    stat = os.stat(log_path)
+    key = {"version": CACHE_VERSION, "path": abs_path, "size": stat.st_size, "mtime": stat.st_mtime_ns,
+           "sha256": _file_hash(log_path)}
+
+    # The entry is written aside and moved in place at the end, so that a partially written entry is never read
+    tmp_entry = entry + ".tmp" + str(os.getpid())
+    shutil.rmtree(tmp_entry, ignore_errors=True)
+    try:
+        compact_log.save(os.path.join(tmp_entry, "log"))
+    except TypeError:
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+        raise
+    with open(os.path.join(tmp_entry, "key.json"), 'w') as f:
+        json.dump(key, f)
+    shutil.rmtree(entry, ignore_errors=True)
+    os.replace(tmp_entry, entry)
+
+
+def read_xes_cached(log_path, cache_dir, mmap=True):
+    """
+    Return the compact log of the given XES file, loading it from the cache if it is valid. Otherwise the file is
+    parsed with pm4py and the cache is updated, unless the log has attribute values that cannot be stored.
+
+    Parameters
+    ----------
+    log_path : str
+        File path where the log is stored.
+    cache_dir : str
+        the directory of the cache.
+    mmap : bool, optional
+        if True, the arrays of a cached log are memory-mapped (default True).
+
+    Returns
+    -------
+    compact_log
+        the compact log of the file.
+    """
+    compact_log = load_cached_log(log_path, cache_dir, mmap)
+    if compact_log is None:
+        compact_log = CompactLog.from_event_log(read_event_log(log_path))
+        try:
+            store_cached_log(log_path, cache_dir, compact_log)
+        except TypeError as e:
+            print(f"The log is not cached: {e}")
+    return compact_log
@@ -0,0 +1,50 @@
+class LogVariants:
+    """
+    Variant-compressed view of a log, where each distinct activity sequence (variant) of its traces is kept only
+    once. The result of a constraint without data or time conditions only depends on the activity sequence of a
+    trace, so it can be checked once per variant and shared by all the traces of the variant. Only the variants are
+    kept, so that the memory does not grow with the number of traces: the variant of a trace is found by variant_of()
+    when the log is read again, unless the variants are built with keep_traces=True.
+
+    Attributes
+    ----------
+    traces : list[list[dict]]
+        a trace for each variant, whose events only carry the 'concept:name' attribute
+    counts : list[int]
+        the number of traces of each variant
+    num_traces : int
+        the number of traces of the log
+    trace_variants : list[int]
+        the variant index of each trace of the log, None unless keep_traces=True
+    trace_keys : list[tuple[int, str]]
+        the position in the log and the name of each trace, None unless keep_traces=True
+    """
+    def __init__(self, log, keep_traces=False):
+        self.traces = []
+        self.counts = []
+        self.num_traces = 0
+        self.trace_variants = [] if keep_traces else None
+        self.trace_keys = [] if keep_traces else None
+        self._variant_index = {}
+
+        for i, trace in enumerate(log):
+            variant = tuple(event["concept:name"] for event in trace)
+            v = self._variant_index.get(variant)
+            if v is None:
+                v = self._variant_index[variant] = len(self.traces)
+                self.traces.append([{"concept:name": activity} for activity in variant])
+                self.counts.append(0)
+            self.counts[v] += 1
+            self.num_traces += 1
+            if keep_traces:
+                self.trace_variants.append(v)
+                self.trace_keys.append((i, trace.attributes["concept:name"]))
+
+    def __len__(self):
+        return len(self.traces)
+
+    def variant_of(self, trace) -> int:
+        """
+        Return the index of the variant of a trace of the log.
+        """
+        return self._variant_index[tuple(event["concept:name"] for event in trace)]
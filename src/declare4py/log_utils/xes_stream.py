@@ -0,0 +1,161 @@
+import gzip
+import xml.etree.ElementTree as ET
+
+from pm4py.objects.log.obj import Event, Trace
+from pm4py.util.dt_parsing import parser as dt_parser
+
+from .variants import LogVariants
+
+
+def _local_tag(elem):
+    # Strip the XES namespace, if any
+    return elem.tag.rsplit('}', 1)[-1]
+
+
+def _parse_attributes(elem, date_parser, as_pairs=False):
+    # Parse the attributes directly contained in an element, with the same types of pm4py, into a dictionary or, for
+    # the <values> of a list, into a list of (key, value) pairs. As in pm4py, an attribute with nested attributes is a
+    # dictionary with its 'value' (None for lists and containers) and its 'children', parsed in turn
+    attributes = []
+    for child in elem:
+        key = child.get("key")
+        if key is None:
+            continue
+        tag = _local_tag(child)
+        value = child.get("value")
+        try:
+            if tag in ("list", "container"):
+                value = None
+            elif value is None:
+                continue
+            elif tag == "date":
+                value = date_parser.apply(value)
+            elif tag == "int":
+                value = int(value)
+            elif tag == "float":
+                value = float(value)
+            elif tag == "boolean":
+                value = value.lower() == "true"
+            elif tag not in ("string", "id"):
+                continue
+        except (TypeError, ValueError):
+            # Attributes with malformed values are skipped, as pm4py does
+            continue
+        if len(child) > 0:
+            if _local_tag(child[0]) == "values":
+                value = {"value": value, "children": _parse_attributes(child[0], date_parser, as_pairs=True)}
+            else:
+                value = {"value": value, "children": _parse_attributes(child, date_parser)}
+        attributes.append((key, value))
+    return attributes if as_pairs else dict(attributes)
+
+
+def _open_xes(path):
+    return gzip.open(path, 'rb') if str(path).endswith('.gz') else open(path, 'rb')
+
+
+def iter_xes_traces(path):
+    """
+    Lazily parse the traces of a XES (or gzipped XES) file, one at a time. The XML elements of each trace are released
+    as soon as the trace is yielded, so the memory used is bounded by the largest trace of the log. List, container
+    and nested attributes are parsed as pm4py does.
+
+    Parameters
+    ----------
+    path : str
+        File path where the log is stored.
+
+    Returns
+    -------
+    traces
+        generator of the pm4py traces of the log, in file order.
+    """
+    date_parser = dt_parser.get()
+    with _open_xes(path) as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        for tree_event, elem in context:
+            if tree_event != "end" or _local_tag(elem) != "trace":
+                continue
+            events = [Event(_parse_attributes(child, date_parser)) for child in elem if _local_tag(child) == "event"]
+            yield Trace(events, attributes=_parse_attributes(elem, date_parser))
+            # Only the trace being parsed is kept in the tree
+            root.clear()
+
+
+def count_xes_traces(path):
+    """
+    Return the number of traces of a XES (or gzipped XES) file without building them.
+    """
+    num_traces = 0
+    with _open_xes(path) as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        for tree_event, elem in context:
+            if tree_event == "end" and _local_tag(elem) == "trace":
+                num_traces += 1
+                root.clear()
+    return num_traces
+
+
+class XesTraceStream:
+    """
+    Re-iterable log that streams the traces of a XES file instead of holding them in memory: each iteration parses
+    the file again. It can be used wherever an EventLog is iterated trace by trace. Its length is counted by the first
+    complete iteration, or by parsing the file if it is requested before.
+
+    Attributes
+    ----------
+    path : str
+        the path of the XES file
+    """
+    def __init__(self, path):
+        self.path = path
+        self._length = None
+        self._variants = None
+
+    def __iter__(self):
+        num_traces = 0
+        for trace in iter_xes_traces(self.path):
+            num_traces += 1
+            yield trace
+        self._length = num_traces
+
+    def __len__(self):
+        if self._length is None:
+            self._length = count_xes_traces(self.path)
+        return self._length
+
+    def variants(self) -> LogVariants:
+        """
+        Return the variant-compressed view of the log, which is computed by the first call only.
+        """
+        if self._variants is None:
+            self._variants = LogVariants(self)
+            self._length = self._variants.num_traces
+        return self._variants
+
+    def get_trace_keys(self) -> list[tuple[int, str]]:
+        """
+        Return the position in the log and the name of each trace.
+        """
+        return [(i, trace.attributes["concept:name"]) for i, trace in enumerate(self)]
+
+    def projection(self, attribute: str = "concept:name") -> list[list]:
+        """
+        Return for each trace the time-ordered list of values that the given attribute takes on the events.
+        """
+        return [[event[attribute] for event in trace] for trace in self]
+
+    def alphabet(self, attribute: str = "concept:name") -> list:
+        """
+        Return the distinct values that the given attribute takes on the events of the log.
+        """
+        values = {}
+        # Once computed, the variants give the activities in the same order, without parsing the file again
+        traces = self._variants.traces if attribute == "concept:name" and self._variants is not None else self
+        for trace in traces:
+            for event in trace:
+                if attribute in event:
+                    values.setdefault(event[attribute])
+        return list(values)
@@ -1,2 +1,4 @@
 from .checker_result import *
+from .conformance_results import *
+from .conformance_statistics import *
 from .decl_model import *
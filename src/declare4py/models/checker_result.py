@@ -1,4 +1,6 @@
 class CheckerResult:
+    __slots__ = ("num_fulfillments", "num_violations", "num_pendings", "num_activations", "state")
+
     def __init__(self, num_fulfillments, num_violations, num_pendings, num_activations, state):
         self.num_fulfillments = num_fulfillments
         self.num_violations = num_violations
@@ -0,0 +1,173 @@
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from ..enums import TraceState
+from .checker_result import CheckerResult
+
+# Trace states indexed by their code in ConformanceResults
+TRACE_STATES = list(TraceState)
+STATE_CODES = {state: code for code, state in enumerate(TRACE_STATES)}
+
+# Code of the counters that are None and of the missing results, i.e. of the constraints that could not be checked
+NO_VALUE = -1
+
+COUNTERS = ("num_fulfillments", "num_violations", "num_pendings", "num_activations")
+
+
+class TraceResults(Mapping):
+    """
+    Read-only view of the results of a trace inside a ConformanceResults, behaving as a dictionary with keys the
+    constraint strings and values the CheckerResult objects, which are built when they are accessed.
+    """
+    def __init__(self, results, row):
+        self._constraint_index = results.constraint_index
+        self._constraints = results.constraints
+        # The row is read once as Python lists, which are much faster to index than the arrays
+        self._counters = [getattr(results, name)[row].tolist() for name in COUNTERS]
+        self._states = results.states[row].tolist()
+
+    def __getitem__(self, constraint_str):
+        column = self._constraint_index[constraint_str]
+        state = self._states[column]
+        if state == NO_VALUE:
+            raise KeyError(constraint_str)
+        num_fulfillments, num_violations, num_pendings, num_activations = [
+            None if value == NO_VALUE else value for value in (values[column] for values in self._counters)]
+        return CheckerResult(num_fulfillments, num_violations, num_pendings, num_activations, TRACE_STATES[state])
+
+    def __iter__(self):
+        return (constraint_str for constraint_str, state in zip(self._constraints, self._states) if state != NO_VALUE)
+
+    def __len__(self):
+        return len(self._states) - self._states.count(NO_VALUE)
+
+
+class ConformanceResults(Mapping):
+    """
+    Columnar store of the conformance checking results of a log, with one row for each trace and one column for each
+    constraint. It behaves as the dictionary with keys the tuples (trace position inside the log, trace name) and
+    values dictionaries with keys the constraint strings and values CheckerResult objects, which are only built when
+    they are accessed. The counters are kept in int32 arrays and the states as int8 codes, instead of one Python object
+    for each trace and constraint.
+
+    Attributes
+    ----------
+    trace_keys : list[tuple[int, str]]
+        the key of each row
+    constraints : list[str]
+        the constraint string of each column
+    constraint_index : dict[str: int]
+        the column of each constraint string
+    num_fulfillments, num_violations, num_pendings, num_activations : ndarray[int32]
+        the counters of each trace (rows) and constraint (columns), NO_VALUE where they are None
+    states : ndarray[int8]
+        the code of the state of each trace and constraint in TRACE_STATES, NO_VALUE if the result is missing
+    """
+    def __init__(self, constraints):
+        self.trace_keys = []
+        self.constraints = list(dict.fromkeys(constraints))
+        self.constraint_index = {constraint_str: j for j, constraint_str in enumerate(self.constraints)}
+        self._trace_index = None
+        self._allocate(0)
+
+    def _allocate(self, capacity):
+        # Resize the arrays to the given number of rows, keeping the filled ones
+        shape = (capacity, len(self.constraints))
+        for name in COUNTERS:
+            values = np.full(shape, NO_VALUE, dtype=np.int32)
+            if hasattr(self, name):
+                values[:len(self.trace_keys)] = getattr(self, name)[:len(self.trace_keys)]
+            setattr(self, name, values)
+        states = np.full(shape, NO_VALUE, dtype=np.int8)
+        if hasattr(self, "states"):
+            states[:len(self.trace_keys)] = self.states[:len(self.trace_keys)]
+        self.states = states
+
+    def add_trace(self, trace_key, trace_results):
+        """
+        Append the row of a trace.
+
+        Parameters
+        ----------
+        trace_key : tuple[int, str]
+            the position of the trace inside the log and its name.
+        trace_results : dict[str: CheckerResult]
+            the results of the constraints checked on the trace, it can miss some constraints.
+        """
+        row = len(self.trace_keys)
+        if row == len(self.states):
+            self._allocate(max(2 * row, 16))
+        self.trace_keys.append(trace_key)
+        self._trace_index = None
+        if not trace_results:
+            return
+
+        columns = [self.constraint_index[constraint_str] for constraint_str in trace_results]
+        results = trace_results.values()
+        for name in COUNTERS:
+            values = [getattr(result, name) for result in results]
+            getattr(self, name)[row, columns] = [NO_VALUE if value is None else value for value in values]
+        self.states[row, columns] = [NO_VALUE if result.state is None else STATE_CODES[result.state]
+                                     for result in results]
+
+    def set_rows(self, other, rows, start=0):
+        """
+        Copy the results of another store into the rows from 'start' on, the (start+i)-th one taking the rows[i]-th
+        row of the other store. E.g. the results of the variants of a log are spread over their traces.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = [self.constraint_index[constraint_str] for constraint_str in other.constraints]
+        for name in COUNTERS + ("states",):
+            getattr(self, name)[start:start + len(rows), columns] = getattr(other, name)[rows]
+
+    def set_vectorized(self, constraint_str, vec_result):
+        """
+        Fill the column of a constraint with the per-trace arrays returned by a vectorized checker.
+        """
+        column = self.constraint_index[constraint_str]
+        *counters, satisfied = vec_result
+        n = len(self.trace_keys)
+        for name, values in zip(COUNTERS, counters):
+            getattr(self, name)[:n, column] = NO_VALUE if values is None else values[:n]
+        self.states[:n, column] = np.where(satisfied[:n], STATE_CODES[TraceState.SATISFIED],
+                                           STATE_CODES[TraceState.VIOLATED])
+
+    def result(self, row, column):
+        """
+        Return the CheckerResult of the trace and constraint at the given row and column, None if it is missing.
+        """
+        return TraceResults(self, row).get(self.constraints[column])
+
+    def __getitem__(self, trace_key):
+        if self._trace_index is None:
+            self._trace_index = {key: row for row, key in enumerate(self.trace_keys)}
+        return TraceResults(self, self._trace_index[trace_key])
+
+    def __iter__(self):
+        return iter(self.trace_keys)
+
+    def __len__(self):
+        return len(self.trace_keys)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Return the results as a DataFrame with one row for each trace and checked constraint, and the columns
+        'trace_id', 'trace_name', 'constraint', the counters (as nullable integers) and 'state'.
+        """
+        n = len(self.trace_keys)
+        rows, columns = np.nonzero(self.states[:n] != NO_VALUE)
+        trace_ids = np.array([key[0] for key in self.trace_keys], dtype=np.int64)
+        trace_names = np.array([key[1] for key in self.trace_keys], dtype=object)
+        data = {
+            "trace_id": trace_ids[rows],
+            "trace_name": trace_names[rows],
+            "constraint": pd.Categorical.from_codes(columns, categories=self.constraints),
+        }
+        for name in COUNTERS:
+            values = getattr(self, name)[rows, columns]
+            data[name] = pd.arrays.IntegerArray(values, values == NO_VALUE)
+        data["state"] = pd.Categorical.from_codes(self.states[rows, columns],
+                                                  categories=[state.value for state in TRACE_STATES])
+        return pd.DataFrame(data)
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+from ..enums import TraceState
+from .conformance_results import COUNTERS, NO_VALUE, STATE_CODES, TRACE_STATES, ConformanceResults
+
+# Number of traces whose results are buffered before being added to the aggregates
+BUFFER_SIZE = 1024
+
+
+class ConformanceStatistics:
+    """
+    Aggregates of the conformance checking results of a log for each constraint, updated while the traces are checked
+    so that the results of each trace are never all kept in memory.
+
+    Attributes
+    ----------
+    constraints : list[str]
+        the constraint strings
+    num_traces : int
+        the number of traces checked so far
+    state_counts : ndarray[int64]
+        the number of traces of each constraint (rows) in each state (columns, in the order of TRACE_STATES)
+    num_fulfillments, num_violations, num_pendings, num_activations : ndarray[int64]
+        the sum of the counters over the traces for each constraint, the counters which are None are not added
+    """
+    def __init__(self, constraints, violating_traces=False):
+        self._buffer = ConformanceResults(constraints)
+        self._buffer_start = 0
+        self.constraints = self._buffer.constraints
+        self.num_traces = 0
+        self.state_counts = np.zeros((len(self.constraints), len(TRACE_STATES)), dtype=np.int64)
+        for name in COUNTERS:
+            setattr(self, name, np.zeros(len(self.constraints), dtype=np.int64))
+        # Bitmaps of the violating trace positions, one row of packed bits for each constraint
+        self._violating = np.zeros((len(self.constraints), 0), dtype=np.uint8) if violating_traces else None
+
+    def _aggregate(self, columns, counters, states, trace_ids, weights=None):
+        # Add the counters and states of some traces (rows) and constraints (columns), each row counting as 'weights'
+        # traces
+        if weights is None:
+            weights = np.ones(len(states), dtype=np.int64)
+        for code in range(len(TRACE_STATES)):
+            self.state_counts[columns, code] += weights @ (states == code)
+        for name, values in zip(COUNTERS, counters):
+            getattr(self, name)[columns] += weights @ np.where(values == NO_VALUE, 0, values).astype(np.int64)
+        if self._violating is not None and len(trace_ids) > 0:
+            self._reserve_bits(int(trace_ids.max()) + 1)
+            rows, cols = np.nonzero(states == STATE_CODES[TraceState.VIOLATED])
+            ids = trace_ids[rows]
+            np.bitwise_or.at(self._violating, (np.asarray(columns)[cols], ids >> 3),
+                             (1 << (ids & 7)).astype(np.uint8))
+
+    def _reserve_bits(self, num_bits):
+        num_bytes = (num_bits + 7) // 8
+        if num_bytes > self._violating.shape[1]:
+            violating = np.zeros((len(self.constraints), max(num_bytes, 2 * self._violating.shape[1])),
+                                 dtype=np.uint8)
+            violating[:, :self._violating.shape[1]] = self._violating
+            self._violating = violating
+
+    def flush(self):
+        """
+        Add the buffered traces to the aggregates.
+        """
+        n = len(self._buffer)
+        if n == 0:
+            return
+        self._aggregate(np.arange(len(self.constraints)), [getattr(self._buffer, name)[:n] for name in COUNTERS],
+                        self._buffer.states[:n], np.arange(self._buffer_start, self._buffer_start + n))
+        self._buffer = ConformanceResults(self.constraints)
+        self._buffer_start = self.num_traces
+
+    def add_trace(self, trace_key, trace_results):
+        """
+        Add the results of the next trace of the log, a dictionary with keys the constraint strings and values
+        CheckerResult objects.
+        """
+        self._buffer.add_trace(trace_key, trace_results)
+        self.num_traces += 1
+        if len(self._buffer) == BUFFER_SIZE:
+            self.flush()
+
+    def set_rows(self, other, rows, start=0):
+        """
+        Add the results of another store to the traces from the 'start'-th on, the (start+i)-th one taking the
+        rows[i]-th row of the other store. E.g. the results of the variants of a log are counted once for each of their
+        traces.
+        """
+        self.flush()
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = [self._buffer.constraint_index[constraint_str] for constraint_str in other.constraints]
+        n = len(other)
+        counters = [getattr(other, name)[:n] for name in COUNTERS]
+        states = other.states[:n]
+        if self._violating is None:
+            self._aggregate(columns, counters, states, np.arange(n), np.bincount(rows, minlength=n))
+            return
+        # The violating traces are needed, the traces are added a chunk at a time
+        for chunk_start in range(0, len(rows), BUFFER_SIZE):
+            chunk = rows[chunk_start:chunk_start + BUFFER_SIZE]
+            self._aggregate(columns, [values[chunk] for values in counters], states[chunk],
+                            np.arange(start + chunk_start, start + chunk_start + len(chunk)))
+
+    def set_vectorized(self, constraint_str, vec_result):
+        """
+        Add the per-trace arrays returned by a vectorized checker for a constraint.
+        """
+        self.flush()
+        *counters, satisfied = vec_result
+        n = self.num_traces
+        states = np.where(satisfied[:n], STATE_CODES[TraceState.SATISFIED], STATE_CODES[TraceState.VIOLATED])
+        counters = [np.full(n, NO_VALUE) if values is None else values[:n] for values in counters]
+        self._aggregate([self._buffer.constraint_index[constraint_str]], [values[:, None] for values in counters],
+                        states[:, None], np.arange(n))
+
+    def satisfaction_rates(self) -> dict[str: float]:
+        """
+        Return the fraction of the traces satisfying each constraint.
+        """
+        self.flush()
+        satisfied = self.state_counts[:, STATE_CODES[TraceState.SATISFIED]]
+        return {constraint_str: (count / self.num_traces if self.num_traces else 0.0)
+                for constraint_str, count in zip(self.constraints, satisfied.tolist())}
+
+    def violating_traces(self, constraint_str) -> list[int]:
+        """
+        Return the positions inside the log of the traces violating a constraint. The statistics must have been
+        computed with violating_traces=True.
+        """
+        if self._violating is None:
+            raise RuntimeError("The violating traces were not recorded.")
+        self.flush()
+        bits = np.unpackbits(self._violating[self._buffer.constraint_index[constraint_str]], bitorder='little')
+        return np.flatnonzero(bits[:self.num_traces]).tolist()
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Return the statistics as a DataFrame with one row for each constraint, and the columns 'constraint', the number
+        of traces in each state (named after the states), the sums of the counters and 'satisfaction_rate'.
+        """
+        self.flush()
+        data = {"constraint": self.constraints}
+        for code, state in enumerate(TRACE_STATES):
+            data[state.value] = self.state_counts[:, code]
+        for name in COUNTERS:
+            data[name] = getattr(self, name)
+        data["satisfaction_rate"] = list(self.satisfaction_rates().values())
+        return pd.DataFrame(data)
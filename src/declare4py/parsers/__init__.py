@@ -1 +1,3 @@
+from .condition_compiler import *
+from .condition_parser import *
 from .decl_parser import *
@@ -0,0 +1,62 @@
+import ast
+from datetime import timedelta
+
+# Functions that the translated conditions can call, the only globals of the compiled conditions
+FUNCTIONS = {'abs': abs, 'float': float, 'timedelta': timedelta}
+
+# Syntax nodes of the condition language: comparisons, membership, boolean operators, signed constants, tuples of
+# values and the attributes of the events
+ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot,
+    ast.Constant, ast.Name, ast.Subscript, ast.Tuple, ast.Load, ast.Call, ast.keyword,
+)
+
+
+def _check_tree(tree):
+    # Raise SyntaxError on anything out of the condition language, e.g. attribute accesses, which could reach
+    # arbitrary objects, or calls of functions other than FUNCTIONS
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise SyntaxError
+        if isinstance(node, ast.Call) and (not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS
+                                           or any(keyword.arg is None for keyword in node.keywords)):
+            raise SyntaxError
+
+
+def compile_condition(source):
+    """
+    Compile the Python translation of a DECLARE condition into a function of the activation and target events,
+    e.g. 'lambda A, T: "org:group" in A and A["org:group"] == "X"'. The expression is checked against the syntax of
+    the condition language before being compiled, so that a model file cannot run arbitrary code, and the function
+    does not build any namespace when it is called.
+
+    Parameters
+    ----------
+    source : str or ast.Expression
+        the Python expression translating the condition, or its syntax tree (see parse_condition).
+
+    Returns
+    -------
+    condition
+        the function evaluating the expression. Its 'names' attribute is the set of names it reads and its 'tree'
+        attribute is the syntax tree of the expression.
+
+    Raises
+    ------
+    SyntaxError
+        if the expression is not well-formed or it contains constructs out of the condition language.
+    """
+    try:
+        tree = source if isinstance(source, ast.Expression) else ast.parse(source, mode="eval")
+        _check_tree(tree)
+        arguments = ast.arguments(posonlyargs=[], args=[ast.arg("A"), ast.arg("T")], kwonlyargs=[], kw_defaults=[],
+                                  defaults=[])
+        function = ast.fix_missing_locations(ast.Expression(ast.Lambda(arguments, tree.body)))
+        condition = eval(compile(function, "<condition>", "eval"), {'__builtins__': {}, **FUNCTIONS})
+    except Exception:
+        raise SyntaxError
+
+    condition.names = frozenset(node.id for node in ast.walk(tree) if isinstance(node, ast.Name))
+    condition.tree = tree.body
+    return condition
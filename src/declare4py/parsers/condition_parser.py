@@ -0,0 +1,235 @@
+import ast
+import re
+
+# Tokens of the data conditions: parentheses, commas, comparison operators, quoted strings and words, i.e. keywords,
+# attributes of the events (e.g. 'A.org:group') and values
+TOKEN_RE = re.compile(r'\s*(?:(?P<punct>[(),])|(?P<op><=|>=|!=|==|=|<|>)|(?P<string>"[^"]*"|\'[^\']*\')'
+                      r'|(?P<word>[^\s(),<>=!]+))')
+ATTRIBUTE_RE = re.compile(r'([AaTt])\.(.+)')
+# Attributes compared by 'is', written in upper case so that values such as 'a.m.' are not taken for attributes
+IS_ATTRIBUTE_RE = re.compile(r'([AT])\.(\S+)')
+NUMBER_RE = re.compile(r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+INTEGER_RE = re.compile(r'[+-]?\d+')
+
+KEYWORDS = frozenset({'and', 'or', 'not', 'is', 'in', 'same', 'different', 'true', 'false'})
+COMPARE_OPS = {'=': ast.Eq, '==': ast.Eq, '!=': ast.NotEq, '<': ast.Lt, '<=': ast.LtE, '>': ast.Gt, '>=': ast.GtE}
+
+
+class _Token:
+    def __init__(self, kind, text, start, end):
+        self.kind = kind
+        self.text = text
+        self.start = start
+        self.end = end
+
+    def is_keyword(self, *keywords):
+        return self.kind == 'word' and self.text.lower() in keywords
+
+
+def _tokenize(cond):
+    tokens = []
+    pos = 0
+    cond = cond.rstrip()
+    while pos < len(cond):
+        match = TOKEN_RE.match(cond, pos)
+        if match is None:
+            raise SyntaxError
+        kind = match.lastgroup
+        tokens.append(_Token(kind, match.group(kind), match.start(kind), match.end()))
+        pos = match.end()
+    return tokens
+
+
+class _ConditionParser:
+    # Recursive descent parser of the data conditions, with the usual precedence of 'not', 'and' and 'or'
+    def __init__(self, cond):
+        self.cond = cond
+        self.tokens = _tokenize(cond)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def next(self):
+        token = self.peek()
+        if token is None:
+            raise SyntaxError
+        self.pos += 1
+        return token
+
+    def expect(self, text):
+        if self.next().text != text:
+            raise SyntaxError
+
+    def accept_keyword(self, *keywords):
+        token = self.peek()
+        if token is not None and token.is_keyword(*keywords):
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self):
+        if not self.tokens:
+            return ast.Expression(ast.Constant(True))
+        node = self.disjunction()
+        if self.peek() is not None:
+            raise SyntaxError
+        return ast.Expression(node)
+
+    def disjunction(self):
+        values = [self.conjunction()]
+        while self.accept_keyword('or'):
+            values.append(self.conjunction())
+        return _bool_op(ast.Or, values)
+
+    def conjunction(self):
+        values = [self.negation()]
+        while self.accept_keyword('and'):
+            values.append(self.negation())
+        return _bool_op(ast.And, values)
+
+    def negation(self):
+        if self.accept_keyword('not'):
+            return ast.UnaryOp(ast.Not(), self.negation())
+        return self.atom()
+
+    def atom(self):
+        token = self.peek()
+        if token is None:
+            raise SyntaxError
+        if token.text == '(':
+            self.pos += 1
+            node = self.disjunction()
+            self.expect(')')
+            return node
+        if token.is_keyword('true', 'false'):
+            self.pos += 1
+            return ast.Constant(token.text.lower() == 'true')
+        if token.is_keyword('same', 'different'):
+            # Same (different) value of the attribute in the activation and in the target
+            self.pos += 1
+            key = self.words()
+            op = ast.Eq() if token.is_keyword('same') else ast.NotEq()
+            return _checked_compare([_attribute('A', key), _attribute('T', key)], op)
+        return self.comparison()
+
+    def words(self):
+        # Text of the words up to a closing parenthesis, 'and' or 'or', with single spaces between them
+        start = self.pos
+        while self.peek() is not None and self.peek().text != ')' and not self.peek().is_keyword('and', 'or'):
+            if self.peek().text == '(':
+                raise SyntaxError
+            self.pos += 1
+        if self.pos == start:
+            raise SyntaxError
+        text = self.cond[self.tokens[start].start:self.tokens[self.pos - 1].end]
+        if self.pos - start == 1 and self.tokens[start].kind == 'string':
+            return text[1:-1]
+        return " ".join(text.split())
+
+    def comparison(self):
+        left = self.operand()
+        token = self.peek()
+        if token is not None and token.is_keyword('is'):
+            # The value of 'is' is the text of the following words, unless it is an attribute of the events
+            self.pos += 1
+            op = ast.NotEq() if self.accept_keyword('not') else ast.Eq()
+            value = self.words()
+            match = IS_ATTRIBUTE_RE.fullmatch(value)
+            right = _attribute(match.group(1), match.group(2)) if match else ast.Constant(value)
+            return _checked_compare([left, right], op)
+        if token is not None and token.kind == 'op':
+            self.pos += 1
+            return _checked_compare([left, self.operand()], COMPARE_OPS[token.text]())
+        if token is not None and token.is_keyword('not', 'in'):
+            op = ast.NotIn() if self.accept_keyword('not') else ast.In()
+            if not self.accept_keyword('in'):
+                raise SyntaxError
+            return _checked_compare([left, self.value_set()], op)
+        return _checked_compare([left], None)
+
+    def value_set(self):
+        # Tuple of the comma separated values between parentheses, as strings
+        self.expect('(')
+        start = self.peek().start if self.peek() is not None else len(self.cond)
+        while self.peek() is not None and self.peek().text != ')':
+            if self.peek().text == '(':
+                raise SyntaxError
+            self.pos += 1
+        end = self.peek().start if self.peek() is not None else start
+        self.expect(')')
+        text = self.cond[start:end].strip()
+        values = [value.strip() for value in text.split(',')] if text else []
+        return ast.Tuple([ast.Constant(value) for value in values], ast.Load())
+
+    def operand(self):
+        token = self.next()
+        if token.kind == 'string':
+            return ast.Constant(token.text[1:-1])
+        if token.kind != 'word':
+            raise SyntaxError
+        if token.is_keyword('true', 'false'):
+            return ast.Constant(token.text.lower() == 'true')
+        if token.text.lower() in KEYWORDS:
+            raise SyntaxError
+        match = ATTRIBUTE_RE.fullmatch(token.text)
+        if match:
+            return _attribute(match.group(1).upper(), match.group(2))
+        if NUMBER_RE.fullmatch(token.text):
+            return ast.Constant(int(token.text) if INTEGER_RE.fullmatch(token.text) else float(token.text))
+        return ast.Constant(token.text)
+
+
+def _bool_op(op_type, values):
+    # The operands that are themselves 'and' ('or') of an 'and' ('or') are flattened into it
+    if len(values) == 1:
+        return values[0]
+    flat = []
+    for value in values:
+        flat += value.values if isinstance(value, ast.BoolOp) and isinstance(value.op, op_type) else [value]
+    return ast.BoolOp(op_type(), flat)
+
+
+def _attribute(event, key):
+    return ast.Subscript(ast.Name(event, ast.Load()), ast.Constant(key), ast.Load())
+
+
+def _checked_compare(operands, op):
+    # Comparison of the operands ('op' is None for the truth value of a single operand), true only if the attributes
+    # it reads are present in their events
+    checks = [ast.Compare(ast.Constant(operand.slice.value), [ast.In()], [ast.Name(operand.value.id, ast.Load())])
+              for operand in operands if isinstance(operand, ast.Subscript)]
+    node = operands[0] if op is None else ast.Compare(operands[0], [op], operands[1:])
+    return ast.BoolOp(ast.And(), checks + [node]) if checks else node
+
+
+def parse_condition(cond):
+    """
+    Parse a DECLARE data condition into the syntax tree of the equivalent Python expression over the activation and
+    target events A and T, e.g. 'A.org:group is X' into '"org:group" in A and A["org:group"] == "X"'. The condition
+    combines with 'not', 'and' and 'or' (any case, with the usual precedence) and parentheses:
+      - comparisons of attributes and values with =, !=, <, <=, > and >=, where values are numbers, quoted strings
+        or words;
+      - 'A.key is [not] value', where the value is the text up to the next 'and', 'or' or closing parenthesis, or an
+        attribute of the events, e.g. 'A.org:group is T.org:group';
+      - 'A.key [not] in (value, ...)';
+      - 'same key' and 'different key', comparing the attribute of the activation and of the target;
+      - 'true', 'false' and attributes alone, for their truth value.
+    A comparison is true only if the attributes it reads are present. The empty condition is always true.
+
+    Parameters
+    ----------
+    cond : str
+        the DECLARE data condition.
+
+    Returns
+    -------
+    tree
+        the ast.Expression of the condition.
+
+    Raises
+    ------
+    SyntaxError
+        if the condition is not well-formed.
+    """
+    return _ConditionParser(cond.strip()).parse()
@@ -1,109 +1,21 @@
 from ..enums import Template
 from ..models import DeclModel
+from .condition_compiler import compile_condition
+from .condition_parser import parse_condition
+from datetime import timedelta
+from functools import lru_cache
+import ast
 import re
 
 
 def parse_data_cond(cond):
-    try:
-        cond = cond.strip()
-        if cond == "":
-            return "True"
-
-        # List containing translations from decl format to python
-        py_cond = ""
-        fill_enum_set = False
-
-        while cond:
-            if cond.startswith("(") or cond.startswith(")"):
-                py_cond = py_cond + " " + cond[0]
-                cond = cond[1:].lstrip()
-                fill_enum_set = py_cond.endswith(" in (")
-
-            else:
-                if not fill_enum_set:
-                    next_word = re.split(r'[\s()]+', cond)[0]
-                    cond = cond[len(next_word):].lstrip()
-
-                    if re.match(r'^[AaTt]\.', next_word):
-                        py_cond = py_cond + " " + '"' + next_word[2:] + '" in ' + next_word[0] \
-                                  + " and " + next_word[0] + '["' + next_word[2:] + '"]'
-
-                    elif next_word.lower() == "is":
-                        if cond.lower().startswith("not"):
-                            cond = cond[3:].lstrip()
-                            py_cond = py_cond + " !="
-                        else:
-                            py_cond = py_cond + " =="
-
-                        tmp = []
-                        while cond and not (cond.startswith(')') or cond.lower().startswith('and')
-                                            or cond.lower().startswith('or')):
-                            w = re.split(r'[\s()]+', cond)[0]
-                            cond = cond[len(w):].lstrip()
-                            tmp.append(w)
-
-                        attr = " ".join(tmp)
-                        py_cond += ' "' + attr + '"'
-
-                    elif next_word == "=":
-                        py_cond = py_cond + " =="
-
-                    elif next_word.lower() == "and" or next_word.lower() == "or":
-                        py_cond = py_cond + " " + next_word.lower()
-
-                    elif next_word.lower() == "same":
-                        tmp = []
-                        while cond and not (cond.startswith(')') or cond.lower().startswith('and')
-                                            or cond.lower().startswith('or')):
-                            w = re.split(r'[\s()]+', cond)[0]
-                            cond = cond[len(w):].lstrip()
-                            tmp.append(w)
-
-                        attr = " ".join(tmp)
-                        py_cond = py_cond + " " + attr + " in A and " + attr + " in T " \
-                                  + 'and A["' + attr + '"] == T["' + attr + '"]'
-
-                    elif next_word.lower() == "different":
-                        tmp = []
-                        while cond and not (cond.startswith(')') or cond.lower().startswith('and')
-                                            or cond.lower().startswith('or')):
-                            w = re.split(r'[\s()]+', cond)[0]
-                            cond = cond[len(w):].lstrip()
-                            tmp.append(w)
-
-                        attr = " ".join(tmp)
-                        py_cond = py_cond + " " + attr + " in A and " + attr + " in T " \
-                                  + 'and A["' + attr + '"] != T["' + attr + '"]'
-
-                    elif next_word.lower() == "true":
-                        py_cond = py_cond + " True"
-
-                    elif next_word.lower() == "false":
-                        py_cond = py_cond + " False"
-
-                    else:
-                        py_cond = py_cond + " " + next_word
-
-                else:
-                    end_idx = cond.find(')')
-                    enum_set = re.split(r',\s+', cond[:end_idx])
-                    enum_set = [x.strip() for x in enum_set]
-
-                    py_cond = py_cond + ' "' + '", "'.join(enum_set) + '"'
-                    cond = cond[end_idx:].lstrip()
-
-        return py_cond.strip()
-
-    except Exception:
-        raise SyntaxError
+    # Return the Python expression translating a data condition, see parse_condition
+    return ast.unparse(parse_condition(cond))
 
 
-def parse_time_cond(condition):
+def parse_time_bounds(condition):
+    # Return the python expressions of the minimum and maximum time distance of a non-empty time condition
     try:
-        if condition.strip() == "":
-            condition = "True"
-            return condition
-
         if re.split(r'\s*,\s*', condition.strip())[2].lower() == "s":
             time_measure = "seconds"
         elif re.split(r'\s*,\s*', condition.strip())[2].lower() == "m":
@@ -117,14 +29,82 @@ def parse_time_cond(condition):
 
         min_td = "timedelta(" + time_measure + "=float(" + str(condition.split(",")[0]) + "))"
         max_td = "timedelta(" + time_measure + "=float(" + str(condition.split(",")[1]) + "))"
+        return min_td, max_td
+
+    except Exception:
+        raise SyntaxError
+
+
+def parse_time_cond(condition):
+    try:
+        if condition.strip() == "":
+            condition = "True"
+            return condition
+    except Exception:
+        raise SyntaxError
 
-        condition = min_td + ' <= abs(A["time:timestamp"] - T["time:timestamp"]) <= ' + max_td
-        return condition
+    min_td, max_td = parse_time_bounds(condition)
+    condition = min_td + ' <= abs(A["time:timestamp"] - T["time:timestamp"]) <= ' + max_td
+    return condition
 
+
+@lru_cache(maxsize=None)
+def compile_data_cond(cond):
+    # The translated condition is compiled only once into a function of the events A and T, reused by every checker
+    return compile_condition(parse_condition(cond))
+
+
+@lru_cache(maxsize=None)
+def compile_time_window(condition):
+    # Return the minimum and maximum time distance of a time condition in microseconds, None if it is empty. The
+    # checkers compare them with the distance of the epoch timestamps of the events instead of evaluating the condition
+    if parse_time_cond(condition) == "True":
+        return None
+    try:
+        return tuple(compile_condition(td)(None, None) // timedelta(microseconds=1) for td in parse_time_bounds(condition))
     except Exception:
         raise SyntaxError
 
 
+def _event_keys(tree, name):
+    # Return the keys of the event 'name' that the condition reads, i.e. the ones of '"key" in A' and 'A["key"]'
+    # expressions, None if the event is used in any other way
+    keys = set()
+    uses = 0
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id == name:
+            uses -= 1
+        elif isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) and node.value.id == name \
+                and isinstance(node.slice, ast.Constant) and isinstance(node.slice.value, str):
+            keys.add(node.slice.value)
+            uses += 1
+        elif isinstance(node, ast.Compare) and len(node.ops) == 1 and isinstance(node.ops[0], (ast.In, ast.NotIn)) \
+                and isinstance(node.comparators[0], ast.Name) and node.comparators[0].id == name \
+                and isinstance(node.left, ast.Constant) and isinstance(node.left.value, str):
+            keys.add(node.left.value)
+            uses += 1
+    return tuple(sorted(keys)) if uses == 0 else None
+
+
+@lru_cache(maxsize=None)
+def correlation_keys(correlation_cond):
+    # Return the attribute keys of the activation (A) and of the target (T) read by the correlation condition. The
+    # condition gives the same result for all the events with the same values of these keys
+    tree = parse_condition(correlation_cond)
+    return _event_keys(tree, "A"), _event_keys(tree, "T")
+
+
+def compile_conditions(checker):
+    # Warm up the compiled conditions cache, bad formatted conditions are reported later by the checkers
+    *data_conds, time_cond = checker["condition"] or [""]
+    try:
+        for cond in data_conds:
+            compile_data_cond(cond)
+        compile_time_window(time_cond)
+    except SyntaxError:
+        pass
+
+
 def parse_decl_from_file(path):
     fo = open(path, "r+")
     lines = fo.readlines()
@@ -165,6 +145,7 @@ def parse_decl(lines):
                 if template.supports_cardinality:
                     tmp['n'] = 1 if not cardinality else int(cardinality)
 
+                compile_conditions(tmp)
                 result.checkers.append(tmp)
 
     result.set_constraints()
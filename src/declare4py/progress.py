@@ -0,0 +1,105 @@
+import time
+
+
+class ProgressTracker:
+    """
+    Progress reporting, cooperative cancellation and time budget of a long-running task: conformance checking (whose
+    units are the traces), discovery (the frequent item sets) or query checking (the candidate constraints). The task
+    advances the tracker after each unit and stops as soon as the tracker is cancelled, e.g. from another thread, or its
+    time budget is over, returning the results computed so far.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        called with the tracker itself when the task starts, at most once every 'interval' seconds while it advances
+        and when it ends.
+    time_budget : float, optional
+        the seconds after which the task is stopped, no limit if None (default None).
+    interval : float, optional
+        the minimum seconds between two calls of the callback while the task advances (default 0.5).
+
+    Attributes
+    ----------
+    task : str
+        the name of the running task
+    total : int
+        the number of units of the task, None if unknown
+    done : int
+        the number of units processed so far
+    stopped : bool
+        True if the task was stopped before processing all the units, because of a cancellation or of the time budget
+    """
+    def __init__(self, callback=None, time_budget=None, interval=0.5):
+        self.callback = callback
+        self.time_budget = time_budget
+        self.interval = interval
+        self.task = None
+        self.total = None
+        self.done = 0
+        self.stopped = False
+        self._cancelled = False
+        self._start_time = None
+        self._last_report = None
+
+    def start(self, task, total=None):
+        """
+        Start tracking a task made of 'total' units. A cancellation requested before is kept.
+        """
+        self.task = task
+        self.total = total
+        self.done = 0
+        self.stopped = False
+        self._start_time = self._last_report = time.monotonic()
+        self._report()
+
+    def advance(self, n=1) -> bool:
+        """
+        Record that 'n' more units have been processed and return whether the task can go on.
+        """
+        self.done += n
+        now = time.monotonic()
+        if self.callback is not None and now - self._last_report >= self.interval:
+            self._last_report = now
+            self._report()
+        if self._cancelled or (self.time_budget is not None and now - self._start_time >= self.time_budget):
+            self.stopped = True
+        return not self.stopped
+
+    def finish(self):
+        """
+        Report the end of the task.
+        """
+        self._report()
+
+    def cancel(self):
+        """
+        Request the task to stop after the unit being processed.
+        """
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        True if the task was requested to stop.
+        """
+        return self._cancelled
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Seconds since the start of the task.
+        """
+        return 0.0 if self._start_time is None else time.monotonic() - self._start_time
+
+    @property
+    def eta(self):
+        """
+        Estimated seconds to the end of the task, None if unknown.
+        """
+        if self.total is None or self.done == 0:
+            return None
+        return self.elapsed / self.done * max(self.total - self.done, 0)
+
+    def _report(self):
+        if self.callback is not None:
+            self.callback(self)
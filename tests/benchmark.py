@@ -0,0 +1,187 @@
+"""
+Benchmark of conformance checking, discovery, query checking and frequent item sets on synthetic logs and models.
+
+The log is generated with the given number of traces, alphabet size, mean trace length and variant skew (the variants
+are drawn with Zipf probabilities 1 / rank^skew), the model with the given number of constraints and fraction of
+constraints with conditions. Each task is timed over some repetitions after some warmup runs, and its peak memory is
+measured in a further run. The results are written as JSON, e.g.
+
+    python benchmark.py --traces 5000 --activities 20 --constraints 200 --output results.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+import pandas as pd
+import pm4py
+from pm4py.objects.log.obj import Event, EventLog, Trace
+
+from declare4py.declare4py import Declare4Py
+from declare4py.enums import Template
+
+TASKS = ("conformance", "discovery", "query", "itemsets")
+RESOURCES = tuple(f"r{i}" for i in range(10))
+
+
+def generate_log(num_traces, num_activities, trace_length, num_variants, skew, seed):
+    # Variants of random length around 'trace_length', drawn with Zipf probabilities, with random payloads
+    rnd = random.Random(seed)
+    activities = [f"activity {i}" for i in range(num_activities)]
+    variants = [[rnd.choice(activities) for _ in range(max(1, round(rnd.uniform(0.5, 1.5) * trace_length)))]
+                for _ in range(num_variants)]
+    weights = [1 / (rank + 1) ** skew for rank in range(num_variants)]
+    start = datetime(2020, 1, 1)
+
+    log = EventLog()
+    for i, variant in enumerate(rnd.choices(variants, weights, k=num_traces)):
+        trace = Trace(attributes={"concept:name": f"trace {i}"})
+        timestamp = start + timedelta(days=rnd.uniform(0, 365))
+        for activity in variant:
+            timestamp += timedelta(minutes=rnd.expovariate(1 / 60))
+            trace.append(Event({"concept:name": activity, "time:timestamp": timestamp,
+                                "org:resource": rnd.choice(RESOURCES), "amount": rnd.randint(0, 100)}))
+        log.append(trace)
+    return log, activities
+
+
+def generate_model(activities, num_constraints, condition_density, seed):
+    # Random constraints over the alphabet, a fraction of them with activation, target and time conditions
+    rnd = random.Random(seed)
+    lines = [f"activity {activity}" for activity in activities]
+    lines += [f"bind {activity}: org:resource, amount" for activity in activities]
+    lines.append("org:resource: " + ", ".join(RESOURCES))
+    lines.append("amount: integer between 0 and 100")
+    for _ in range(num_constraints):
+        template = rnd.choice(list(Template))
+        name = template.templ_str + (str(rnd.randint(1, 3)) if template.supports_cardinality else "")
+        with_conditions = rnd.random() < condition_density
+        act_cond = rnd.choice([f"A.amount > {rnd.randint(0, 100)}", f"A.org:resource is {rnd.choice(RESOURCES)}"]) \
+            if with_conditions else ""
+        time_cond = f"0,{rnd.randint(1, 48)},h" if with_conditions and rnd.random() < 0.5 else ""
+        if template.is_binary:
+            a, b = rnd.sample(activities, 2)
+            trg_cond = f"T.amount < {rnd.randint(0, 100)}" if with_conditions else ""
+            lines.append(f"{name}[{a}, {b}] |{act_cond} |{trg_cond} |{time_cond}")
+        else:
+            lines.append(f"{name}[{rnd.choice(activities)}] |{act_cond} |{time_cond}")
+    return "\n".join(lines) + "\n"
+
+
+def measure(function, warmup, repeat):
+    # Run times of 'function' after the warmup runs, then its peak memory in one more run
+    for _ in range(warmup):
+        function()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return times, peak
+
+
+def run_benchmark(args):
+    log, activities = generate_log(args.traces, args.activities, args.trace_length, args.variants, args.skew,
+                                   args.seed)
+    num_events = sum(len(trace) for trace in log)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_path = os.path.join(tmp_dir, "log.xes")
+        model_path = os.path.join(tmp_dir, "model.decl")
+        pm4py.write_xes(log, log_path)
+        with open(model_path, "w") as model_file:
+            model_file.write(generate_model(activities, args.constraints, args.condition_density, args.seed))
+
+        d4py = Declare4Py()
+        start = time.perf_counter()
+        d4py.parse_xes_log(log_path, streaming=args.streaming)
+        load_time = time.perf_counter() - start
+        d4py.parse_decl_model(model_path)
+
+        def discovery():
+            d4py.compute_frequent_itemsets(min_support=args.min_support, len_itemset=2)
+            d4py.discovery(consider_vacuity=True, max_declare_cardinality=2)
+
+        functions = {
+            "conformance": lambda: d4py.conformance_checking(consider_vacuity=True, n_jobs=args.jobs),
+            "discovery": discovery,
+            "query": lambda: d4py.query_checking(consider_vacuity=True, template_str="Response",
+                                                 min_support=args.min_support, n_jobs=args.jobs),
+            "itemsets": lambda: d4py.compute_frequent_itemsets(min_support=args.min_support),
+        }
+        results = {}
+        for task in args.tasks:
+            times, peak = measure(functions[task], args.warmup, args.repeat)
+            median = statistics.median(times)
+            results[task] = {
+                "times": times,
+                "min": min(times),
+                "median": median,
+                "mean": statistics.mean(times),
+                "events_per_second": num_events / median if median > 0 else None,
+                "peak_memory_bytes": peak,
+            }
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "pm4py": pm4py.__version__,
+        },
+        "parameters": vars(args),
+        "log": {"traces": len(log), "events": num_events, "load_time": load_time},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--traces", type=int, default=1000, help="number of traces of the log")
+    parser.add_argument("--activities", type=int, default=20, help="number of activities of the log")
+    parser.add_argument("--trace-length", type=int, default=15, help="mean number of events of a trace")
+    parser.add_argument("--variants", type=int, default=100, help="number of trace variants")
+    parser.add_argument("--skew", type=float, default=1.0, help="exponent of the Zipf distribution of the variants")
+    parser.add_argument("--constraints", type=int, default=100, help="number of constraints of the model")
+    parser.add_argument("--condition-density", type=float, default=0.3,
+                        help="fraction of the constraints with conditions")
+    parser.add_argument("--min-support", type=float, default=0.5,
+                        help="minimum support of the discovery, query checking and frequent item sets")
+    parser.add_argument("--tasks", nargs="+", choices=TASKS, default=list(TASKS), help="tasks to run")
+    parser.add_argument("--warmup", type=int, default=1, help="number of untimed runs of each task")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs of each task")
+    parser.add_argument("--jobs", type=int, default=1, help="number of processes of conformance and query checking")
+    parser.add_argument("--streaming", action="store_true", help="stream the log from the file")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the log and model generators")
+    parser.add_argument("--output", help="JSON file of the results, printed if not given")
+    args = parser.parse_args()
+
+    # The messages of Declare4Py are sent to stderr, so that the printed JSON can be piped
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmark(args)
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()